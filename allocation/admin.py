@@ -1,9 +1,44 @@
+from functools import reduce
+from operator import or_
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, SEARCH_VAR
+from django.db.models import Q
 from .models import (
     Branch, Semester, Subject, Faculty, Student, StudentSubject,
-    Attendance, CESeating, Notice, PushSubscription, NoticeAttachment, StudentMark,
-    MentorActionLog, MarksFreezeRule, MarksAuditTrail, MentorAssignment
+    Attendance, ClassSession, ClassSessionAbsence, CESeating, Notice, PushSubscription, NoticeAttachment, StudentMark,
+    MentorActionLog, MarksFreezeRule, MarksAuditTrail, MentorAssignment, StudentRiskSnapshot,
+    AttendanceRollup,
 )
+from .search import SEARCH_INDEXES, rank_order, search_queryset
+
+
+class FullTextSearchMixin:
+    """Serve the changelist search box from the FTS5 index named by `search_index`.
+
+    search_fields that the index does not cover are still matched with icontains.
+    Unless a column header was clicked, the best bm25 matches are listed first.
+    """
+    search_index = None
+
+    def get_ordering(self, request):
+        ordering = list(super().get_ordering(request) or self.model._meta.ordering)
+        term = request.GET.get(SEARCH_VAR, '').strip()
+        if term and ORDER_VAR not in request.GET:
+            return [rank_order(self.search_index, term).asc(), *ordering]
+        return ordering
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return super().get_search_results(request, queryset, search_term)
+        results = search_queryset(queryset, self.search_index, term)
+        indexed = SEARCH_INDEXES[self.search_index]['columns']
+        extra = [field for field in self.get_search_fields(request) if field not in indexed]
+        if extra:
+            results = results | queryset.filter(reduce(or_, (Q(**{f'{field}__icontains': term}) for field in extra)))
+        return results, False
+
 
 @admin.register(Branch)
 class BranchAdmin(admin.ModelAdmin):
@@ -16,7 +51,8 @@ class SemesterAdmin(admin.ModelAdmin):
     ordering = ['number']
 
 @admin.register(Subject)
-class SubjectAdmin(admin.ModelAdmin):
+class SubjectAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_index = 'subject'
     list_display = ['code', 'name', 'branch', 'semester', 'credit', 'is_elective', 'elective_group']
     list_filter = ['branch', 'semester']
     search_fields = ['code', 'name']
@@ -36,7 +72,8 @@ class FacultyAdmin(admin.ModelAdmin):
     get_subjects_count.short_description = 'Subjects Count'
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_index = 'student'
     list_display = ['enrollment_no', 'name', 'branch', 'semester', 'division', 'admission_year', 'mentor_name']
     list_filter = ['branch', 'semester', 'division', 'admission_year']
     search_fields = ['enrollment_no', 'name', 'mentor_name', 'admission_year']
@@ -56,6 +93,19 @@ class AttendanceAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
     readonly_fields = ['marked_by']
 
+class ClassSessionAbsenceInline(admin.TabularInline):
+    model = ClassSessionAbsence
+    extra = 0
+    raw_id_fields = ['student']
+
+@admin.register(ClassSession)
+class ClassSessionAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'date', 'division', 'head_count', 'marked_by']
+    list_filter = ['date', 'division', 'subject']
+    date_hierarchy = 'date'
+    readonly_fields = ['marked_by']
+    inlines = [ClassSessionAbsenceInline]
+
 @admin.register(CESeating)
 class CESeatingAdmin(admin.ModelAdmin):
     list_display = ['room_no', 'seat_from', 'seat_to', 'count']
@@ -64,7 +114,8 @@ class CESeatingAdmin(admin.ModelAdmin):
 
 
 @admin.register(Notice)
-class NoticeAdmin(admin.ModelAdmin):
+class NoticeAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_index = 'notice'
     list_display = ['title', 'notice_type', 'is_published', 'published_at', 'created_by', 'get_attachment_count', 'created_at']
     list_filter = ['notice_type', 'is_published']
     search_fields = ['title', 'body']
@@ -145,3 +196,20 @@ class MentorAssignmentAdmin(admin.ModelAdmin):
     def get_changeform_initial_data(self, request):
         # A class supports up to two mentors; enforced by model validation.
         return super().get_changeform_initial_data(request)
+
+
+@admin.register(StudentRiskSnapshot)
+class StudentRiskSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['student', 'level', 'score', 'attendance_pct', 'avg_marks_pct', 'fail_count', 'trend', 'computed_at']
+    list_filter = ['level']
+    search_fields = ['student__enrollment_no', 'student__name']
+    ordering = ['-score']
+    readonly_fields = ['computed_at']
+
+
+@admin.register(AttendanceRollup)
+class AttendanceRollupAdmin(admin.ModelAdmin):
+    list_display = ['student', 'subject', 'month', 'present', 'absent', 'total']
+    list_filter = ['month', 'subject']
+    search_fields = ['student__enrollment_no']
+    raw_id_fields = ['student', 'subject']
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AllocationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'allocation'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from . import signals
+
+        post_migrate.connect(signals.ensure_search_index_after_migrate, sender=self)
@@ -0,0 +1,461 @@
+"""Attendance storage and the read layer shared by both layouts.
+
+Two layouts can hold attendance:
+
+* ``rows``: one ``Attendance`` row per student, subject and day (the original
+  layout).
+* ``sessions``: one ``ClassSession`` per subject, day and division plus a
+  ``ClassSessionAbsence`` row for each non-present student. A session counts
+  for the roster packed into it (``ClassSession.roster``), i.e. the
+  students enrolled in that division when it was marked.
+
+``settings.ATTENDANCE_STORAGE`` picks the layout new submissions are written
+to. Both layouts are folded into ``AttendanceRollup`` (present/total per
+student, subject and month), which every percentage is read from, so a
+partly converted database (see ``manage.py convert_attendance_to_sessions``)
+reports the same figures. ``manage.py reconcile_attendance_rollups``
+rebuilds the rollups from the raw data.
+"""
+import sys
+from array import array
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, QuerySet, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Attendance, AttendanceRollup, ClassSession, ClassSessionAbsence, StudentSubject
+from .profile_cache import bump_student_data_version
+
+
+ATTENDANCE_STATUSES = {code for code, _ in Attendance.ATTENDANCE_CHOICES}
+
+
+def attendance_storage():
+    return 'sessions' if getattr(settings, 'ATTENDANCE_STORAGE', 'rows') == 'sessions' else 'rows'
+
+
+def _id_filter(students):
+    if isinstance(students, QuerySet):
+        return students.order_by().values('pk')
+    return [getattr(s, 'pk', s) for s in students]
+
+
+def _id_set(students):
+    if isinstance(students, QuerySet):
+        return set(students.order_by().values_list('pk', flat=True))
+    return {getattr(s, 'pk', s) for s in students}
+
+
+def pack_roster(student_ids):
+    """Student ids -> ClassSession.roster: sorted unsigned 32-bit integers, little-endian."""
+    packed = array('I', sorted(set(student_ids)))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_roster(roster):
+    """ClassSession.roster -> array of student ids."""
+    student_ids = array('I')
+    student_ids.frombytes(roster)
+    if sys.byteorder == 'big':
+        student_ids.byteswap()
+    return student_ids
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _months_q(months, field):
+    """Q matching `field` dates inside any of the given months (first-of-month dates)."""
+    q = Q()
+    for month in months:
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        q |= Q(**{f'{field}__gte': month, f'{field}__lt': next_month})
+    return q
+
+
+def raw_attendance_counts(students, subjects=None, months=None):
+    """Aggregate both storage layouts from scratch.
+
+    Returns {(student_id, subject_id, month): (present, total)}; this is what
+    AttendanceRollup stores. `months` limits the scan to those months.
+    """
+    student_ids = _id_filter(students)
+    subject_ids = _id_filter(subjects) if subjects is not None else None
+    counts = defaultdict(lambda: [0, 0])
+
+    rows = Attendance.objects.filter(student_id__in=student_ids)
+    if subject_ids is not None:
+        rows = rows.filter(subject_id__in=subject_ids)
+    if months:
+        rows = rows.filter(_months_q(months, 'date'))
+    rows = rows.order_by().annotate(month=TruncMonth('date')).values('student_id', 'subject_id', 'month')
+    for row in rows.annotate(total=Count('id'), present=Count('id', filter=Q(status='P'))):
+        entry = counts[(row['student_id'], row['subject_id'], row['month'])]
+        entry[0] += row['present']
+        entry[1] += row['total']
+
+    # A session counts for each student on its recorded roster; absences are
+    # the roster members who were not present.
+    sessions = ClassSession.objects.order_by()
+    if subject_ids is not None:
+        sessions = sessions.filter(subject_id__in=subject_ids)
+    if months:
+        sessions = sessions.filter(_months_q(months, 'date'))
+    wanted = _id_set(student_ids)
+    session_totals = Counter()
+    for subject_id, day, roster in sessions.values_list('subject_id', 'date', 'roster').iterator(chunk_size=2000):
+        month = _month_start(day)
+        session_totals.update(
+            (student_id, subject_id, month) for student_id in wanted.intersection(unpack_roster(roster))
+        )
+
+    if session_totals:
+        absences = ClassSessionAbsence.objects.filter(student_id__in=student_ids)
+        if subject_ids is not None:
+            absences = absences.filter(session__subject_id__in=subject_ids)
+        if months:
+            absences = absences.filter(_months_q(months, 'session__date'))
+        absences = absences.order_by().annotate(month=TruncMonth('session__date')).values(
+            'student_id', 'session__subject_id', 'month',
+        )
+        absent = {
+            (row['student_id'], row['session__subject_id'], row['month']): row['absent']
+            for row in absences.annotate(absent=Count('id'))
+        }
+        for key, total in session_totals.items():
+            entry = counts[key]
+            entry[0] += total - absent.get(key, 0)
+            entry[1] += total
+
+    return {k: (present, total) for k, (present, total) in counts.items()}
+
+
+def refresh_attendance_rollups(students, subjects=None, months=None):
+    """Recompute AttendanceRollup rows for the given scope from raw attendance.
+
+    Only rows that differ are written; rollups whose source data disappeared
+    are deleted. Returns the number of rollup rows inserted, updated or deleted.
+    """
+    student_ids = _id_filter(students)
+    subject_ids = _id_filter(subjects) if subjects is not None else None
+    fresh = raw_attendance_counts(student_ids, subject_ids, months)
+
+    existing_qs = AttendanceRollup.objects.filter(student_id__in=student_ids)
+    if subject_ids is not None:
+        existing_qs = existing_qs.filter(subject_id__in=subject_ids)
+    if months:
+        existing_qs = existing_qs.filter(month__in=months)
+    existing = {
+        (student_id, subject_id, month): (pk, present, total)
+        for pk, student_id, subject_id, month, present, total in existing_qs.values_list(
+            'pk', 'student_id', 'subject_id', 'month', 'present', 'total',
+        )
+    }
+
+    stale_ids = [pk for key, (pk, _, _) in existing.items() if key not in fresh]
+    changed = [
+        AttendanceRollup(
+            student_id=student_id, subject_id=subject_id, month=month,
+            present=present, absent=total - present, total=total,
+        )
+        for (student_id, subject_id, month), (present, total) in fresh.items()
+        if existing.get((student_id, subject_id, month), (None,))[1:] != (present, total)
+    ]
+    if not stale_ids and not changed:
+        return 0
+
+    with transaction.atomic():
+        for offset in range(0, len(stale_ids), 500):
+            AttendanceRollup.objects.filter(pk__in=stale_ids[offset:offset + 500]).delete()
+        AttendanceRollup.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=['student', 'subject', 'month'],
+            update_fields=['present', 'absent', 'total'],
+        )
+    return len(stale_ids) + len(changed)
+
+
+def attendance_counts(students, subjects=None, by_subject=False):
+    """Return {student_id: (present, total)} from the monthly rollups.
+
+    With by_subject=True the keys are (student_id, subject_id). `students`
+    and `subjects` may be querysets or iterables of objects / ids.
+    """
+    rollups = AttendanceRollup.objects.filter(student_id__in=_id_filter(students))
+    if subjects is not None:
+        rollups = rollups.filter(subject_id__in=_id_filter(subjects))
+    group = ['student_id', 'subject_id'] if by_subject else ['student_id']
+    return {
+        (row['student_id'], row['subject_id']) if by_subject else row['student_id']: (row['present'], row['total'])
+        for row in rollups.order_by().values(*group).annotate(present=Sum('present'), total=Sum('total'))
+    }
+
+
+def attendance_percentage(present, total):
+    return round((present * 100.0) / total, 1) if total > 0 else None
+
+
+def _class_roster(subject, divisions=None):
+    enrollments = StudentSubject.objects.filter(subject=subject)
+    if divisions:
+        enrollments = enrollments.filter(student__division__in=divisions)
+    return list(enrollments.values_list('student_id', 'student__division'))
+
+
+def class_attendance_statuses(subject, date, divisions=None):
+    """{student_id: 'P'/'A'} already recorded for one class on `date`, from either layout."""
+    records = Attendance.objects.filter(subject=subject, date=date)
+    if divisions:
+        records = records.filter(student__division__in=divisions)
+    statuses = dict(records.values_list('student_id', 'status'))
+
+    sessions = ClassSession.objects.filter(subject=subject, date=date)
+    if divisions:
+        sessions = sessions.filter(division__in=divisions)
+    for roster in sessions.values_list('roster', flat=True):
+        statuses.update((student_id, 'P') for student_id in unpack_roster(roster))
+    absent = ClassSessionAbsence.objects.filter(session__in=sessions).values_list('student_id', flat=True)
+    statuses.update((student_id, 'A') for student_id in absent)
+    return statuses
+
+
+# Dashboard flags are cheap to recompute, so they are only cached briefly.
+FACULTY_ATTENDANCE_STATUS_TIMEOUT = 120
+
+
+def _faculty_status_key(faculty_id, today):
+    return f'faculty-attendance-status:{faculty_id}:{today.isoformat()}'
+
+
+def faculty_attendance_status(faculty, subjects, today):
+    """{subject_id: {'marked_today', 'missing_this_week'}} for the faculty's subjects.
+
+    `missing_this_week` counts working days (Mon-Sat) from Monday up to
+    today on which this faculty marked no attendance for the subject. All
+    flags come from one query over both layouts and are cached per faculty.
+    """
+    subject_ids = [getattr(s, 'pk', s) for s in subjects]
+    key = _faculty_status_key(faculty.pk, today)
+    status = cache.get(key)
+    if status is not None and set(subject_ids) <= set(status):
+        return status
+
+    week_start = today - timedelta(days=today.weekday())
+    window = {'subject_id__in': subject_ids, 'marked_by': faculty, 'date__range': (week_start, today)}
+    marked = Attendance.objects.filter(**window).order_by().values_list('subject_id', 'date')
+    sessions = ClassSession.objects.filter(**window).order_by().values_list('subject_id', 'date')
+    marked_days = set(marked.union(sessions))
+
+    working_days = [
+        week_start + timedelta(days=offset)
+        for offset in range(today.weekday() + 1)
+        if (week_start + timedelta(days=offset)).weekday() < 6
+    ]
+    status = {
+        subject_id: {
+            'marked_today': (subject_id, today) in marked_days,
+            'missing_this_week': sum(1 for day in working_days if (subject_id, day) not in marked_days),
+        }
+        for subject_id in subject_ids
+    }
+    cache.set(key, status, FACULTY_ATTENDANCE_STATUS_TIMEOUT)
+    return status
+
+
+def _invalidate_faculty_status(marked_by):
+    faculty_id = getattr(marked_by, 'pk', marked_by)
+    if faculty_id:
+        transaction.on_commit(lambda: cache.delete(_faculty_status_key(faculty_id, timezone.localdate())))
+
+
+def _after_write(student_ids, subject=None, date=None):
+    from .risk import queue_risk_refresh
+
+    # Bulk writes skip post_save, so refresh derived data explicitly.
+    refresh_attendance_rollups(
+        student_ids,
+        [subject] if subject is not None else None,
+        [_month_start(date)] if date is not None else None,
+    )
+    queue_risk_refresh(student_ids)
+    bump_student_data_version(student_ids)
+
+
+def enrollments_changed(student_ids):
+    """Refresh derived data after enrolments were bulk added or removed.
+
+    Attendance counts come from the rows and session rosters, not from the
+    current enrolment, so the rollups are left alone; the risk snapshots are
+    requeued and the cached profiles dropped.
+    """
+    from .risk import queue_risk_refresh
+
+    student_ids = list({sid for sid in student_ids if sid})
+    if student_ids:
+        queue_risk_refresh(student_ids)
+        bump_student_data_version(student_ids)
+
+
+def save_class_attendance(subject, date, statuses, marked_by=None, divisions=None, default_status='P'):
+    """Save one class's attendance for `subject` on `date` in a fixed number of queries.
+
+    `statuses` maps student id -> 'P'/'A'; enrolled students missing from it
+    (or with an unknown code) get `default_status`. The data is written in
+    the configured storage layout inside one transaction, replacing whatever
+    the other layout held for the same class. Returns the number of students
+    whose record was written.
+    """
+    roster = _class_roster(subject, divisions)
+    if not roster:
+        return 0
+
+    resolved = {}
+    for student_id, _ in roster:
+        status = statuses.get(student_id, default_status)
+        resolved[student_id] = status if status in ATTENDANCE_STATUSES else default_status
+
+    if attendance_storage() == 'sessions':
+        return _save_as_session(subject, date, roster, resolved, marked_by)
+    return _save_as_rows(subject, date, roster, resolved, marked_by)
+
+
+def _save_as_rows(subject, date, roster, resolved, marked_by):
+    marked_by_id = getattr(marked_by, 'pk', marked_by)
+    student_ids = list(resolved)
+    existing = {
+        student_id: (status, existing_marked_by)
+        for student_id, status, existing_marked_by in Attendance.objects.filter(
+            subject=subject, date=date, student_id__in=student_ids,
+        ).values_list('student_id', 'status', 'marked_by_id')
+    }
+    sessions = ClassSession.objects.filter(subject=subject, date=date, division__in={d for _, d in roster})
+    # Students on a replaced session's roster who are no longer enrolled lose that class.
+    dropped_ids = {
+        student_id for roster in sessions.values_list('roster', flat=True) for student_id in unpack_roster(roster)
+    } - set(resolved)
+
+    rows = [
+        Attendance(student_id=student_id, subject=subject, date=date, status=status, marked_by_id=marked_by_id)
+        for student_id, status in resolved.items()
+        if existing.get(student_id) != (status, marked_by_id)
+    ]
+    if not rows and not dropped_ids:
+        return 0
+
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['student', 'subject', 'date'],
+            update_fields=['status', 'marked_by'],
+        )
+        sessions.delete()
+        _after_write([row.student_id for row in rows] + list(dropped_ids), subject, date)
+        _invalidate_faculty_status(marked_by)
+    return len(rows)
+
+
+def _save_as_session(subject, date, roster, resolved, marked_by):
+    previous = class_attendance_statuses(subject, date, {d for _, d in roster})
+    changed_ids = [sid for sid, status in resolved.items() if previous.get(sid) != status]
+    changed_ids += [sid for sid in previous if sid not in resolved]
+
+    roster_by_division = defaultdict(list)
+    for student_id, division in roster:
+        roster_by_division[division].append(student_id)
+
+    with transaction.atomic():
+        sessions = []
+        for division, student_ids in roster_by_division.items():
+            session, _ = ClassSession.objects.update_or_create(
+                subject=subject,
+                date=date,
+                division=division,
+                defaults={'head_count': len(student_ids), 'roster': pack_roster(student_ids), 'marked_by': marked_by},
+            )
+            sessions.append(session)
+        ClassSessionAbsence.objects.filter(session__in=sessions).delete()
+        session_by_division = {session.division: session for session in sessions}
+        ClassSessionAbsence.objects.bulk_create([
+            ClassSessionAbsence(session=session_by_division[division], student_id=student_id)
+            for student_id, division in roster
+            if resolved[student_id] != 'P'
+        ])
+        Attendance.objects.filter(subject=subject, date=date, student_id__in=list(resolved)).delete()
+        _after_write(changed_ids, subject, date)
+        _invalidate_faculty_status(marked_by)
+    return len(resolved)
+
+
+def convert_rows_to_sessions(subjects=None, dry_run=False):
+    """Move Attendance rows into ClassSession/ClassSessionAbsence, one subject at a time.
+
+    Rows are grouped by (subject, date, division) and each group becomes one
+    session whose roster is the students that had a row, so every student
+    keeps the same counts. Groups for which a session already exists stay in
+    the row layout, which the read layer keeps counting. Returns a dict of
+    counters.
+    """
+    from .models import Subject
+
+    stats = Counter()
+    subject_qs = Subject.objects.filter(pk__in=_id_filter(subjects)) if subjects is not None else Subject.objects.all()
+    subject_ids = list(
+        subject_qs.filter(Exists(Attendance.objects.filter(subject_id=OuterRef('pk')))).values_list('pk', flat=True)
+    )
+
+    for subject_id in subject_ids:
+        existing_sessions = set(ClassSession.objects.filter(subject_id=subject_id).values_list('date', 'division'))
+
+        groups = defaultdict(list)
+        for row in Attendance.objects.filter(subject_id=subject_id).values_list(
+            'id', 'student_id', 'date', 'status', 'marked_by_id', 'student__division',
+        ).iterator(chunk_size=5000):
+            groups[(row[2], row[5])].append(row)
+
+        convertible = {}
+        for (day, division), rows in groups.items():
+            if (day, division) in existing_sessions:
+                stats['groups_kept'] += 1
+                stats['rows_kept'] += len(rows)
+                continue
+            convertible[(day, division)] = rows
+
+        stats['sessions'] += len(convertible)
+        stats['rows_converted'] += sum(len(rows) for rows in convertible.values())
+        stats['absences'] += sum(1 for rows in convertible.values() for row in rows if row[3] != 'P')
+        if dry_run or not convertible:
+            continue
+
+        with transaction.atomic():
+            sessions = ClassSession.objects.bulk_create([
+                ClassSession(
+                    subject_id=subject_id,
+                    date=day,
+                    division=division,
+                    head_count=len(rows),
+                    roster=pack_roster(row[1] for row in rows),
+                    marked_by_id=Counter(row[4] for row in rows).most_common(1)[0][0],
+                )
+                for (day, division), rows in convertible.items()
+            ], batch_size=500)
+            ClassSessionAbsence.objects.bulk_create([
+                ClassSessionAbsence(session=session, student_id=row[1])
+                for session, rows in zip(sessions, convertible.values())
+                for row in rows
+                if row[3] != 'P'
+            ], batch_size=2000)
+            row_ids = [row[0] for rows in convertible.values() for row in rows]
+            for offset in range(0, len(row_ids), 500):
+                Attendance.objects.filter(pk__in=row_ids[offset:offset + 500]).delete()
+
+    return dict(stats)
@@ -0,0 +1,826 @@
+"""Synthetic-data benchmarks for `manage.py benchmark`.
+
+Each scenario seeds its own rows inside a transaction that is rolled back
+afterwards, so the command is always run against a throwaway test database.
+"""
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import (
+    Branch, Semester, Subject, Student, StudentSubject, Attendance, StudentMark, MarksAuditTrail, ResultSheet, ResultEntry,
+)
+
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+class _Rollback(Exception):
+    pass
+
+
+def run_isolated(func, *args, **kwargs):
+    """Run func inside a transaction that is always rolled back; return its result."""
+    result = None
+    try:
+        with transaction.atomic():
+            result = func(*args, **kwargs)
+            raise _Rollback
+    except _Rollback:
+        pass
+    return result
+
+
+def measure(func, *args, **kwargs):
+    """Return (result, query_count, elapsed_ms) for one call."""
+    queries = 0
+
+    # Counted with a wrapper rather than the debug query log, which keeps at most 9000 entries.
+    def count(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+    return result, queries, round(elapsed_ms, 1)
+
+
+FIRST_NAMES = [
+    'Aarav', 'Vivaan', 'Aditya', 'Diya', 'Ananya', 'Ishaan', 'Kavya', 'Rohan', 'Meera', 'Arjun',
+    'Saanvi', 'Kabir', 'Nisha', 'Yash', 'Priya', 'Dhruv', 'Riya', 'Harsh', 'Pooja', 'Manav',
+]
+LAST_NAMES = [
+    'Patel', 'Shah', 'Mehta', 'Desai', 'Joshi', 'Parikh', 'Trivedi', 'Pandya', 'Modi', 'Bhatt',
+    'Chauhan', 'Rana', 'Vyas', 'Dave', 'Thakkar', 'Soni', 'Gandhi', 'Amin', 'Raval', 'Kapadia',
+]
+
+
+def seed_students(size, branch=None, semester=None, divisions='ABC'):
+    """Bulk-create `size` students with realistic names and enrollment numbers."""
+    branch = branch or Branch.objects.create(name='Benchmark Engineering', code='BENCH')
+    semester = semester or Semester.objects.create(number=5)
+    students = Student.objects.bulk_create([
+        Student(
+            enrollment_no=f'26BN{idx:06d}',
+            name=f'{FIRST_NAMES[idx % 20]} {FIRST_NAMES[(idx // 20) % 20]} {LAST_NAMES[(idx // 400) % 20]}',
+            branch=branch,
+            semester=semester,
+            division=divisions[idx % len(divisions)],
+            admission_year=2024,
+            mentor_name=f'Prof. {LAST_NAMES[idx % 7]}',
+        )
+        for idx in range(size)
+    ], batch_size=500)
+    return branch, semester, students
+
+
+def seed_cohort(size, subjects=6, attendance_days=10, marks_per_subject=2, divisions='ABC'):
+    """Create one branch/semester with `size` students, enrollments, attendance and marks."""
+    branch, semester, student_objs = seed_students(size, divisions=divisions)
+    subject_objs = Subject.objects.bulk_create([
+        Subject(code=f'BN{idx:03d}', name=f'Benchmark Subject {idx}', branch=branch, semester=semester)
+        for idx in range(subjects)
+    ])
+    StudentSubject.objects.bulk_create([
+        StudentSubject(student=stu, subject=subj) for stu in student_objs for subj in subject_objs
+    ], batch_size=1000)
+
+    start = date(2026, 7, 1)
+    Attendance.objects.bulk_create([
+        Attendance(
+            student=stu,
+            subject=subj,
+            date=start + timedelta(days=day),
+            status='A' if (stu.id + day) % 5 == 0 else 'P',
+        )
+        for stu in student_objs for subj in subject_objs for day in range(attendance_days)
+    ], batch_size=2000)
+    if attendance_days:
+        from .attendance import refresh_attendance_rollups
+        refresh_attendance_rollups([stu.id for stu in student_objs])
+
+    marks = []
+    for stu in student_objs:
+        for s_idx, subj in enumerate(subject_objs):
+            for attempt in range(1, marks_per_subject + 1):
+                obtained = Decimal((stu.id * 7 + s_idx * 13 + attempt) % 100)
+                marks.append(StudentMark(
+                    student=stu,
+                    subject=subj,
+                    semester=semester,
+                    exam_type='MID',
+                    exam_session='OCT 2026',
+                    attempt_no=attempt,
+                    max_marks=Decimal('100'),
+                    pass_marks=Decimal('40'),
+                    marks_obtained=obtained,
+                    is_absent=(stu.id + s_idx) % 17 == 0,
+                ))
+    StudentMark.objects.bulk_create(marks, batch_size=2000)
+
+    return {
+        'branch': branch,
+        'semester': semester,
+        'subjects': subject_objs,
+        'students': student_objs,
+    }
+
+
+@scenario('risk')
+def bench_risk(sizes):
+    """Cohort risk scoring: query count should not grow with roster size."""
+    from .risk import compute_cohort_risk
+
+    def run(size):
+        seed_cohort(size)
+        result, queries, elapsed_ms = measure(compute_cohort_risk, Student.objects.all())
+        return {'students': size, 'scored': len(result), 'queries': queries, 'ms': elapsed_ms}
+
+    return [run_isolated(run, size) for size in sizes]
+
+
+@scenario('search')
+def bench_search(sizes, repeats=20):
+    """Student search latency: LIKE '%q%' scan vs the FTS5 index."""
+    from django.db.models import Q
+    from .search import search_queryset, build_match
+
+    queries = ['Kavya', '26BN0123', 'Desai', 'Meera Rohan', 'Kavya Dhruv Raval']
+
+    def timed(build_qs):
+        # Same work as the student list: total count plus the first ordered page.
+        started = time.perf_counter()
+        for _ in range(repeats):
+            qs = build_qs()
+            qs.count()
+            list(qs.order_by('name', 'id').values_list('id', flat=True)[:100])
+        return round((time.perf_counter() - started) * 1000.0 / repeats, 2)
+
+    def run(size):
+        seed_students(size)
+        rows = []
+        for query in queries:
+            like_ms = timed(lambda: Student.objects.filter(Q(name__icontains=query) | Q(enrollment_no__icontains=query)))
+            fts_ms = timed(lambda: search_queryset(Student.objects.all(), 'student', query, columns=('name', 'enrollment_no')))
+            rows.append({
+                'students': size,
+                'query': repr(query),
+                'fts': build_match('student', query) is not None,
+                'like_ms': like_ms,
+                'fts_ms': fts_ms,
+            })
+        return rows
+
+    return [row for size in sizes for row in run_isolated(run, size)]
+
+
+@scenario('attendance')
+def bench_attendance(sizes):
+    """Saving one class's attendance: per-student update_or_create vs the bulk upsert."""
+    from .attendance import save_class_attendance
+
+    def legacy_save(subject, day, statuses):
+        for enrollment in StudentSubject.objects.filter(subject=subject):
+            student = enrollment.student
+            Attendance.objects.update_or_create(
+                student=student,
+                subject=subject,
+                date=day,
+                defaults={'status': statuses.get(student.id, 'P'), 'marked_by': None},
+            )
+
+    def run(size):
+        cohort = seed_cohort(size, subjects=1, attendance_days=0, marks_per_subject=0, divisions='A')
+        subject = cohort['subjects'][0]
+        statuses = {stu.id: 'A' if stu.id % 4 == 0 else 'P' for stu in cohort['students']}
+        flipped = {sid: 'P' if status == 'A' else 'A' for sid, status in statuses.items()}
+
+        _, legacy_queries, legacy_ms = measure(legacy_save, subject, date(2026, 8, 1), statuses)
+        _, insert_queries, insert_ms = measure(save_class_attendance, subject, date(2026, 8, 2), statuses)
+        _, update_queries, update_ms = measure(save_class_attendance, subject, date(2026, 8, 2), flipped)
+        return {
+            'students': size,
+            'legacy_queries': legacy_queries,
+            'legacy_ms': legacy_ms,
+            'bulk_insert_queries': insert_queries,
+            'bulk_insert_ms': insert_ms,
+            'bulk_update_queries': update_queries,
+            'bulk_update_ms': update_ms,
+        }
+
+    return [run_isolated(run, size) for size in sizes]
+
+
+def _table_bytes(*tables):
+    """On-disk size of the tables and their indexes, via SQLite's dbstat."""
+    placeholders = ', '.join(['%s'] * len(tables))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN "
+            f"(SELECT name FROM sqlite_master WHERE tbl_name IN ({placeholders}))",
+            list(tables),
+        )
+        return cursor.fetchone()[0]
+
+
+@scenario('attendance_storage')
+def bench_attendance_storage(sizes, days=60, repeats=5):
+    """Attendance table size and percentage-query latency: per-student rows vs class sessions."""
+    from .attendance import raw_attendance_counts, convert_rows_to_sessions
+
+    def timed_counts():
+        started = time.perf_counter()
+        for _ in range(repeats):
+            counts = raw_attendance_counts(Student.objects.all())
+        return counts, round((time.perf_counter() - started) * 1000.0 / repeats, 1)
+
+    def run(size):
+        seed_cohort(size, attendance_days=days, marks_per_subject=0)
+        rows_bytes = _table_bytes('allocation_attendance')
+        row_counts, rows_ms = timed_counts()
+
+        convert_rows_to_sessions()
+        sessions_bytes = _table_bytes(
+            'allocation_attendance', 'allocation_classsession', 'allocation_classsessionabsence',
+        )
+        session_counts, sessions_ms = timed_counts()
+        return {
+            'students': size,
+            'days': days,
+            'rows_kb': rows_bytes // 1024,
+            'sessions_kb': sessions_bytes // 1024,
+            'rows_ms': rows_ms,
+            'sessions_ms': sessions_ms,
+            'same_counts': row_counts == session_counts,
+        }
+
+    return [run_isolated(run, size) for size in sizes]
+
+
+@scenario('attendance_rollup')
+def bench_attendance_rollup(sizes, repeats=5):
+    """Cohort attendance percentages: aggregating raw rows vs reading the monthly rollups.
+
+    Sizes are days of attendance for a fixed 500-student cohort.
+    """
+    from .attendance import attendance_counts, raw_attendance_counts
+
+    def timed(func):
+        started = time.perf_counter()
+        for _ in range(repeats):
+            func(Student.objects.all())
+        return round((time.perf_counter() - started) * 1000.0 / repeats, 1)
+
+    def run(days):
+        seed_cohort(500, attendance_days=days, marks_per_subject=0)
+        return {
+            'students': 500,
+            'days': days,
+            'raw_ms': timed(raw_attendance_counts),
+            'rollup_ms': timed(attendance_counts),
+            'queries': measure(attendance_counts, Student.objects.all())[1],
+        }
+
+    return [run_isolated(run, days) for days in sizes]
+
+
+@scenario('marks_save')
+def bench_marks_save(sizes):
+    """Saving one exam column of marks: first entry, then a re-save that changes every mark."""
+    from .marks import save_marks_bulk
+
+    def run(size):
+        cohort = seed_cohort(size, subjects=1, attendance_days=0, marks_per_subject=0, divisions='A')
+        subject, semester = cohort['subjects'][0], cohort['semester']
+        first = {stu.id: (False, Decimal(stu.id % 90)) for stu in cohort['students']}
+        second = {stu.id: (False, Decimal(stu.id % 90 + 5)) for stu in cohort['students']}
+        key = (subject, semester, 'FINAL', 'APR 2027', 1)
+
+        _, create_queries, create_ms = measure(save_marks_bulk, *key, first, max_marks=Decimal('100'), pass_marks=Decimal('40'))
+        _, update_queries, update_ms = measure(save_marks_bulk, *key, second, max_marks=Decimal('100'), pass_marks=Decimal('40'))
+        return {
+            'students': size,
+            'create_queries': create_queries,
+            'create_ms': create_ms,
+            'update_queries': update_queries,
+            'update_ms': update_ms,
+            'audit_rows': MarksAuditTrail.objects.filter(subject=subject).count(),
+        }
+
+    return [run_isolated(run, size) for size in sizes]
+
+
+@scenario('marks_import')
+def bench_marks_import(sizes):
+    """Spreadsheet import of one exam column: preview (parse, validate, diff) and commit,
+    first into an empty column and then re-importing a sheet that changes every mark."""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from .marks import read_marks_sheet, preview_marks_import, save_marks_bulk
+
+    def sheet(students, offset):
+        lines = ['Enrollment No,Marks,Absent']
+        for idx, stu in enumerate(students):
+            lines.append(f'{stu.enrollment_no},AB,Y' if idx % 25 == 0 else f'{stu.enrollment_no},{(stu.id + offset) % 90}.5,')
+        return SimpleUploadedFile('marks.csv', '\n'.join(lines).encode())
+
+    def run(size):
+        cohort = seed_cohort(size, subjects=1, attendance_days=0, marks_per_subject=0, divisions='A')
+        subject, semester = cohort['subjects'][0], cohort['semester']
+        students = Student.objects.filter(branch=subject.branch, semester=semester)
+        key = (subject, 'MID', 'OCT 2026', 1)
+
+        def import_sheet(upload):
+            preview, preview_queries, preview_ms = measure(
+                lambda: preview_marks_import(read_marks_sheet(upload), students, *key, Decimal('100'), Decimal('40'))
+            )
+            _, commit_queries, commit_ms = measure(
+                save_marks_bulk, subject, semester, *key[1:], preview['entries'],
+                max_marks=Decimal('100'), pass_marks=Decimal('40'), reason='Spreadsheet import',
+                versions=preview['versions'],
+            )
+            return preview_queries, preview_ms, commit_queries, commit_ms
+
+        first = import_sheet(sheet(cohort['students'], 0))
+        second = import_sheet(sheet(cohort['students'], 7))
+        return {
+            'rows': size,
+            'preview_queries': first[0],
+            'preview_ms': first[1],
+            'create_queries': first[2],
+            'create_ms': first[3],
+            'reimport_preview_ms': second[1],
+            'update_queries': second[2],
+            'update_ms': second[3],
+        }
+
+    return [run_isolated(run, size) for size in sizes]
+
+
+def _student_sheet_rows(size, elective_codes):
+    from .ingest import StudentRow
+
+    return [
+        StudentRow(
+            row_index=idx + 1,
+            enrollment_no=f'26UP{idx:06d}',
+            name=f'{FIRST_NAMES[idx % 20]} {LAST_NAMES[(idx // 20) % 20]}',
+            division='ABC'[idx % 3],
+            admission_year=2026,
+            mentor_name=f'Prof. {LAST_NAMES[idx % 7]}',
+            email=f'student{idx}@example.com',
+            phone=f'98{idx:08d}',
+            elective_codes=[elective_codes[idx % len(elective_codes)]] if idx % 2 else [],
+            elective_display='',
+        )
+        for idx in range(size)
+    ]
+
+
+def _student_sheet_frame(size, elective_codes):
+    """The rows of _student_sheet_rows as an uploaded sheet would read."""
+    import pandas as pd
+
+    return pd.DataFrame([
+        {
+            'Enrollment No': r.enrollment_no, 'Name': r.name, 'Division': r.division,
+            'Admission Year': r.admission_year, 'Mentor Name': r.mentor_name,
+            'Email': r.email, 'Phone': r.phone, 'Electives': ','.join(r.elective_codes),
+        }
+        for r in _student_sheet_rows(size, elective_codes)
+    ])
+
+
+@scenario('student_upload')
+def bench_student_upload(sizes):
+    """Student intake sheet: per-row exists()/create()/get_or_create() vs the bulk path,
+    and the whole upload_students request for a generated CSV."""
+    from django.contrib.auth.models import User
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test import RequestFactory
+
+    from .ingest import bulk_create_students
+    from .views import upload_students
+
+    def setup():
+        branch, semester, _ = seed_students(0)
+        Subject.objects.bulk_create([
+            Subject(code=f'EL{idx}', name=f'Elective {idx}', branch=branch, semester=semester, is_elective=True)
+            for idx in range(3)
+        ])
+        return branch, semester
+
+    def legacy_insert(rows, branch, semester):
+        electives = {s.code: s for s in Subject.objects.filter(branch=branch, semester=semester, is_elective=True)}
+        for r in rows:
+            if Student.objects.filter(enrollment_no=r.enrollment_no).exists():
+                continue
+            student = Student.objects.create(
+                enrollment_no=r.enrollment_no, name=r.name, division=r.division,
+                admission_year=r.admission_year, mentor_name=r.mentor_name,
+                email=r.email, phone=r.phone, branch=branch, semester=semester,
+            )
+            for code in r.elective_codes:
+                StudentSubject.objects.get_or_create(student=student, subject=electives[code])
+
+    def run_legacy(size):
+        branch, semester = setup()
+        _, queries, ms = measure(legacy_insert, _student_sheet_rows(size, ['EL0', 'EL1', 'EL2']), branch, semester)
+        return queries, ms
+
+    def run_bulk(size):
+        branch, semester = setup()
+        _, queries, ms = measure(bulk_create_students, _student_sheet_rows(size, ['EL0', 'EL1', 'EL2']), branch, semester)
+        return queries, ms
+
+    def run_request(size):
+        branch, semester = setup()
+        out = _student_sheet_frame(size, ['EL0', 'EL1', 'EL2']).to_csv(index=False)
+        request = RequestFactory().post('/students/upload/', {
+            'branch': branch.pk,
+            'semester': semester.pk,
+            'file': SimpleUploadedFile('students.csv', out.encode()),
+        })
+        request.user = User.objects.create_superuser('bench-admin', 'bench@example.com', 'x')
+        _, queries, ms = measure(upload_students, request)
+        assert Student.objects.filter(branch=branch).count() == size
+        return queries, ms
+
+    results = []
+    for size in sizes:
+        legacy_queries, legacy_ms = run_isolated(run_legacy, size)
+        bulk_queries, bulk_ms = run_isolated(run_bulk, size)
+        request_queries, request_ms = run_isolated(run_request, size)
+        results.append({
+            'rows': size,
+            'legacy_queries': legacy_queries,
+            'legacy_ms': legacy_ms,
+            'bulk_queries': bulk_queries,
+            'bulk_ms': bulk_ms,
+            'request_queries': request_queries,
+            'request_ms': request_ms,
+        })
+    return results
+
+
+@scenario('result_upload')
+def bench_result_upload(sizes):
+    """Storing a result sheet (8 courses per student, uploaded twice so the second
+    pass replaces): per-row lookups/update_or_create vs the prefetching bulk path."""
+    from .ingest import RESULT_UPLOAD, save_result_rows
+
+    def sheet_rows(students):
+        return [
+            RESULT_UPLOAD.row(
+                row_index=idx * 8 + course + 1, enrollment_no=stu.enrollment_no.lower(), semester=5,
+                exam_session='NOV-2026', issued_date=date(2026, 11, 20), spi=Decimal('8.25'), cpi=Decimal('7.90'),
+                earned_credits=24, earned_grade_points=198, total_credits=24, total_grade_points=198,
+                result_status='PASS', course_code=f'CS{course:03d}', course_name=f'Course {course}',
+                course_credit=Decimal('3'), grade='AB',
+            )
+            for idx, stu in enumerate(students) for course in range(8)
+        ]
+
+    def legacy_save(rows):
+        sheets = {}
+        for r in rows:
+            student = Student.objects.filter(enrollment_no__iexact=r.enrollment_no).select_related('semester').first()
+            semester_obj = Semester.objects.filter(number=r.semester).first()
+            sheets.setdefault((student, semester_obj, r.exam_session), []).append(r)
+        with transaction.atomic():
+            for (student, semester_obj, exam_session), entries in sheets.items():
+                r = entries[0]
+                sheet, _ = ResultSheet.objects.update_or_create(
+                    student=student, semester=semester_obj, exam_session=exam_session,
+                    defaults={'issued_date': r.issued_date, 'spi': r.spi, 'cpi': r.cpi, 'result_status': r.result_status},
+                )
+                ResultEntry.objects.filter(result_sheet=sheet).delete()
+                ResultEntry.objects.bulk_create([
+                    ResultEntry(result_sheet=sheet, course_code=e.course_code, course_name=e.course_name,
+                                course_credit=e.course_credit, grade=e.grade)
+                    for e in entries
+                ])
+
+    def run(size, save):
+        _, _, students = seed_students(size)
+        rows = sheet_rows(students)
+        _, first_queries, first_ms = measure(save, rows)
+        _, second_queries, second_ms = measure(save, rows)
+        assert ResultEntry.objects.count() == size * 8
+        return first_queries, first_ms, second_queries, second_ms
+
+    results = []
+    for size in sizes:
+        legacy = run_isolated(run, size, legacy_save)
+        bulk = run_isolated(run, size, lambda rows: save_result_rows(rows, set()))
+        results.append({
+            'students': size,
+            'rows': size * 8,
+            'legacy_queries': legacy[0],
+            'legacy_ms': legacy[1],
+            'legacy_replace_queries': legacy[2],
+            'legacy_replace_ms': legacy[3],
+            'bulk_queries': bulk[0],
+            'bulk_ms': bulk[1],
+            'bulk_replace_queries': bulk[2],
+            'bulk_replace_ms': bulk[3],
+        })
+    return results
+
+
+@scenario('public_result')
+def bench_public_result(sizes):
+    """Result-day lookups: every student's get_public_result() with a cold cache
+    (read-through) and after warm_public_results() has run for the upload."""
+    from django.core.cache import cache
+
+    from .result_cache import get_public_result, public_result_key, warm_public_results
+
+    def run(size):
+        _, semester, students = seed_students(size)
+        sheets = ResultSheet.objects.bulk_create([
+            ResultSheet(student=stu, semester=semester, exam_session='NOV-2026', spi=Decimal('8.25'), cpi=Decimal('7.90'))
+            for stu in students
+        ], batch_size=500)
+        ResultEntry.objects.bulk_create([
+            ResultEntry(result_sheet=sheet, course_code=f'CS{course:03d}', course_name=f'Course {course}',
+                        course_credit=Decimal('3'), grade='AB')
+            for sheet in sheets for course in range(8)
+        ], batch_size=2000)
+
+        def lookup_all():
+            for stu in students:
+                result_context, _ = get_public_result(stu.enrollment_no, 5)
+                assert result_context is not None
+
+        cache.delete_many([public_result_key(stu.enrollment_no, 5) for stu in students])
+        _, cold_queries, cold_ms = measure(lookup_all)
+        cache.delete_many([public_result_key(stu.enrollment_no, 5) for stu in students])
+        _, warm_build_queries, warm_build_ms = measure(warm_public_results, [stu.id for stu in students])
+        _, warm_queries, warm_ms = measure(lookup_all)
+        cache.delete_many([public_result_key(stu.enrollment_no, 5) for stu in students])
+        return {
+            'students': size,
+            'cold_queries': cold_queries,
+            'cold_ms': cold_ms,
+            'warm_build_queries': warm_build_queries,
+            'warm_build_ms': warm_build_ms,
+            'warm_queries': warm_queries,
+            'warm_ms': warm_ms,
+        }
+
+    return [run_isolated(run, size) for size in sizes]
+
+
+@scenario('result_pdf')
+def bench_result_pdf(sizes):
+    """Marksheet PDFs: drawing every student's PDF live in-process vs pre-rendering
+    on the RESULT_PDF_WORKERS pool (2 workers when the setting is off), then
+    serving a stored file per download."""
+    import shutil
+    import tempfile
+    from concurrent.futures import wait
+
+    from django.test import RequestFactory, override_settings
+
+    from .result_cache import warm_public_results
+    from .result_pdfs import prerender_result_pdfs, render_result_pdf, result_pdf_data, result_pdf_response
+
+    workers = settings.RESULT_PDF_WORKERS or 2
+
+    def run(size):
+        _, semester, students = seed_students(size)
+        sheets = ResultSheet.objects.bulk_create([
+            ResultSheet(student=stu, semester=semester, exam_session='NOV-2026', spi=Decimal('8.25'), cpi=Decimal('7.90'))
+            for stu in students
+        ], batch_size=500)
+        ResultEntry.objects.bulk_create([
+            ResultEntry(result_sheet=sheet, course_code=f'CS{course:03d}', course_name=f'Course {course}',
+                        course_credit=Decimal('3'), grade='AB')
+            for sheet in sheets for course in range(8)
+        ], batch_size=2000)
+        contexts = list(warm_public_results([stu.id for stu in students]).values())
+
+        def render_all():
+            for result_context in contexts:
+                render_result_pdf(result_pdf_data(result_context))
+
+        def prerender_all():
+            wait(prerender_result_pdfs(contexts))
+
+        def serve_all():
+            request = RequestFactory().get('/results/pdf/')
+            for result_context in contexts:
+                result_pdf_response(request, result_context, 'marksheet.pdf').close()
+
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=media_root, RESULT_PDF_WORKERS=workers):
+                _, _, live_ms = measure(render_all)
+                _, _, prerender_ms = measure(prerender_all)
+                _, _, served_ms = measure(serve_all)
+        finally:
+            shutil.rmtree(media_root)
+        return {
+            'students': size,
+            'workers': workers,
+            'live_ms': live_ms,
+            'prerender_wall_ms': prerender_ms,
+            'served_ms': served_ms,
+        }
+
+    return [run_isolated(run, size) for size in sizes]
+
+
+@scenario('upload_parse')
+def bench_upload_parse(sizes):
+    """Parsing a student sheet: the old iterrows() loop vs the STUDENT_UPLOAD schema."""
+    import re
+
+    import pandas as pd
+
+    from .ingest import STUDENT_UPLOAD
+
+    def iterrows_parse(df, resolved):
+        rows = []
+        for i, row in df.iterrows():
+            enroll = str(row[resolved['enrollment_no']]).strip()
+            name = str(row[resolved['name']]).strip()
+            year_value = row.get(resolved['admission_year'])
+            admission_year = None if pd.isna(year_value) else int(float(str(year_value).strip()))
+            elective_raw = str(row[resolved['elective_codes']]).strip()
+            rows.append((
+                i + 1, enroll, name, str(row[resolved['division']]).strip() or 'A', admission_year,
+                str(row[resolved['mentor_name']]).strip(), str(row[resolved['email']]), str(row[resolved['phone']]),
+                [code.strip().upper() for code in re.split(r'[;,|]+', elective_raw) if code.strip()],
+            ))
+        return rows
+
+    results = []
+    for size in sizes:
+        df = _student_sheet_frame(size, ['EL0', 'EL1', 'EL2'])
+        legacy_df = df.rename(columns=lambda name: name.lower().replace(' ', '_'))
+        resolved = STUDENT_UPLOAD.resolve(dict(zip(legacy_df.columns, legacy_df.columns)))
+        _, _, iterrows_ms = measure(iterrows_parse, legacy_df, resolved)
+        parsed, _, vectorised_ms = measure(STUDENT_UPLOAD.parse_frame, df)
+        assert len(parsed.rows) == size and not parsed.errors
+        results.append({'rows': size, 'iterrows_ms': iterrows_ms, 'vectorised_ms': vectorised_ms})
+    return results
+
+
+@scenario('upload_stream')
+def bench_upload_stream(sizes):
+    """Peak traced memory parsing a result-sheet CSV whole vs in UPLOAD_CHUNK_ROWS chunks."""
+    import csv
+    import os
+    import tempfile
+    import tracemalloc
+
+    from .ingest import RESULT_UPLOAD, iter_table, read_table
+
+    def parse_whole(upload):
+        return len(RESULT_UPLOAD.parse(read_table(upload)).rows)
+
+    def parse_streamed(upload):
+        return sum(len(part.rows) for part in RESULT_UPLOAD.parse_chunks(iter_table(upload)))
+
+    def traced(func, path):
+        with open(path, 'rb') as upload:
+            tracemalloc.start()
+            started = time.perf_counter()
+            rows = func(upload)
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return rows, peak // 1024, round(elapsed_ms, 1)
+
+    results = []
+    for size in sizes:
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False) as handle:
+            writer = csv.writer(handle)
+            writer.writerow(['enrollment_no', 'semester', 'exam_session', 'issued_date', 'spi', 'cpi',
+                             'course_code', 'course_name', 'course_credit', 'grade', 'result_status'])
+            for idx in range(size):
+                writer.writerow([f'26RS{idx // 8:06d}', 5, 'NOV-2026', '2026-11-20', '8.25', '7.90',
+                                 f'CS{idx % 8:03d}', f'Course {idx % 8}', 4, 'AB', 'PASS'])
+        try:
+            file_kb = os.path.getsize(handle.name) // 1024
+            whole_rows, whole_kb, whole_ms = traced(parse_whole, handle.name)
+            streamed_rows, streamed_kb, streamed_ms = traced(parse_streamed, handle.name)
+        finally:
+            os.unlink(handle.name)
+        assert whole_rows == streamed_rows == size
+        results.append({
+            'rows': size,
+            'file_kb': file_kb,
+            'whole_peak_kb': whole_kb,
+            'whole_ms': whole_ms,
+            'streamed_peak_kb': streamed_kb,
+            'streamed_ms': streamed_ms,
+        })
+    return results
+
+
+def measure_peak_rss(func, *args):
+    """Run func in a forked child; return (elapsed_ms, peak RSS growth in KB).
+
+    ru_maxrss is a process-wide high-water mark, so each call gets a fresh
+    process that starts at the parent's current RSS. func must not use the
+    database connection.
+    """
+    import multiprocessing
+    import resource
+
+    def child(conn):
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        func(*args)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        conn.send((round(elapsed_ms, 1), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline))
+        conn.close()
+
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=child, args=(sender,))
+    process.start()
+    result = receiver.recv()
+    process.join()
+    return result
+
+
+@scenario('excel_read')
+def bench_excel_read(sizes):
+    """Reading a consolidated-style .xlsx (60 columns): pd.read_excel vs the read-only
+    values_only reader (whole raw frame, and streamed string chunks)."""
+    import os
+    import tempfile
+
+    import pandas as pd
+    from openpyxl import Workbook
+
+    from .ingest import iter_table, read_workbook
+
+    subjects = [f'CS{idx:03d}' for idx in range(27)]
+    header = ['Sr', 'Enrollment No', 'Student Name']
+    for code in subjects:
+        header += [f'{code} Course {code[2:]} GP', 'REM']
+    header += ['SPI', 'CPI', 'Result']
+
+    def read_pandas(path):
+        pd.read_excel(path, header=None)
+
+    def read_raw(path):
+        with open(path, 'rb') as upload:
+            read_workbook(upload)
+
+    def read_streamed(path):
+        with open(path, 'rb') as upload:
+            for _ in iter_table(upload):
+                pass
+
+    results = []
+    for size in sizes:
+        with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as handle:
+            path = handle.name
+        try:
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet()
+            sheet.append(['UNIVERSITY RESULT - SEMESTER 5 - NOV-2026'])
+            sheet.append(header)
+            for idx in range(size):
+                row = [idx + 1, f'26CE{idx:06d}', f'{FIRST_NAMES[idx % 20]} {LAST_NAMES[(idx // 20) % 20]}']
+                for offset in range(len(subjects)):
+                    row += [('AA', 'AB', 'BB', 'BC', 'CC')[(idx + offset) % 5], '']
+                row += [round(6 + (idx % 40) / 10, 2), round(6.5 + (idx % 30) / 10, 2), 'PASS']
+                sheet.append(row)
+            workbook.save(path)
+
+            pandas_ms, pandas_kb = measure_peak_rss(read_pandas, path)
+            raw_ms, raw_kb = measure_peak_rss(read_raw, path)
+            streamed_ms, streamed_kb = measure_peak_rss(read_streamed, path)
+            results.append({
+                'rows': size,
+                'columns': len(header),
+                'file_kb': os.path.getsize(path) // 1024,
+                'pandas_ms': pandas_ms,
+                'pandas_rss_kb': pandas_kb,
+                'read_only_ms': raw_ms,
+                'read_only_rss_kb': raw_kb,
+                'streamed_ms': streamed_ms,
+                'streamed_rss_kb': streamed_kb,
+            })
+        finally:
+            os.unlink(path)
+    return results
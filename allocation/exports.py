@@ -0,0 +1,46 @@
+import csv
+import io
+
+from django.http import StreamingHttpResponse
+
+
+# Rows are flushed to the client whenever the buffer grows past this size.
+CSV_STREAM_FLUSH_BYTES = 64 * 1024
+# Rows fetched per round-trip when streaming from a queryset.
+CSV_STREAM_CHUNK_SIZE = 2000
+
+
+def iter_csv(header, rows, flush_bytes=CSV_STREAM_FLUSH_BYTES):
+    """Yield CSV text in ~flush_bytes pieces; the header goes out immediately."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= flush_bytes:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    tail = buffer.getvalue()
+    if tail:
+        yield tail
+
+
+def iter_queryset_rows(queryset, fields, transform=None, chunk_size=CSV_STREAM_CHUNK_SIZE):
+    """Stream `values_list(*fields)` tuples with a server-side cursor, optionally mapped by transform."""
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    if transform is None:
+        return rows
+    return (transform(row) for row in rows)
+
+
+def streaming_csv_response(filename, header, rows):
+    """StreamingHttpResponse attachment for an iterable of CSV rows."""
+    response = StreamingHttpResponse(iter_csv(header, rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth.models import User
+from django.db.models import Q
 from .models import Faculty, Student, Subject, Attendance, Branch, Semester, Notice
 from datetime import date
 import csv
@@ -293,6 +294,47 @@ class MarksheetUploadForm(forms.Form):
         widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.xlsx,.xls,.csv'})
     )
 
+class MarksAuditFilterForm(forms.Form):
+    subject = forms.ModelChoiceField(
+        queryset=Subject.objects.none(),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    exam_session = forms.CharField(
+        required=False,
+        max_length=50,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g. OCT 2026'})
+    )
+    changed_by = forms.ModelChoiceField(
+        queryset=User.objects.none(),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    enrollment_no = forms.CharField(
+        required=False,
+        max_length=20,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Enrollment number'})
+    )
+    date_from = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    date_to = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['subject'].queryset = Subject.objects.select_related('semester').order_by('semester__number', 'code')
+        self.fields['changed_by'].queryset = (
+            User.objects.filter(Q(is_staff=True) | Q(faculty__isnull=False))
+            .distinct()
+            .order_by('first_name', 'last_name', 'username')
+        )
+        self.fields['changed_by'].label_from_instance = lambda user: user.get_full_name() or user.username
+
+
 class ResultLookupForm(forms.Form):
     enrollment_no = forms.CharField(
         max_length=20,
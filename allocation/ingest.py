@@ -0,0 +1,673 @@
+"""Declarative parsing and bulk write paths for spreadsheet uploads.
+
+Each upload declares a Schema: its target fields with header aliases, a
+type, whether the column and a value are required, a default and extra
+checks. Schema.parse() finds the header row, resolves the aliases, coerces
+every column and collects "Row N: ..." messages column-wise (vectorised
+operations and masks instead of ``iterrows()``), returning plain row
+tuples for the rows that passed. The write helpers then store the rows
+with a fixed number of queries per batch inside one transaction.
+
+Large CSV and .xlsx uploads are read with iter_table() in chunks of
+settings.UPLOAD_CHUNK_ROWS rows and parsed with Schema.parse_chunks(), so
+a view can validate and store one chunk per transaction and report
+progress (report_upload_progress) without holding the whole file.
+"""
+import re
+import string
+from collections import namedtuple
+from itertools import chain, islice
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.functions import Upper
+
+from .attendance import enrollments_changed
+from .models import ResultEntry, ResultSheet, Semester, Student, StudentSubject, Subject
+from .profile_cache import bump_student_data_version
+from .result_cache import warm_public_results
+from .result_pdfs import prerender_result_pdfs
+
+
+INGEST_BATCH_SIZE = 500
+CODE_SEPARATORS = r'[;,|]+'
+# Rows searched for the header when it is not the first row (title lines above it).
+HEADER_SCAN_ROWS = 20
+FIELD_KINDS = ('text', 'int', 'number', 'date', 'codes')
+UPLOAD_PROGRESS_TIMEOUT = 3600
+UPLOAD_TOKEN_RE = re.compile(r'[\w-]{8,64}')
+
+ParsedSheet = namedtuple('ParsedSheet', ['rows', 'errors', 'missing', 'total'])
+
+
+def _is_legacy_excel(upload):
+    return str(upload.name).lower().endswith('.xls')
+
+
+def iter_workbook_rows(upload):
+    """Yield the first worksheet of an .xlsx upload as tuples of cell values.
+
+    The workbook is opened read-only with cached formula values and walked
+    with iter_rows(values_only=True), so no cell objects, styles or whole
+    sheet are held in memory. Error cells ('#N/A', ...) come back as None.
+    """
+    from openpyxl import load_workbook
+    from openpyxl.cell.cell import ERROR_CODES
+
+    upload.seek(0)
+    workbook = load_workbook(upload, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook.worksheets[0]
+        # Some writers store a wrong sheet size; read the rows that are actually there.
+        sheet.reset_dimensions()
+        error_codes = frozenset(ERROR_CODES)
+        for row in sheet.iter_rows(values_only=True):
+            if error_codes.isdisjoint(row):
+                yield row
+            else:
+                yield tuple(None if value in error_codes else value for value in row)
+    finally:
+        workbook.close()
+
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if value.__class__ is float and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _text_frame(rows, width=None):
+    """Rows of cell values -> DataFrame of strings, padded/cut to `width` columns."""
+    texts = [[_cell_text(value) for value in row] for row in rows]
+    if width is None:
+        width = max((len(row) for row in texts), default=0)
+    return pd.DataFrame(
+        [row[:width] + [''] * (width - len(row)) for row in texts],
+        columns=range(width), dtype=str,
+    )
+
+
+def read_table(upload):
+    """Read an uploaded CSV/Excel sheet without a header, every cell a string ('' when blank).
+
+    Raises ValueError with the reader's message when the file cannot be read.
+    """
+    try:
+        if str(upload.name).lower().endswith('.csv'):
+            return pd.read_csv(upload, header=None, dtype=str, keep_default_na=False)
+        if _is_legacy_excel(upload):
+            upload.seek(0)
+            return pd.read_excel(upload, header=None, dtype=str, keep_default_na=False)
+        return _text_frame(iter_workbook_rows(upload))
+    except Exception as exc:
+        raise ValueError(str(exc).strip()) from exc
+
+
+def read_workbook(upload):
+    """First worksheet as a DataFrame of raw cell values, like pd.read_excel(header=None).
+
+    .xlsx files go through the streaming read-only reader; .xls files need
+    pandas (xlrd).
+    """
+    if _is_legacy_excel(upload):
+        upload.seek(0)
+        return pd.read_excel(upload, header=None)
+    return pd.DataFrame(list(iter_workbook_rows(upload)))
+
+
+def iter_table(upload, chunk_rows=None):
+    """Yield an uploaded sheet as read_table() frames of at most `chunk_rows` rows.
+
+    CSV files are streamed with pandas' chunked reader and .xlsx files with
+    iter_workbook_rows(); .xls files are read whole and yielded once.
+    Raises ValueError (possibly after earlier chunks) when the file cannot
+    be read.
+    """
+    chunk_rows = chunk_rows or settings.UPLOAD_CHUNK_ROWS
+    try:
+        if str(upload.name).lower().endswith('.csv'):
+            reader = pd.read_csv(upload, header=None, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+            with reader:
+                yield from reader
+        elif _is_legacy_excel(upload):
+            yield read_table(upload)
+        else:
+            rows = iter_workbook_rows(upload)
+            width = None
+            while batch := list(islice(rows, chunk_rows)):
+                # Later chunks keep the first chunk's width, which holds the header row.
+                frame = _text_frame(batch, width)
+                width = len(frame.columns)
+                yield frame
+    except Exception as exc:
+        raise ValueError(str(exc).strip()) from exc
+
+
+def upload_progress_key(token):
+    return f'upload-progress:{token}'
+
+
+def report_upload_progress(token, **state):
+    """Publish the progress of a running upload (rows, created, errors, done...)."""
+    if token and UPLOAD_TOKEN_RE.fullmatch(token):
+        cache.set(upload_progress_key(token), state, UPLOAD_PROGRESS_TIMEOUT)
+
+
+def upload_progress(token):
+    """The last reported state of an upload, or None."""
+    if not token or not UPLOAD_TOKEN_RE.fullmatch(token):
+        return None
+    return cache.get(upload_progress_key(token))
+
+
+def read_percent(upload):
+    """How far the reader has got through an uploaded file, as 0-100."""
+    try:
+        return min(100, upload.tell() * 100 // upload.size) if upload.size else 100
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def header_key(value):
+    """Header cell -> match key: 'Enrollment No.', 'enrollment_no' -> 'enrollmentno'."""
+    return re.sub(r'[^a-z0-9]+', '', str(value).strip().lower())
+
+
+def text_column(df, column):
+    """Column as trimmed strings with missing cells as '' (a vectorised _clean_cell).
+
+    Float columns holding only whole numbers (what pandas makes of numeric
+    ids once a cell is blank) are rendered without the trailing '.0'.
+    """
+    if column is None or column not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    series = df[column]
+    if pd.api.types.is_string_dtype(series) and not series.hasnans:
+        # read_table() frames: already strings, blank cells are ''.
+        return series.str.strip()
+    if pd.api.types.is_float_dtype(series):
+        present = series.dropna()
+        if len(present) and (present % 1 == 0).all():
+            series = series.astype('Int64')
+    return series.astype(object).where(series.notna(), '').astype(str).str.strip()
+
+
+def split_codes(text, upper=True):
+    """Split 'A, B; C|D' cells into lists of trimmed, non-empty codes."""
+    parts = (text.str.upper() if upper else text).str.split(CODE_SEPARATORS, regex=True)
+    return pd.Series(
+        [[code.strip() for code in codes if code.strip()] for codes in parts.tolist()],
+        index=text.index, dtype=object,
+    )
+
+
+def row_errors(row_numbers, checks):
+    """Evaluate (mask, message) checks in order, first failing check wins.
+
+    A message is a string or a per-row Series of strings. Returns the
+    per-row message array ('' for rows that passed) and "Row N: message"
+    strings for the failed rows, in sheet order.
+    """
+    if not checks:
+        return np.full(len(row_numbers), '', dtype=object), []
+    messages = np.select(
+        [np.asarray(mask, dtype=bool) for mask, _ in checks],
+        [message.to_numpy(dtype=object) if isinstance(message, pd.Series) else message for _, message in checks],
+        default='',
+    )
+    failed = messages != ''
+    return messages, [f'Row {row_no}: {message}' for row_no, message in zip(row_numbers[failed], messages[failed])]
+
+
+def optional_values(values):
+    """Series -> list with NaN/NaT replaced by None."""
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+class Field:
+    """One target column of an upload schema.
+
+    kind is 'text', 'int', 'number' (float), 'date' or 'codes' (a list split
+    on , ; |). `required` means the column must be present, `blank=False`
+    that every row needs a value. A non-blank cell that does not coerce is
+    reported with `invalid` when given, otherwise it becomes None. `checks`
+    are (predicate, message) pairs; the predicate gets the coerced Series
+    and returns the mask of bad rows. Messages may name other fields, as in
+    'invalid semester for {enrollment_no}'.
+    """
+
+    def __init__(self, name, aliases=(), kind='text', required=False, blank=True,
+                 default=None, upper=False, invalid=None, checks=()):
+        if kind not in FIELD_KINDS:
+            raise ValueError(f'Unknown field kind: {kind}')
+        self.name = name
+        self.aliases = (name, *aliases)
+        self.kind = kind
+        self.required = required
+        self.blank = blank
+        self.default = default
+        self.upper = upper
+        self.invalid = invalid
+        self.checks = tuple(checks)
+
+    def coerce(self, text):
+        """Trimmed text Series -> (values, mask of non-blank cells that did not coerce)."""
+        if self.kind in ('text', 'codes'):
+            values = text.str.upper() if self.upper else text
+            if self.kind == 'codes':
+                values = split_codes(values, upper=False)
+            elif self.default is not None:
+                values = values.where(values.ne(''), self.default)
+            return values, pd.Series(False, index=text.index)
+
+        present = text.ne('')
+        if self.kind == 'date':
+            values = pd.to_datetime(text.where(present), errors='coerce', format='mixed')
+        else:
+            values = pd.to_numeric(text.where(present), errors='coerce')
+            if self.kind == 'int':
+                values = np.trunc(values)
+        return values, present & values.isna()
+
+    def to_list(self, values):
+        if self.kind in ('text', 'codes'):
+            return values.tolist()
+        if self.kind == 'date':
+            return optional_values(values.dt.date)
+        values = optional_values(values)
+        if self.kind == 'int':
+            return [None if value is None else int(value) for value in values]
+        return values
+
+
+class Schema:
+    """An upload layout: ordered Fields plus the message for blank required values.
+
+    Rows come back as namedtuples `<name>(row_index, <field names>...)`
+    where row_index counts data rows from 1 below the header.
+    """
+
+    def __init__(self, name, fields, blank_message='missing required fields'):
+        self.fields = list(fields)
+        self.blank_message = blank_message
+        self.row = namedtuple(name, ['row_index', *[field.name for field in self.fields]])
+        self._aliases = {field.name: [header_key(alias) for alias in field.aliases] for field in self.fields}
+
+    @property
+    def required(self):
+        return [field.name for field in self.fields if field.required]
+
+    def resolve(self, headers):
+        """{field name: column} for the header cells that match an alias (first alias wins)."""
+        by_key = {}
+        for column, value in headers.items():
+            by_key.setdefault(header_key(value), column)
+        resolved = {}
+        for field in self.fields:
+            for key in self._aliases[field.name]:
+                if key in by_key:
+                    resolved[field.name] = by_key[key]
+                    break
+        return resolved
+
+    def parse(self, raw):
+        """Parse a whole sheet read with read_table() into one ParsedSheet."""
+        return next(self.parse_chunks([raw]))
+
+    def parse_chunks(self, chunks):
+        """Lazily parse read_table()-style chunks (see iter_table), one ParsedSheet each.
+
+        The header is the first of the top HEADER_SCAN_ROWS rows of the first
+        chunk that names every required field, falling back to the first
+        row. Row numbers carry on across chunks. When required columns are
+        missing a single ParsedSheet with `missing` set is yielded.
+        """
+        chunks = iter(chunks)
+        first = next(chunks, None)
+        if first is None or first.empty:
+            yield ParsedSheet([], [], self.required, 0)
+            return
+        header_pos = 0
+        for pos in range(min(len(first.index), HEADER_SCAN_ROWS)):
+            resolved = self.resolve(first.iloc[pos])
+            if all(name in resolved for name in self.required):
+                header_pos = pos
+                break
+        header = pd.Index([str(value).strip() for value in first.iloc[header_pos]])
+        # Unnamed/duplicate header cells must not shadow each other.
+        keep = np.flatnonzero(~header.duplicated())
+
+        first_row = 1
+        for chunk in chain([first.iloc[header_pos + 1:]], chunks):
+            df = chunk.iloc[:, keep]
+            df.columns = header[keep]
+            parsed = self.parse_frame(df, first_row)
+            yield parsed
+            if parsed.missing:
+                return
+            first_row += len(df)
+
+    def parse_frame(self, df, first_row=1):
+        """Parse a DataFrame whose columns are the sheet headers into a ParsedSheet.
+
+        `missing` lists required fields without a column (no rows are parsed
+        then). Rows blank in every schema column are ignored; `total` counts
+        the others. `errors` holds "Row N: ..." for the rejected rows, rows
+        being numbered from `first_row`.
+        """
+        df = df.reset_index(drop=True)
+        resolved = self.resolve(dict(zip(df.columns, df.columns)))
+        missing = [name for name in self.required if name not in resolved]
+        if missing:
+            return ParsedSheet([], [], missing, 0)
+
+        texts = {field.name: text_column(df, resolved.get(field.name)) for field in self.fields}
+        filled = np.logical_or.reduce([text.ne('').to_numpy() for text in texts.values()])
+        if not filled.all():
+            texts = {name: text[filled] for name, text in texts.items()}
+        row_numbers = np.arange(first_row, first_row + len(df))[filled]
+
+        checks = []
+        required_blank = [texts[field.name].eq('') for field in self.fields if not field.blank]
+        if required_blank:
+            checks.append((np.logical_or.reduce(required_blank), self.blank_message))
+        values = {}
+        for field in self.fields:
+            values[field.name], invalid = field.coerce(texts[field.name])
+            if field.invalid:
+                checks.append((invalid, self._message(field.invalid, texts)))
+        for field in self.fields:
+            for predicate, message in field.checks:
+                checks.append((predicate(values[field.name]).fillna(False), self._message(message, texts)))
+        messages, errors = row_errors(row_numbers, checks)
+
+        valid = messages == ''
+        columns = [row_numbers[valid].tolist()]
+        columns += [field.to_list(values[field.name][valid]) for field in self.fields]
+        rows = [self.row(*values) for values in zip(*columns)]
+        return ParsedSheet(rows, errors, [], len(row_numbers))
+
+    @staticmethod
+    def _message(template, texts):
+        """Message template -> str, or a per-row Series when it names fields."""
+        pieces = [
+            piece
+            for literal, name, _, _ in string.Formatter().parse(template)
+            for piece in (literal, texts[name] if name is not None else '')
+            if isinstance(piece, pd.Series) or piece
+        ]
+        if not any(isinstance(piece, pd.Series) for piece in pieces):
+            return template
+        message = pd.Series('', index=next(iter(texts.values())).index, dtype=object)
+        for piece in pieces:
+            message = message + piece
+        return message
+
+
+# ============= STUDENT UPLOAD =============
+
+ELECTIVE_CODE_ALIASES = ('elective', 'electives', 'elective_subjects', 'elective_codes', 'subjects', 'subject_codes', 'subject_code')
+
+STUDENT_UPLOAD = Schema('StudentRow', [
+    Field('enrollment_no', ['enrollment', 'enrollment_number'], required=True, blank=False),
+    Field('name', ['student_name', 'fullname'], required=True, blank=False),
+    Field('division', ['div'], default='A'),
+    Field('admission_year', ['admissionyear', 'year_of_admission', 'year'], kind='int',
+          invalid='invalid admission year',
+          checks=[(lambda year: (year < 2000) | (year > 2100), 'admission year must be between 2000 and 2100')]),
+    Field('mentor_name', ['mentor', 'class_teacher']),
+    Field('email', ['mail']),
+    Field('phone', ['mobile', 'contact']),
+    Field('elective_codes', ELECTIVE_CODE_ALIASES, kind='codes', upper=True),
+    Field('elective_display', ELECTIVE_CODE_ALIASES),
+])
+StudentRow = STUDENT_UPLOAD.row
+
+
+def bulk_create_students(rows, branch, semester, batch_size=INGEST_BATCH_SIZE):
+    """Create students for StudentRow tuples, plus their elective enrolments.
+
+    Rows whose enrollment number already exists (in the database or earlier
+    in the sheet) are skipped. Existing numbers are read in one IN query,
+    then students and elective enrolments are bulk-created in batches in
+    one transaction. Returns {'created', 'skipped', 'errors'} where errors
+    are "Row N: ..." messages for unknown or non-elective subject codes.
+    """
+    existing = set(
+        Student.objects.filter(enrollment_no__in={r.enrollment_no for r in rows})
+        .values_list('enrollment_no', flat=True)
+    )
+    new_rows, skipped = [], 0
+    for r in rows:
+        if r.enrollment_no in existing:
+            skipped += 1
+            continue
+        existing.add(r.enrollment_no)
+        new_rows.append(r)
+
+    subjects = list(Subject.objects.filter(branch=branch, semester=semester))
+    subject_lookup = {s.code.strip().upper(): s for s in subjects}
+    elective_lookup = {s.code.strip().upper(): s for s in subjects if s.is_elective}
+
+    errors, enrollments = [], []
+    with transaction.atomic():
+        students = Student.objects.bulk_create([
+            Student(
+                enrollment_no=r.enrollment_no,
+                name=r.name,
+                division=r.division,
+                admission_year=r.admission_year,
+                mentor_name=r.mentor_name,
+                email=r.email,
+                phone=r.phone,
+                branch=branch,
+                semester=semester,
+            )
+            for r in new_rows
+        ], batch_size=batch_size)
+
+        for r, student in zip(new_rows, students):
+            # dict.fromkeys: a code repeated in one cell enrols the student once.
+            for code in dict.fromkeys(r.elective_codes):
+                subject = elective_lookup.get(code)
+                if subject is None:
+                    if code in subject_lookup:
+                        errors.append(f"Row {r.row_index}: {code} is not marked as an elective subject.")
+                    else:
+                        errors.append(f"Row {r.row_index}: elective code {code} not found in this branch/semester.")
+                    continue
+                enrollments.append(StudentSubject(student=student, subject=subject))
+        StudentSubject.objects.bulk_create(enrollments, batch_size=batch_size)
+
+    # bulk_create skips the post_save receivers that keep risk and cached profiles in step.
+    enrollments_changed([e.student_id for e in enrollments])
+    return {'created': len(students), 'skipped': skipped, 'errors': errors}
+
+
+# ============= RESULT SHEET UPLOAD =============
+
+RESULT_UPLOAD = Schema('ResultRow', [
+    Field('enrollment_no', ['enrollment', 'enrollment_number'], required=True, blank=False),
+    Field('semester', ['sem', 'sem_no'], kind='int', required=True, blank=False,
+          invalid='invalid semester for {enrollment_no}'),
+    Field('exam_session', ['exam', 'session', 'exam_month'], required=True, blank=False),
+    Field('issued_date', ['issue_date', 'date'], kind='date', invalid='invalid issued date for {enrollment_no}'),
+    Field('spi', kind='number'),
+    Field('cpi', kind='number'),
+    Field('earned_credits', ['earned_credit'], kind='number'),
+    Field('earned_grade_points', ['earned_gp', 'earned_points'], kind='number'),
+    Field('total_credits', ['total_credit'], kind='number'),
+    Field('total_grade_points', ['total_gp', 'total_points'], kind='number'),
+    Field('result_status', ['result'], default='PASS'),
+    Field('course_code', ['code', 'subject_code', 'coursecode'], required=True, blank=False),
+    Field('course_name', ['subject_name', 'name'], required=True, blank=False),
+    Field('course_credit', ['credit', 'course_credits'], kind='number', required=True, blank=False,
+          invalid='invalid course credit for {course_code}'),
+    Field('grade', required=True),
+])
+ResultRow = RESULT_UPLOAD.row
+
+
+def save_result_rows(rows, written, batch_size=INGEST_BATCH_SIZE):
+    """Store ResultRow tuples as ResultSheets with their ResultEntry courses.
+
+    `written` is the set of (student_id, semester_id, exam_session) sheets
+    this upload has already stored and is updated in place: the courses of
+    such a sheet are added to rather than replaced, so a student's rows may
+    be split across chunks. Students are resolved with one query on the
+    upper-cased enrollment number and semesters are read once; the sheets
+    are upserted with bulk_create(update_conflicts=True) and their courses
+    replaced with one DELETE and one bulk insert, all in one transaction.
+    The caller publishes the results once the last chunk is stored
+    (publish_results). Returns {'created', 'updated', 'errors', 'rows', 'sheets'} where rows
+    are the accepted tuples and sheets maps each stored key to (semester
+    number, exam session).
+    """
+    students = {}
+    for student in (
+        Student.objects.annotate(enrollment_key=Upper('enrollment_no'))
+        .filter(enrollment_key__in={r.enrollment_no.upper() for r in rows})
+        .only('id', 'enrollment_no', 'semester_id')
+    ):
+        students.setdefault(student.enrollment_key, student)
+    semesters = {}
+    for semester_obj in Semester.objects.all():
+        semesters.setdefault(semester_obj.number, semester_obj)
+
+    errors, accepted = [], []
+    sheet_map = {}
+    entries_map = {}
+    for r in rows:
+        student = students.get(r.enrollment_no.upper())
+        if not student:
+            errors.append(f"Row {r.row_index}: student not found ({r.enrollment_no})")
+            continue
+
+        semester_obj = semesters.get(r.semester)
+        if not semester_obj:
+            errors.append(f"Row {r.row_index}: semester not found ({r.semester})")
+            continue
+
+        if student.semester_id != semester_obj.id:
+            errors.append(f"Row {r.row_index}: semester mismatch for {r.enrollment_no}")
+            continue
+
+        key = (student.id, semester_obj.id, r.exam_session)
+        if key not in sheet_map:
+            sheet_map[key] = (semester_obj, r)
+        entries_map.setdefault(key, []).append(r)
+        accepted.append(r)
+
+    created = 0
+    updated = 0
+    if sheet_map:
+        with transaction.atomic():
+            sheet_ids = _result_sheet_ids(sheet_map)
+            # Sheet values come from the sheet's first row; later chunks only add courses.
+            fresh = [key for key in sheet_map if key not in written]
+            replaced = [sheet_ids[key] for key in fresh if key in sheet_ids]
+            updated = len(replaced)
+            created = len(fresh) - updated
+
+            sheets = []
+            for key in fresh:
+                r = sheet_map[key][1]
+                sheets.append(ResultSheet(
+                    student_id=key[0],
+                    semester_id=key[1],
+                    exam_session=key[2],
+                    issued_date=r.issued_date,
+                    spi=r.spi,
+                    cpi=r.cpi,
+                    earned_credits=r.earned_credits,
+                    earned_grade_points=r.earned_grade_points,
+                    total_credits=r.total_credits,
+                    total_grade_points=r.total_grade_points,
+                    result_status=r.result_status,
+                ))
+            ResultSheet.objects.bulk_create(
+                sheets, batch_size=batch_size, update_conflicts=True,
+                unique_fields=['student', 'semester', 'exam_session'],
+                update_fields=[
+                    'issued_date', 'spi', 'cpi', 'earned_credits', 'earned_grade_points',
+                    'total_credits', 'total_grade_points', 'result_status',
+                ],
+            )
+            if created:
+                sheet_ids = _result_sheet_ids(sheet_map)
+
+            ResultEntry.objects.filter(result_sheet_id__in=replaced).delete()
+            ResultEntry.objects.bulk_create([
+                ResultEntry(
+                    result_sheet_id=sheet_ids[key],
+                    course_code=e.course_code,
+                    course_name=e.course_name,
+                    course_credit=e.course_credit,
+                    grade=e.grade
+                )
+                for key, entries in entries_map.items()
+                for e in entries
+            ], batch_size=batch_size)
+            written.update(fresh)
+            # bulk_create() sends no post_save, which is what drops cached profiles.
+            bump_student_data_version(key[0] for key in fresh)
+
+    return {
+        'created': created,
+        'updated': updated,
+        'errors': errors,
+        'rows': accepted,
+        'sheets': {key: (semester_obj.number, r.exam_session) for key, (semester_obj, r) in sheet_map.items()},
+    }
+
+
+def _result_sheet_ids(keys):
+    """{(student_id, semester_id, exam_session): ResultSheet id} for the keys that exist."""
+    student_ids = {key[0] for key in keys}
+    semester_ids = {key[1] for key in keys}
+    sessions = {key[2] for key in keys}
+    return {
+        (student_id, semester_id, exam_session): sheet_id
+        for student_id, semester_id, exam_session, sheet_id in ResultSheet.objects.filter(
+            student_id__in=student_ids, semester_id__in=semester_ids, exam_session__in=sessions,
+        ).values_list('student_id', 'semester_id', 'exam_session', 'id')
+        if (student_id, semester_id, exam_session) in keys
+    }
+
+
+def publish_results(student_ids):
+    """Make an upload's results public; call once after its last chunk is stored.
+
+    Rebuilds the students' cached public results (three queries) and, when
+    settings.RESULT_PDF_WORKERS is set, queues their marksheet PDFs on the
+    render pool.
+    """
+    prerender_result_pdfs(warm_public_results(student_ids).values())
+
+
+# ============= ELECTIVE ENROLMENT UPLOAD =============
+
+ELECTIVE_UPLOAD = Schema('ElectiveRow', [
+    Field('enrollment_no', required=True, blank=False),
+    Field('elective_group', required=True, blank=False, upper=True),
+    Field('subject_code', required=True, blank=False, upper=True),
+], blank_message='missing enrollment_no, elective_group, or subject_code.')
+
+
+# ============= ATTENDANCE REPORT STUDENTS =============
+
+ATTENDANCE_STUDENTS_UPLOAD = Schema('AttendanceStudentRow', [
+    Field('enrollment_no', ['enrollment', 'enrolmentno', 'enrolment'], required=True),
+    Field('name', ['studentname', 'student'], required=True),
+    Field('division', ['div']),
+    Field('elective', ['electives', 'electivesubject'], kind='codes'),
+    Field('elective_1', ['elective1', 'electiveone', 'electivefirst']),
+    Field('elective_2', ['elective2', 'electivesecond']),
+    Field('room_no', ['roomnumber', 'room']),
+    Field('exam_no', ['examnumber', 'seatno']),
+])
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from allocation.benchmarks import SCENARIOS
+
+
+class Command(BaseCommand):
+    help = 'Run synthetic performance benchmarks against a temporary test database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS), help='Benchmark scenario to run.')
+        parser.add_argument(
+            '--sizes',
+            default='100,500,2000',
+            help='Comma-separated data sizes to benchmark (default: 100,500,2000).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(part) for part in options['sizes'].split(',') if part.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers.')
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            rows = SCENARIOS[options['scenario']](sizes)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for row in rows:
+            self.stdout.write('  '.join(f'{key}={value}' for key, value in row.items()))
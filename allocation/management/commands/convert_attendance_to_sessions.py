@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from allocation.attendance import convert_rows_to_sessions
+from allocation.models import Subject
+
+
+class Command(BaseCommand):
+    help = 'Convert per-student Attendance rows into ClassSession headers with absence-only rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subject', action='append', default=[], help='Subject code to convert (repeatable; default all).')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be converted without writing.')
+
+    def handle(self, *args, **options):
+        subjects = None
+        if options['subject']:
+            subjects = Subject.objects.filter(code__in=options['subject'])
+            if not subjects.exists():
+                raise CommandError('No subjects match the given codes.')
+
+        stats = convert_rows_to_sessions(subjects, dry_run=options['dry_run'])
+        prefix = 'Would convert' if options['dry_run'] else 'Converted'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {stats.get('rows_converted', 0)} attendance rows into {stats.get('sessions', 0)} sessions "
+            f"with {stats.get('absences', 0)} absence rows."
+        ))
+        if stats.get('groups_kept'):
+            self.stdout.write(
+                f"Kept {stats['rows_kept']} rows in {stats['groups_kept']} classes that already have a session "
+                "(they are still counted)."
+            )
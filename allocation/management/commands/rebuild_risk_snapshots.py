@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from allocation.models import Student, StudentRiskSnapshot
+from allocation.risk import refresh_risk_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored risk snapshot for every student (or only missing ones).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing-only', action='store_true', help='Only build snapshots for students without one.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        students = Student.objects.order_by('id')
+        if options['missing_only']:
+            students = students.filter(risk_snapshot__isnull=True)
+        else:
+            # Students deleted since the last rebuild are already gone via CASCADE.
+            StudentRiskSnapshot.objects.exclude(student__in=Student.objects.all()).delete()
+
+        student_ids = list(students.values_list('id', flat=True))
+        refreshed = refresh_risk_snapshots(student_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt risk snapshots for {refreshed} students.'))
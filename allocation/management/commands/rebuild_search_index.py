@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from allocation.search import ensure_search_index
+
+
+class Command(BaseCommand):
+    help = 'Create the SQLite FTS5 search tables/triggers if missing and rebuild their contents.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        rebuilt = ensure_search_index(using=options['database'], rebuild=True)
+        if rebuilt:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt search index: {', '.join(rebuilt)}."))
+        else:
+            self.stdout.write(self.style.WARNING('FTS5 is not available on this database; search uses LIKE filters.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from allocation.attendance import refresh_attendance_rollups
+from allocation.models import AttendanceRollup, Student
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly attendance rollups from raw attendance, fixing any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Students recomputed per batch.')
+
+    def handle(self, *args, **options):
+        # Rollups of deleted students are already gone via CASCADE.
+        student_ids = list(Student.objects.order_by('id').values_list('id', flat=True))
+        batch_size = options['batch_size']
+        fixed = 0
+        for offset in range(0, len(student_ids), batch_size):
+            fixed += refresh_attendance_rollups(student_ids[offset:offset + batch_size])
+
+        total = AttendanceRollup.objects.count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled attendance rollups for {len(student_ids)} students: {fixed} of {total} rows fixed.'
+        ))
@@ -0,0 +1,425 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from .ingest import Field, Schema, iter_table
+from .models import MarksAuditTrail, MarksFreezeRule, StudentMark
+from .profile_cache import bump_student_data_version
+from .risk import queue_risk_refresh
+
+
+MARK_STATE_FIELDS = ('marks_obtained', 'is_absent', 'max_marks', 'pass_marks')
+
+
+def _mark_state(record):
+    return tuple(getattr(record, field) for field in MARK_STATE_FIELDS)
+
+
+def _version_token(updated_at):
+    return updated_at.isoformat() if updated_at else ''
+
+
+def mark_version(record):
+    """Opaque per-row version token for optimistic concurrency ('' when no row exists)."""
+    return _version_token(record.updated_at) if record is not None else ''
+
+
+def save_marks_bulk(subject, semester, exam_type, exam_session, attempt_no, entries,
+                    max_marks, pass_marks, entered_by=None, changed_by=None, reason='', versions=None):
+    """Save one exam column of marks in a fixed number of queries.
+
+    `entries` maps student id -> (is_absent, marks_obtained) with values
+    already validated. Existing rows for the (subject, exam_type, session,
+    attempt) key are read once; new and changed rows are upserted together
+    and one audit row is written per changed existing mark, all in one
+    transaction.
+
+    When `versions` ({student id: token from mark_version()}) is given, rows
+    whose stored version differs are not written and come back under
+    'stale' with the current record (or None), instead of being overwritten.
+
+    Returns {'created', 'updated', 'unchanged'} student id lists plus
+    'stale' and 'versions' ({student id: current version token}).
+    """
+    with transaction.atomic():
+        return _save_marks_bulk(
+            subject, semester, exam_type, exam_session, attempt_no, entries,
+            max_marks, pass_marks, entered_by, changed_by, reason, versions,
+        )
+
+
+def _save_marks_bulk(subject, semester, exam_type, exam_session, attempt_no, entries,
+                     max_marks, pass_marks, entered_by, changed_by, reason, versions):
+    existing = {
+        record.student_id: record
+        for record in StudentMark.objects.filter(
+            subject=subject,
+            exam_type=exam_type,
+            exam_session=exam_session,
+            attempt_no=attempt_no,
+            student_id__in=list(entries),
+        )
+    }
+
+    entered_by_id = getattr(entered_by, 'pk', entered_by)
+    to_create, to_update, audits = [], [], []
+    unchanged, stale = [], {}
+    for student_id, (is_absent, marks_value) in entries.items():
+        marks_obtained = None if is_absent else marks_value
+        record = existing.get(student_id)
+        if versions is not None and versions.get(student_id) != mark_version(record):
+            stale[student_id] = record
+            continue
+        if record is None:
+            to_create.append(StudentMark(
+                student_id=student_id,
+                subject=subject,
+                semester=semester,
+                exam_type=exam_type,
+                exam_session=exam_session,
+                attempt_no=attempt_no,
+                max_marks=max_marks,
+                pass_marks=pass_marks,
+                marks_obtained=marks_obtained,
+                is_absent=is_absent,
+                entered_by_id=entered_by_id,
+            ))
+            continue
+
+        old_state = _mark_state(record)
+        new_state = (marks_obtained, is_absent, max_marks, pass_marks)
+        if old_state == new_state and record.semester_id == semester.pk and record.entered_by_id == entered_by_id:
+            unchanged.append(student_id)
+            continue
+
+        record.semester = semester
+        record.max_marks = max_marks
+        record.pass_marks = pass_marks
+        record.marks_obtained = marks_obtained
+        record.is_absent = is_absent
+        record.entered_by_id = entered_by_id
+        to_update.append(record)
+
+        if old_state != new_state:
+            audits.append(MarksAuditTrail(
+                student_mark=record,
+                student_id=student_id,
+                subject=subject,
+                semester=semester,
+                exam_type=exam_type,
+                exam_session=exam_session,
+                attempt_no=attempt_no,
+                old_marks=old_state[0],
+                new_marks=marks_obtained,
+                old_absent=old_state[1],
+                new_absent=is_absent,
+                old_max_marks=old_state[2],
+                new_max_marks=max_marks,
+                old_pass_marks=old_state[3],
+                new_pass_marks=pass_marks,
+                reason=reason,
+                action='UPDATE',
+                changed_by=changed_by,
+            ))
+
+    if to_create or to_update:
+        # One upsert on the natural key writes new and changed rows alike;
+        # a row inserted concurrently is updated instead of failing.
+        StudentMark.objects.bulk_create(
+            to_create + to_update,
+            update_conflicts=True,
+            unique_fields=['student', 'subject', 'exam_type', 'exam_session', 'attempt_no'],
+            update_fields=['semester', 'max_marks', 'pass_marks', 'marks_obtained', 'is_absent', 'entered_by', 'updated_at'],
+        )
+        MarksAuditTrail.objects.bulk_create(audits, batch_size=500)
+        # Bulk writes skip post_save, so refresh derived data explicitly.
+        touched = [record.student_id for record in to_create + to_update]
+        queue_risk_refresh(touched)
+        bump_student_data_version(touched)
+        invalidate_marks_statistics(subject, exam_type, exam_session, attempt_no)
+
+    return {
+        'created': [record.student_id for record in to_create],
+        'updated': [record.student_id for record in to_update],
+        'unchanged': unchanged,
+        'stale': stale,
+        'versions': {
+            student_id: mark_version(existing.get(student_id))
+            for student_id in unchanged
+        } | {record.student_id: mark_version(record) for record in to_create + to_update},
+    }
+
+
+MARKS_UPLOAD = Schema('MarksRow', [
+    Field('enrollment_no', ['enrollment', 'enrollment_number'], required=True, upper=True),
+    Field('marks', ['marks_obtained', 'obtained', 'score'], required=True),
+    Field('absent', ['is_absent', 'ab']),
+])
+# Values in the marks column that mean "absent", and truthy values in the absent column.
+ABSENT_MARKS = ('AB', 'ABS', 'ABSENT')
+ABSENT_FLAGS = ('1', 'Y', 'YES', 'TRUE', 'AB', 'ABSENT')
+
+
+def read_marks_sheet(upload):
+    """Read an uploaded CSV/XLSX marks sheet into string columns enrollment_no, marks, absent.
+
+    The frame is indexed by row number, counting data rows from 1 below the
+    header as the other uploads do; rows blank in every column are dropped.
+    Raises ValueError when the file cannot be read or required columns are missing.
+    """
+    try:
+        sheets = list(MARKS_UPLOAD.parse_chunks(iter_table(upload)))
+    except ValueError as exc:
+        raise ValueError(f'Failed to read file: {exc}')
+
+    if sheets[0].missing:
+        raise ValueError(f"Missing required columns: {', '.join(sheets[0].missing)}.")
+    rows = [row for sheet in sheets for row in sheet.rows]
+    return pd.DataFrame(rows, columns=MARKS_UPLOAD.row._fields).set_index('row_index')
+
+
+def preview_marks_import(df, students, subject, exam_type, exam_session, attempt_no, max_marks, pass_marks):
+    """Validate a sheet from read_marks_sheet() and diff it against the stored marks.
+
+    `students` is the queryset of students allowed on the sheet. Validation
+    runs column-wise over the whole frame; enrollment numbers are resolved
+    case-insensitively in one query and existing marks read in one more.
+    Returns a dict with 'entries' and 'versions' ready for save_marks_bulk(),
+    the 'changes' (new/changed rows) and 'errors' to show, and per-status
+    'counts'.
+    """
+    enrollment = df['enrollment_no'].str.replace(r'\.0$', '', regex=True)
+    marks_text = df['marks']
+    marks_upper = marks_text.str.upper()
+    absent = df['absent'].str.upper().isin(ABSENT_FLAGS) | marks_upper.isin(ABSENT_MARKS)
+    has_marks = marks_text.ne('') & ~marks_upper.isin(ABSENT_MARKS)
+    marks = pd.to_numeric(marks_text.where(has_marks), errors='coerce')
+
+    roster = {}
+    for enrollment_key, student_id, name in (
+        students.annotate(enrollment_key=Upper('enrollment_no'))
+        .filter(enrollment_key__in=enrollment[enrollment.ne('')].unique().tolist())
+        .values_list('enrollment_key', 'id', 'name')
+    ):
+        roster.setdefault(enrollment_key, (student_id, name))
+    student_ids = enrollment.map(lambda value: roster[value][0] if value in roster else None)
+
+    error = np.select(
+        [
+            enrollment.eq(''),
+            enrollment.duplicated(keep=False),
+            student_ids.isna(),
+            absent & has_marks,
+            ~absent & ~has_marks,
+            ~absent & marks.isna(),
+            ~absent & ((marks < 0) | (marks > float(max_marks))),
+            ~absent & ((marks * 100).round(6) % 1 != 0),
+        ],
+        [
+            'Missing enrollment number.',
+            'Enrollment number appears more than once in the sheet.',
+            'Student is not on this marks sheet.',
+            'Marked absent but marks were also given.',
+            'Enter marks or mark the student absent.',
+            'Marks must be a number.',
+            f'Marks must be between 0 and {max_marks}.',
+            'Marks can have at most 2 decimal places.',
+        ],
+        default='',
+    )
+    valid = error == ''
+
+    entries = {
+        int(student_id): (bool(is_absent), None if is_absent else Decimal(text))
+        for student_id, is_absent, text in zip(student_ids[valid], absent[valid], marks_text[valid])
+    }
+    # Plain tuples rather than model instances: only state and version are needed.
+    existing = {
+        row[0]: (row[1:5], row[5])
+        for row in StudentMark.objects.filter(
+            subject=subject,
+            exam_type=exam_type,
+            exam_session=exam_session,
+            attempt_no=attempt_no,
+            student_id__in=list(entries),
+        ).values_list('student_id', *MARK_STATE_FIELDS, 'updated_at')
+    }
+
+    changes, counts = [], {'new': 0, 'changed': 0, 'unchanged': 0, 'errors': int((~valid).sum())}
+    for row_no, enrollment_no, student_id in zip(df.index[valid], enrollment[valid], student_ids[valid]):
+        student_id = int(student_id)
+        is_absent, marks_value = entries[student_id]
+        state = existing.get(student_id, (None, None))[0]
+        if state is None:
+            status = 'new'
+        elif state == (marks_value, is_absent, max_marks, pass_marks):
+            status = 'unchanged'
+        else:
+            status = 'changed'
+        counts[status] += 1
+        if status != 'unchanged':
+            changes.append({
+                'row': int(row_no),
+                'enrollment_no': enrollment_no,
+                'name': roster[enrollment_no][1],
+                'old': None if state is None else ('AB' if state[1] else state[0]),
+                'new': 'AB' if is_absent else marks_value,
+                'status': status,
+            })
+
+    return {
+        'entries': entries,
+        'versions': {
+            student_id: _version_token(existing[student_id][1]) if student_id in existing else ''
+            for student_id in entries
+        },
+        'changes': changes,
+        'errors': [
+            {'row': int(row_no), 'enrollment_no': enrollment_no, 'message': str(message)}
+            for row_no, enrollment_no, message in zip(df.index[~valid], enrollment[~valid], error[~valid])
+        ],
+        'counts': counts,
+    }
+
+
+# Statistics are invalidated explicitly on every write, so the timeout only
+# bounds how long an unused entry lingers.
+MARKS_STATISTICS_TIMEOUT = 3600
+HISTOGRAM_BUCKETS = 10
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _statistics_key(subject_id, exam_type, exam_session, attempt_no):
+    return f'marks-stats:{subject_id}:{exam_type}:{quote(exam_session)}:{attempt_no}'
+
+
+def invalidate_marks_statistics(subject, exam_type, exam_session, attempt_no):
+    """Drop cached statistics for one exam column once the current transaction commits."""
+    key = _statistics_key(getattr(subject, 'pk', subject), exam_type, exam_session, attempt_no)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def _rate(part, whole):
+    return round(part * 100.0 / whole, 1) if whole else None
+
+
+def marks_statistics(subject, exam_type, exam_session, attempt_no):
+    """Class performance for one (subject, exam type, session, attempt) column.
+
+    Counts, pass/absent rates and the per-division comparison come from one
+    grouped query; mean, median, standard deviation, percentiles and the
+    histogram (buckets of 10% of max marks) are computed with NumPy over the
+    marks of present students. Cached until marks for the column change or
+    its freeze state is saved.
+    """
+    subject_id = getattr(subject, 'pk', subject)
+    key = _statistics_key(subject_id, exam_type, exam_session, attempt_no)
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+
+    marks = StudentMark.objects.filter(
+        subject_id=subject_id,
+        exam_type=exam_type,
+        exam_session=exam_session,
+        attempt_no=attempt_no,
+    ).filter(Q(is_absent=True) | Q(marks_obtained__isnull=False))
+    present = Q(is_absent=False)
+    passed = present & (Q(pass_marks__isnull=True) | Q(marks_obtained__gte=F('pass_marks')))
+
+    divisions = []
+    for row in marks.order_by().values('student__division').annotate(
+        entered=Count('id'),
+        absent=Count('id', filter=Q(is_absent=True)),
+        passed=Count('id', filter=passed),
+        mean=Avg('marks_obtained', filter=present),
+        lowest=Min('marks_obtained', filter=present),
+        highest=Max('marks_obtained', filter=present),
+    ).order_by('student__division'):
+        appeared = row['entered'] - row['absent']
+        divisions.append({
+            'division': row['student__division'],
+            'entered': row['entered'],
+            'absent': row['absent'],
+            'passed': row['passed'],
+            'pass_rate': _rate(row['passed'], appeared),
+            'mean': round(float(row['mean']), 2) if row['mean'] is not None else None,
+            'min': float(row['lowest']) if row['lowest'] is not None else None,
+            'max': float(row['highest']) if row['highest'] is not None else None,
+        })
+
+    entered = sum(row['entered'] for row in divisions)
+    absent = sum(row['absent'] for row in divisions)
+    passed_total = sum(row['passed'] for row in divisions)
+    scores = np.array(
+        list(marks.filter(present).values_list('marks_obtained', 'max_marks')),
+        dtype=float,
+    ).reshape(-1, 2)
+    obtained = scores[:, 0]
+    percent = np.divide(obtained * 100.0, scores[:, 1], out=np.zeros_like(obtained), where=scores[:, 1] > 0)
+    counts, _ = np.histogram(np.clip(percent, 0, 100), bins=HISTOGRAM_BUCKETS, range=(0, 100))
+    step = 100 // HISTOGRAM_BUCKETS
+
+    stats = {
+        'entered': entered,
+        'present': int(obtained.size),
+        'absent': absent,
+        'passed': passed_total,
+        'absent_rate': _rate(absent, entered),
+        'pass_rate': _rate(passed_total, obtained.size),
+        'mean': round(float(obtained.mean()), 2) if obtained.size else None,
+        'median': round(float(np.median(obtained)), 2) if obtained.size else None,
+        'std': round(float(obtained.std()), 2) if obtained.size else None,
+        'min': float(obtained.min()) if obtained.size else None,
+        'max': float(obtained.max()) if obtained.size else None,
+        'percentiles': {
+            f'p{q}': round(float(value), 2)
+            for q, value in zip(PERCENTILES, np.percentile(obtained, PERCENTILES) if obtained.size else [])
+        },
+        'histogram': [
+            {'label': f'{low}-{low + step}%', 'count': int(count)}
+            for low, count in zip(range(0, 100, step), counts)
+        ],
+        'divisions': divisions,
+        'is_frozen': MarksFreezeRule.objects.filter(
+            subject_id=subject_id,
+            exam_type=exam_type,
+            exam_session=exam_session,
+            attempt_no=attempt_no,
+            is_frozen=True,
+        ).exists(),
+    }
+    cache.set(key, stats, MARKS_STATISTICS_TIMEOUT)
+    return stats
+
+
+def marks_audit_queryset(subject=None, exam_session=None, changed_by=None, enrollment_no=None,
+                         date_from=None, date_to=None):
+    """Filtered MarksAuditTrail rows for the audit browser.
+
+    Each filter leads one of the (..., changed_at) indexes, so pages are
+    read by seeking on changed_at instead of scanning the table. Dates are
+    turned into datetime bounds to keep the changed_at range indexable.
+    """
+    qs = MarksAuditTrail.objects.all()
+    if subject:
+        qs = qs.filter(subject=subject)
+    if exam_session:
+        qs = qs.filter(exam_session=exam_session)
+    if changed_by:
+        qs = qs.filter(changed_by=changed_by)
+    if enrollment_no:
+        qs = qs.filter(student__enrollment_no=enrollment_no)
+    if date_from:
+        qs = qs.filter(changed_at__gte=timezone.make_aware(datetime.combine(date_from, time.min)))
+    if date_to:
+        qs = qs.filter(changed_at__lt=timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min)))
+    return qs
@@ -0,0 +1,77 @@
+# Generated by Django 5.2 on 2026-10-18 19:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+
+from allocation.risk import RISK_MARKS_WINDOW, score_risk
+
+
+def backfill_snapshots(apps, schema_editor):
+    # refresh_risk_snapshots() reads AttendanceRollup and the session layout,
+    # which do not exist yet, so score the historical rows with the same scorer.
+    Attendance = apps.get_model('allocation', 'Attendance')
+    Student = apps.get_model('allocation', 'Student')
+    StudentMark = apps.get_model('allocation', 'StudentMark')
+    StudentRiskSnapshot = apps.get_model('allocation', 'StudentRiskSnapshot')
+
+    student_ids = list(Student.objects.order_by('pk').values_list('pk', flat=True))
+    for offset in range(0, len(student_ids), 500):
+        batch = student_ids[offset:offset + 500]
+        attendance = {
+            row['student_id']: round(row['present'] * 100.0 / row['total'], 1)
+            for row in Attendance.objects.filter(student_id__in=batch).order_by()
+            .values('student_id').annotate(total=Count('id'), present=Count('id', filter=Q(status='P')))
+            if row['total']
+        }
+        marks = {}
+        rows = (
+            StudentMark.objects.filter(student_id__in=batch)
+            .annotate(rank=Window(RowNumber(), partition_by=[F('student_id')],
+                                  order_by=[F('updated_at').desc(), F('id').desc()]))
+            .filter(rank__lte=RISK_MARKS_WINDOW)
+            .order_by('student_id', 'rank')
+            .values_list('student_id', 'is_absent', 'marks_obtained', 'max_marks', 'pass_marks')
+        )
+        for student_id, *row in rows:
+            marks.setdefault(student_id, []).append(tuple(row))
+        snapshots = []
+        for student_id in batch:
+            risk = score_risk(attendance.get(student_id), marks.get(student_id, []))
+            snapshots.append(StudentRiskSnapshot(
+                student_id=student_id, score=risk['score'], level=risk['level'],
+                attendance_pct=risk['attendance_pct'], avg_marks_pct=risk['avg_marks_pct'],
+                fail_count=risk['fail_count'], trend=risk['trend'], suggestions=risk['suggestions'],
+            ))
+        StudentRiskSnapshot.objects.bulk_create(snapshots)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocation', '0023_alter_mentorassignment_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentRiskSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(default=0)),
+                ('level', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High')], default='LOW', max_length=10)),
+                ('attendance_pct', models.FloatField(blank=True, null=True)),
+                ('avg_marks_pct', models.FloatField(blank=True, null=True)),
+                ('fail_count', models.PositiveIntegerField(default=0)),
+                ('trend', models.FloatField(blank=True, null=True)),
+                ('suggestions', models.JSONField(blank=True, default=list)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='risk_snapshot', to='allocation.student')),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['level', 'score'], name='risksnap_level_score_idx'), models.Index(fields=['score'], name='risksnap_score_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
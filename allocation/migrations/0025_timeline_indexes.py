@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 19:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocation', '0024_studentrisksnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mentoractionlog',
+            index=models.Index(fields=['student', 'created_at'], name='mentorlog_student_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentmark',
+            index=models.Index(fields=['student', 'updated_at'], name='mark_student_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-18 19:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocation', '0025_timeline_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('division', models.CharField(choices=[('A', 'A'), ('B', 'B'), ('C', 'C'), ('D', 'D'), ('E', 'E'), ('F', 'F'), ('G', 'G')], max_length=2)),
+                ('head_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('marked_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='allocation.faculty')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_sessions', to='allocation.subject')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('subject', 'date', 'division')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ClassSessionAbsence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='absences', to='allocation.classsession')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_absences', to='allocation.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'session'], name='sessabsence_student_idx')],
+                'unique_together': {('session', 'student')},
+            },
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2 on 2026-10-18 19:20
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollups(apps, schema_editor):
+    Attendance = apps.get_model('allocation', 'Attendance')
+    ClassSession = apps.get_model('allocation', 'ClassSession')
+    ClassSessionAbsence = apps.get_model('allocation', 'ClassSessionAbsence')
+    StudentSubject = apps.get_model('allocation', 'StudentSubject')
+    AttendanceRollup = apps.get_model('allocation', 'AttendanceRollup')
+
+    counts = defaultdict(lambda: [0, 0])
+    rows = (
+        Attendance.objects.order_by()
+        .annotate(month=TruncMonth('date'))
+        .values('student_id', 'subject_id', 'month')
+        .annotate(total=Count('id'), present=Count('id', filter=Q(status='P')))
+    )
+    for row in rows.iterator():
+        entry = counts[(row['student_id'], row['subject_id'], row['month'])]
+        entry[0] += row['present']
+        entry[1] += row['total']
+
+    session_totals = defaultdict(list)
+    sessions = (
+        ClassSession.objects.order_by()
+        .annotate(month=TruncMonth('date'))
+        .values('subject_id', 'division', 'month')
+        .annotate(total=Count('id'))
+    )
+    for row in sessions:
+        session_totals[(row['subject_id'], row['division'])].append((row['month'], row['total']))
+    if session_totals:
+        absent = {
+            (row['student_id'], row['session__subject_id'], row['session__division'], row['month']): row['absent']
+            for row in ClassSessionAbsence.objects.order_by()
+            .annotate(month=TruncMonth('session__date'))
+            .values('student_id', 'session__subject_id', 'session__division', 'month')
+            .annotate(absent=Count('id'))
+        }
+        enrollments = StudentSubject.objects.values_list('student_id', 'subject_id', 'student__division')
+        for student_id, subject_id, division in enrollments.iterator():
+            for month, total in session_totals.get((subject_id, division), ()):
+                entry = counts[(student_id, subject_id, month)]
+                entry[0] += total - absent.get((student_id, subject_id, division, month), 0)
+                entry[1] += total
+
+    AttendanceRollup.objects.bulk_create([
+        AttendanceRollup(
+            student_id=student_id, subject_id=subject_id, month=month,
+            present=present, absent=total - present, total=total,
+        )
+        for (student_id, subject_id, month), (present, total) in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocation', '0026_classsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='allocation.student')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='allocation.subject')),
+            ],
+            options={
+                'ordering': ['month'],
+                'unique_together': {('student', 'subject', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
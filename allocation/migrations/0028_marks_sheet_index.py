@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocation', '0027_attendancerollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentmark',
+            index=models.Index(fields=['subject', 'exam_type', 'exam_session', 'attempt_no'], name='mark_sheet_key_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 19:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocation', '0028_marks_sheet_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='marksaudittrail',
+            index=models.Index(fields=['student', 'changed_at'], name='audit_student_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marksaudittrail',
+            index=models.Index(fields=['subject', 'exam_session', 'changed_at'], name='audit_subj_session_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marksaudittrail',
+            index=models.Index(fields=['changed_by', 'changed_at'], name='audit_changedby_changed_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 19:58
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocation', '0029_marks_audit_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(django.db.models.functions.text.Upper('enrollment_no'), name='student_enrollment_upper_idx'),
+        ),
+    ]
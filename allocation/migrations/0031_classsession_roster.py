@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+def backfill_rosters(apps, schema_editor):
+    # Sessions marked before rosters were recorded covered the then-current enrolment.
+    ClassSession = apps.get_model('allocation', 'ClassSession')
+    StudentSubject = apps.get_model('allocation', 'StudentSubject')
+    Roster = ClassSession.students.through
+
+    enrolled = {}
+    for student_id, subject_id, division in StudentSubject.objects.values_list(
+        'student_id', 'subject_id', 'student__division'
+    ).iterator():
+        enrolled.setdefault((subject_id, division), []).append(student_id)
+
+    Roster.objects.bulk_create([
+        Roster(classsession_id=session_id, student_id=student_id)
+        for session_id, subject_id, division in ClassSession.objects.values_list('id', 'subject_id', 'division')
+        for student_id in enrolled.get((subject_id, division), ())
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocation', '0030_student_enrollment_upper_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classsession',
+            name='students',
+            field=models.ManyToManyField(blank=True, related_name='class_sessions', to='allocation.student'),
+        ),
+        migrations.RunPython(backfill_rosters, migrations.RunPython.noop),
+    ]
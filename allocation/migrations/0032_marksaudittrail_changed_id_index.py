@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 20:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocation', '0031_classsession_roster'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='marksaudittrail',
+            index=models.Index(fields=['changed_at', 'id'], name='audit_changed_id_idx'),
+        ),
+    ]
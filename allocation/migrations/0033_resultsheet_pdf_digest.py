@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 20:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocation', '0032_marksaudittrail_changed_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resultsheet',
+            name='pdf_digest',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
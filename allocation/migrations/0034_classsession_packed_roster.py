@@ -0,0 +1,81 @@
+# Generated by Django 5.2 on 2026-10-18 21:40
+
+import sys
+from array import array
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _pack(student_ids):
+    # Same encoding as allocation.attendance.pack_roster().
+    packed = array('I', sorted(set(student_ids)))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack(roster):
+    student_ids = array('I')
+    student_ids.frombytes(roster)
+    if sys.byteorder == 'big':
+        student_ids.byteswap()
+    return student_ids
+
+
+def pack_rosters(apps, schema_editor):
+    ClassSession = apps.get_model('allocation', 'ClassSession')
+    Roster = ClassSession.students.through
+
+    rosters = {}
+    for session_id, student_id in Roster.objects.values_list('classsession_id', 'student_id').iterator():
+        rosters.setdefault(session_id, []).append(student_id)
+    ClassSession.objects.bulk_update(
+        [ClassSession(pk=session_id, roster=_pack(student_ids)) for session_id, student_ids in rosters.items()],
+        ['roster'], batch_size=500,
+    )
+
+
+def unpack_rosters(apps, schema_editor):
+    ClassSession = apps.get_model('allocation', 'ClassSession')
+    Student = apps.get_model('allocation', 'Student')
+    Roster = ClassSession.students.through
+
+    # A packed roster keeps the ids of students deleted since; the join table cannot.
+    existing = set(Student.objects.values_list('id', flat=True))
+    Roster.objects.bulk_create([
+        Roster(classsession_id=session_id, student_id=student_id)
+        for session_id, roster in ClassSession.objects.values_list('id', 'roster').iterator()
+        for student_id in _unpack(roster)
+        if student_id in existing
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocation', '0033_resultsheet_pdf_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classsession',
+            name='roster',
+            field=models.BinaryField(default=b'', editable=False),
+        ),
+        migrations.RunPython(pack_rosters, unpack_rosters),
+        migrations.RemoveField(
+            model_name='classsession',
+            name='students',
+        ),
+        migrations.AlterField(
+            model_name='classsessionabsence',
+            name='session',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='absences', to='allocation.classsession'),
+        ),
+        migrations.AlterField(
+            model_name='classsessionabsence',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='session_absences', to='allocation.student'),
+        ),
+    ]
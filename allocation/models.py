@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Upper
 
 # ============= ACADEMIC STRUCTURE =============
 
@@ -137,6 +138,10 @@ class Student(models.Model):
     
     class Meta:
         ordering = ['enrollment_no']
+        indexes = [
+            # Uploads look students up by case-insensitive enrollment number.
+            models.Index(Upper('enrollment_no'), name='student_enrollment_upper_idx'),
+        ]
     
     def __str__(self):
         return f"{self.enrollment_no} - {self.name}"
@@ -172,6 +177,62 @@ class Attendance(models.Model):
     def __str__(self):
         return f"{self.student.enrollment_no} - {self.subject.code} - {self.date} ({self.status})"
 
+
+class ClassSession(models.Model):
+    """One marked lecture for a division; only non-present students get a ClassSessionAbsence row.
+
+    `roster` holds the ids of the students the session covered when it was
+    marked, packed into one value (allocation.attendance.pack_roster), so
+    later enrolment or division changes do not rewrite past attendance.
+    `head_count` is its size.
+    """
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='class_sessions')
+    date = models.DateField()
+    division = models.CharField(max_length=2, choices=Student.DIVISION_CHOICES)
+    head_count = models.PositiveIntegerField(default=0)
+    roster = models.BinaryField(default=b'', editable=False)
+    marked_by = models.ForeignKey(Faculty, on_delete=models.SET_NULL, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('subject', 'date', 'division')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.subject.code} - {self.date} - Div {self.division}"
+
+
+class ClassSessionAbsence(models.Model):
+    # Both foreign keys lead one of the composite indexes below, so neither needs its own.
+    session = models.ForeignKey(ClassSession, on_delete=models.CASCADE, related_name='absences', db_index=False)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='session_absences', db_index=False)
+
+    class Meta:
+        unique_together = ('session', 'student')
+        indexes = [
+            models.Index(fields=['student', 'session'], name='sessabsence_student_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.enrollment_no} absent - {self.session}"
+
+
+class AttendanceRollup(models.Model):
+    """Monthly attendance totals per student and subject, maintained from both attendance layouts."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_rollups')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    month = models.DateField()  # first day of the month
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('student', 'subject', 'month')
+        ordering = ['month']
+
+    def __str__(self):
+        return f"{self.student.enrollment_no} - {self.subject.code} - {self.month:%b %Y} ({self.present}/{self.total})"
+
 # ============= EXAM SEATING (Existing Feature) =============
 
 class CESeating(models.Model):
@@ -198,6 +259,8 @@ class ResultSheet(models.Model):
     total_grade_points = models.IntegerField(null=True, blank=True)
     result_status = models.CharField(max_length=20, default='PASS')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Digest of the stored marksheet PDF (allocation.result_pdfs), so a replaced file can be deleted.
+    pdf_digest = models.CharField(max_length=64, blank=True, editable=False)
 
     class Meta:
         unique_together = ('student', 'semester', 'exam_session')
@@ -243,6 +306,10 @@ class StudentMark(models.Model):
     class Meta:
         unique_together = ('student', 'subject', 'exam_type', 'exam_session', 'attempt_no')
         ordering = ['-updated_at', 'student__enrollment_no']
+        indexes = [
+            models.Index(fields=['student', 'updated_at'], name='mark_student_updated_idx'),
+            models.Index(fields=['subject', 'exam_type', 'exam_session', 'attempt_no'], name='mark_sheet_key_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.enrollment_no} - {self.subject.code} ({self.exam_type} {self.exam_session} A{self.attempt_no})"
@@ -301,6 +368,13 @@ class MarksAuditTrail(models.Model):
 
     class Meta:
         ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=['student', 'changed_at'], name='audit_student_changed_idx'),
+            models.Index(fields=['subject', 'exam_session', 'changed_at'], name='audit_subj_session_changed_idx'),
+            models.Index(fields=['changed_by', 'changed_at'], name='audit_changedby_changed_idx'),
+            # Unfiltered browsing pages by (changed_at, id) in marks_audit_log.
+            models.Index(fields=['changed_at', 'id'], name='audit_changed_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.enrollment_no} {self.subject.code} {self.exam_type} {self.exam_session}"
@@ -323,11 +397,53 @@ class MentorActionLog(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['student', 'created_at'], name='mentorlog_student_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.enrollment_no} - {self.get_action_type_display()}"
 
 
+class StudentRiskSnapshot(models.Model):
+    LEVEL_CHOICES = [
+        ('LOW', 'Low'),
+        ('MEDIUM', 'Medium'),
+        ('HIGH', 'High'),
+    ]
+
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='risk_snapshot')
+    score = models.PositiveSmallIntegerField(default=0)
+    level = models.CharField(max_length=10, choices=LEVEL_CHOICES, default='LOW')
+    attendance_pct = models.FloatField(null=True, blank=True)
+    avg_marks_pct = models.FloatField(null=True, blank=True)
+    fail_count = models.PositiveIntegerField(default=0)
+    trend = models.FloatField(null=True, blank=True)
+    suggestions = models.JSONField(default=list, blank=True)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [
+            models.Index(fields=['level', 'score'], name='risksnap_level_score_idx'),
+            models.Index(fields=['score'], name='risksnap_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.enrollment_no} - {self.level} ({self.score})"
+
+    def as_risk(self):
+        return {
+            'score': self.score,
+            'level': self.level,
+            'attendance_pct': self.attendance_pct,
+            'avg_marks_pct': self.avg_marks_pct,
+            'fail_count': self.fail_count,
+            'trend': self.trend,
+            'suggestions': list(self.suggestions or []),
+        }
+
+
 class Notice(models.Model):
     NOTICE_TYPE_CHOICES = [
         ('NOTICE', 'Notice'),
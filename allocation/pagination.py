@@ -0,0 +1,64 @@
+from django.core import signing
+from django.db.models import F, Q
+
+
+def encode_cursor(values, salt):
+    values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+    return signing.dumps(values, salt=salt, compress=True)
+
+
+def decode_cursor(token, salt, length=2):
+    if not token:
+        return None
+    try:
+        values = signing.loads(token, salt=salt)
+    except signing.BadSignature:
+        return None
+    if not isinstance(values, list) or len(values) != length:
+        return None
+    return values
+
+
+def keyset_page(queryset, key, descending=False, after=None, before=None, page_size=50, salt='keyset'):
+    """Seek-paginate `queryset` on `key` (field name or expression) with the pk as tie-breaker.
+
+    The key must never be NULL; wrap nullable columns in Coalesce().
+
+    `after` / `before` are opaque cursors from a previous page. A cursor signed
+    with a different salt (e.g. another sort order) is ignored and the first
+    page is returned. Returns a dict with rows, has_next/has_prev and the
+    cursors for the neighbouring pages.
+    """
+    key_expr = F(key) if isinstance(key, str) else key
+    qs = queryset.annotate(keyset_value=key_expr)
+
+    cursor = decode_cursor(before, salt)
+    backwards = cursor is not None
+    if not backwards:
+        cursor = decode_cursor(after, salt)
+
+    # Walk the index in display order, or in reverse when fetching the previous page.
+    walk_desc = descending != backwards
+    lookup = 'lt' if walk_desc else 'gt'
+    if cursor is not None:
+        value, pk = cursor
+        qs = qs.filter(Q(**{f'keyset_value__{lookup}': value}) | Q(keyset_value=value, **{f'pk__{lookup}': pk}))
+
+    prefix = '-' if walk_desc else ''
+    rows = list(qs.order_by(f'{prefix}keyset_value', f'{prefix}pk')[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if backwards:
+        rows.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = cursor is not None, has_more
+
+    return {
+        'rows': rows,
+        'has_next': has_next and bool(rows),
+        'has_prev': has_prev and bool(rows),
+        'next_cursor': encode_cursor([rows[-1].keyset_value, rows[-1].pk], salt) if has_next and rows else None,
+        'prev_cursor': encode_cursor([rows[0].keyset_value, rows[0].pk], salt) if has_prev and rows else None,
+    }
@@ -0,0 +1,49 @@
+"""Per-student cache of the computed student profile sections.
+
+Entries are keyed by a per-student data version that is replaced whenever a
+row feeding the profile is written, so stale entries are never read again and
+simply expire. The version lives in the same cache backend; with several
+worker processes use a shared backend (file or memcached), not local memory.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _version_key(student_id):
+    return f'student-data-version:{student_id}'
+
+
+def student_data_version(student_id):
+    key = _version_key(student_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed with a timestamp so an evicted version never reuses an old number.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_student_data_version(student_ids):
+    """Invalidate cached profiles for these students once the current transaction commits."""
+    student_ids = {sid for sid in student_ids if sid}
+    if not student_ids:
+        return
+
+    def _bump():
+        version = time.time_ns()
+        cache.set_many({_version_key(sid): version for sid in student_ids}, None)
+
+    transaction.on_commit(_bump)
+
+
+def get_cached_profile_sections(student_id, build):
+    """Return build() for this student, served from cache while its data version is unchanged."""
+    key = f'student-profile:{student_id}:{student_data_version(student_id)}'
+    sections = cache.get(key)
+    if sections is None:
+        sections = build()
+        cache.set(key, sections, settings.STUDENT_PROFILE_CACHE_TIMEOUT)
+    return sections
@@ -0,0 +1,144 @@
+"""Read-through cache of the public result lookup.
+
+On result day every student opens public_result and public_result_pdf
+within the same hour. The built result context (student, newest
+ResultSheet of the semester and its course rows) is cached per upper-cased
+enrollment number and semester number. A result upload rebuilds the
+entries of the students it stored once its last chunk is written
+(ingest.publish_results), so the first lookups after publishing are
+already hits; other writes to a student or a result sheet drop that
+student's entries. As with the profile cache, several worker processes
+need a shared cache backend.
+"""
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import ResultEntry, ResultSheet, Student
+
+
+# Semester.number is validated to 1..8.
+SEMESTER_NUMBERS = range(1, 9)
+# Enrollment numbers that are safe as part of a cache key; others are never cached.
+ENROLLMENT_KEY_RE = re.compile(r'[\w-]{1,20}')
+
+
+def public_result_key(enrollment_no, semester_no):
+    enrollment = str(enrollment_no or '').strip().upper()
+    if not ENROLLMENT_KEY_RE.fullmatch(enrollment):
+        return None
+    return f'public-result:{enrollment}:{semester_no}'
+
+
+def _result_context(student, sheet, entries):
+    return {
+        'student': student,
+        'sheet': sheet,
+        'rows': [
+            {
+                'code': entry.course_code,
+                'name': entry.course_name,
+                'credit': entry.course_credit,
+                'grade': entry.grade,
+            }
+            for entry in entries
+        ],
+    }
+
+
+def build_result_context(student, semester_no=None):
+    """(result_context, error) for this student's newest result sheet, read from the database."""
+    sheet_qs = ResultSheet.objects.filter(student=student).select_related('semester')
+    if semester_no:
+        sheet_qs = sheet_qs.filter(semester__number=semester_no)
+    sheet = sheet_qs.order_by('-created_at', '-id').first()
+
+    if not sheet:
+        return None, 'Result not available yet. Please contact Exam Cell.'
+
+    entries = list(sheet.entries.all().order_by('course_code'))
+    if not entries:
+        return None, 'Result data is incomplete. Please contact Exam Cell.'
+
+    return _result_context(student, sheet, entries), None
+
+
+def get_public_result(enrollment_no, semester_no):
+    """(result_context, error) for the public lookup, served from the cache when present.
+
+    Both are None when no student with this enrollment number is in that semester.
+    """
+    key = public_result_key(enrollment_no, semester_no)
+    if key is not None:
+        result_context = cache.get(key)
+        if result_context is not None:
+            return result_context, None
+
+    student = Student.objects.filter(
+        enrollment_no__iexact=enrollment_no.strip(),
+        semester__number=semester_no
+    ).select_related('branch', 'semester').first()
+    if not student:
+        return None, None
+
+    result_context, error = build_result_context(student, semester_no=semester_no)
+    if key is not None and result_context is not None:
+        # add(), not set(): an entry an upload stored meanwhile is newer than this read.
+        cache.add(key, result_context, settings.PUBLIC_RESULT_CACHE_TIMEOUT)
+    return result_context, error
+
+
+def warm_public_results(student_ids):
+    """Rebuild the cached results of these students for their current semester.
+
+    Runs three queries however many students there are; students without a
+    complete result sheet have their entry dropped. Returns the stored
+    {cache key: result context}.
+    """
+    students = {
+        s.id: s for s in Student.objects.filter(id__in=set(student_ids)).select_related('branch', 'semester')
+    }
+    if not students:
+        return {}
+
+    sheets = {}
+    for sheet in (
+        ResultSheet.objects.filter(
+            student_id__in=students, semester__number__in={s.semester.number for s in students.values()},
+        ).select_related('semester').order_by('created_at', 'id')
+    ):
+        # Ascending order, so the newest sheet wins as in build_result_context().
+        if sheet.semester.number == students[sheet.student_id].semester.number:
+            sheets[sheet.student_id] = sheet
+
+    entries = {}
+    for entry in ResultEntry.objects.filter(result_sheet__in=sheets.values()).order_by('course_code'):
+        entries.setdefault(entry.result_sheet_id, []).append(entry)
+
+    fresh, stale = {}, []
+    for student in students.values():
+        key = public_result_key(student.enrollment_no, student.semester.number)
+        if key is None:
+            continue
+        sheet = sheets.get(student.id)
+        if sheet and entries.get(sheet.id):
+            fresh[key] = _result_context(student, sheet, entries[sheet.id])
+        else:
+            stale.append(key)
+    cache.set_many(fresh, settings.PUBLIC_RESULT_CACHE_TIMEOUT)
+    cache.delete_many(stale)
+    return fresh
+
+
+def forget_public_results(enrollment_nos):
+    """Drop the cached results of these students, for every semester, once the current transaction commits."""
+    keys = [
+        key
+        for enrollment_no in set(enrollment_nos)
+        for semester_no in SEMESTER_NUMBERS
+        if (key := public_result_key(enrollment_no, semester_no)) is not None
+    ]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
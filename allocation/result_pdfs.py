@@ -0,0 +1,314 @@
+"""Pre-rendered public marksheet PDFs.
+
+The marksheet is drawn from plain data (result_pdf_data) and stored under
+MEDIA_ROOT/result_pdfs/ in a file named by the SHA-256 of that data, so a
+changed result gets a new file and an unchanged one is never drawn twice.
+ResultSheet.pdf_digest remembers each sheet's file, and the file it
+replaces is deleted. public_result_pdf serves the stored file with an ETag
+and Last-Modified and only draws it live on a miss. Where
+settings.RESULT_PDF_WORKERS allows background processes, a marksheet
+upload also hands every student's PDF to a local process pool
+(prerender_result_pdfs).
+
+Nothing here imports the models at module level: pool workers are spawned
+processes that only need ReportLab.
+"""
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Table, TableStyle
+
+
+RESULT_PDF_DIR = 'result_pdfs'
+# Part of every file name: bump it whenever render_result_pdf() draws differently.
+RESULT_PDF_LAYOUT = 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def result_pdf_data(result_context):
+    """The values drawn on a marksheet, as plain data, from a public result context."""
+    student = result_context['student']
+    sheet = result_context['sheet']
+    return {
+        'enrollment_no': student.enrollment_no,
+        'name': student.name,
+        'branch': student.branch.name,
+        'semester': sheet.semester.number,
+        'exam_session': sheet.exam_session,
+        'courses': [[row['code'], row['name'], str(row['credit']), row['grade']] for row in result_context['rows']],
+        'earned': [str(sheet.earned_credits or ''), str(sheet.earned_grade_points or ''), str(sheet.spi or '')],
+        'total': [str(sheet.total_credits or ''), str(sheet.total_grade_points or ''), str(sheet.cpi or '')],
+        'result_status': sheet.result_status,
+        'issued_date': sheet.issued_date.strftime('%d %b %Y') if sheet.issued_date else '',
+    }
+
+
+def result_pdf_digest(data):
+    payload = json.dumps([RESULT_PDF_LAYOUT, data], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def result_pdf_path(digest):
+    return os.path.join(settings.MEDIA_ROOT, RESULT_PDF_DIR, digest[:2], f'{digest}.pdf')
+
+
+def render_result_pdf(data):
+    """Draw the landscape statement of marks for result_pdf_data() values; returns the PDF bytes."""
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=landscape(A4))
+    width, height = landscape(A4)
+    y = height - 40
+
+    p.setFont("Helvetica-Bold", 14)
+    p.drawCentredString(width / 2, y, "KADI SARVA VISHWAVIDYALAYA")
+    y -= 18
+    p.drawCentredString(width / 2, y, "STATEMENT OF MARKS / GRADE")
+
+    y -= 18
+    p.setFont("Helvetica", 12)
+    p.drawCentredString(width / 2, y, f"Semester - {data['semester']} Examination held in {data['exam_session']}")
+
+    y -= 20
+    p.setFont("Helvetica", 12)
+    p.drawString(40, y, f"Enrollment No: {data['enrollment_no']}")
+    y -= 12
+    p.drawString(40, y, f"Student Name: {data['name']}")
+    y -= 12
+    p.drawString(40, y, f"Branch: {data['branch']}")
+
+    y -= 18
+
+    # Main table: a two-row header, then one row per course; the remarks
+    # column is merged and holds the grading scheme.
+    main_table_data = [
+        ["Course Code", "Subject Name", "Course Credit", "Grade", "Remarks"],
+        ["", "", "", "", ""],
+    ]
+    main_table_data.extend(course + [""] for course in data['courses'])
+
+    main_table = Table(main_table_data, colWidths=[1.2*inch, 3.2*inch, 1.0*inch, 0.8*inch, 2.5*inch])
+    main_table.setStyle(TableStyle([
+        ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 9),
+        ('FONT', (0, 2), (-1, -1), 'Helvetica', 9),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (3, -1), 0.6, colors.black),
+        ('GRID', (4, 0), (4, -1), 0.6, colors.black),
+        ('BACKGROUND', (0, 0), (-1, 1), colors.whitesmoke),
+        ('SPAN', (4, 0), (4, 1)),  # Merge Remarks header
+        ('SPAN', (4, 2), (4, -1)),  # Merge all Remarks content cells
+    ]))
+
+    scheme_data = [
+        ["Grading\nScheme", "Percentage\nAccording to Grade", "Grade\nPoints"],
+        ["A+", "90-100", "10"],
+        ["A", "80-89", "9"],
+        ["A-", "70-79", "8"],
+        ["B+", "60-69", "7"],
+        ["B", "50-59", "6"],
+        ["B-", "40-49", "5"],
+        ["F", "< 40", "0"],
+    ]
+    scheme_table = Table(scheme_data, colWidths=[0.8*inch, 1.0*inch, 0.6*inch])
+    scheme_table.setStyle(TableStyle([
+        ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 7),
+        ('FONT', (0, 1), (-1, -1), 'Helvetica', 7),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 0.4, colors.black),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ]))
+
+    main_table.wrapOn(p, width - 80, height)
+    table_y = y - (len(main_table_data) * 16)
+    main_table.drawOn(p, 40, table_y)
+
+    # Scheme table inside the remarks column
+    scheme_x = 40 + 1.2*inch + 3.2*inch + 1.0*inch + 0.8*inch + 0.1*inch
+    scheme_y = table_y + (len(main_table_data) * 16) - 32 - (len(scheme_data) * 12)
+    scheme_table.wrapOn(p, 2.4*inch, height)
+    scheme_table.drawOn(p, scheme_x, scheme_y)
+
+    y = table_y - 25
+
+    # Summary tables side by side at bottom
+    summaries = [
+        (["Credits", "Earned Grade\nPoints", "SPI"], data['earned'], 40),
+        (["Earned\nCredits", "Earned Grade\nPoints", "CPI"], data['total'], 40 + 3.5*inch),
+    ]
+    for header, values, x in summaries:
+        summary = Table([header, values], colWidths=[1.0*inch, 1.2*inch, 0.8*inch])
+        summary.setStyle(TableStyle([
+            ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 9),
+            ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('GRID', (0, 0), (-1, -1), 0.6, colors.black),
+        ]))
+        summary.wrapOn(p, 3.0*inch, height)
+        summary.drawOn(p, x, y - 40)
+
+    # Result at bottom
+    y = y - 60
+    p.setFont("Helvetica-Bold", 11)
+    p.drawString(40, y, f"RESULT : {data['result_status']}")
+
+    if data['issued_date']:
+        p.setFont("Helvetica", 9)
+        p.drawRightString(width - 40, y, f"Issued Date: {data['issued_date']}")
+
+    p.setFont("Helvetica", 8)
+    p.drawCentredString(width / 2, 20, "Generated by Exam Cell")
+
+    p.save()
+    return buffer.getvalue()
+
+
+def _store(path, pdf):
+    """Write the file next to its final name and rename it, so readers never see half a PDF."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(pdf)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _record_digests(digests):
+    """Point sheets at their new PDFs ({ResultSheet id: digest}) and delete the files they replace."""
+    from .models import ResultSheet
+
+    previous = dict(
+        ResultSheet.objects.filter(pk__in=digests).exclude(pdf_digest='').values_list('pk', 'pdf_digest')
+    )
+    changed = {pk: digest for pk, digest in digests.items() if previous.get(pk) != digest}
+    # bulk_update() sends no post_save, so the public result cache is left alone.
+    ResultSheet.objects.bulk_update(
+        [ResultSheet(pk=pk, pdf_digest=digest) for pk, digest in changed.items()], ['pdf_digest'], batch_size=500,
+    )
+    for pk in changed:
+        if pk in previous:
+            try:
+                os.remove(result_pdf_path(previous[pk]))
+            except FileNotFoundError:
+                pass
+
+
+def store_result_pdf(data, path):
+    """Render and store one marksheet unless its file exists; runs in the pool workers."""
+    if not os.path.exists(path):
+        _store(path, render_result_pdf(data))
+    return path
+
+
+def _render_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: the web process holds database connections and threads.
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.RESULT_PDF_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def _reset_render_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def prerender_result_pdfs(result_contexts):
+    """Queue the marksheet PDFs of these public result contexts on the local render pool.
+
+    Returns immediately with the futures of the files that did not exist
+    yet. Does nothing when settings.RESULT_PDF_WORKERS is 0; a missed file
+    is drawn live on download either way.
+    """
+    if not settings.RESULT_PDF_WORKERS:
+        return []
+    jobs, digests = {}, {}
+    for result_context in result_contexts:
+        data = result_pdf_data(result_context)
+        digest = result_pdf_digest(data)
+        path = result_pdf_path(digest)
+        if not os.path.exists(path):
+            jobs[path] = data
+            digests[result_context['sheet'].pk] = digest
+    if not jobs:
+        return []
+    _record_digests(digests)
+
+    try:
+        pool = _render_pool()
+        return [pool.submit(store_result_pdf, data, path) for path, data in jobs.items()]
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool for the next upload and draw these on demand.
+        _reset_render_pool()
+        return []
+
+
+def result_pdf_response(request, result_context, filename):
+    """Download response for a result context: the stored file when there is one, else drawn live.
+
+    The content digest is the ETag, so a repeated download is answered with
+    304 Not Modified; a live-drawn PDF is stored for the next request and
+    replaces the sheet's previous file.
+    """
+    data = result_pdf_data(result_context)
+    digest = result_pdf_digest(data)
+    path = result_pdf_path(digest)
+
+    pdf = handle = None
+    try:
+        # Opened before anything else: a concurrent _record_digests() may delete the
+        # path at any moment, but an open file stays readable.
+        handle = open(path, 'rb')
+    except OSError:
+        pdf = render_result_pdf(data)
+        try:
+            _store(path, pdf)
+            last_modified = int(os.path.getmtime(path))
+        except OSError:
+            last_modified = None
+        else:
+            _record_digests({result_context['sheet'].pk: digest})
+    else:
+        last_modified = int(os.fstat(handle.fileno()).st_mtime)
+
+    etag = f'"{digest}"'
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if handle is not None:
+            response = FileResponse(handle, as_attachment=True, filename=filename, content_type='application/pdf')
+        else:
+            response = HttpResponse(pdf, content_type='application/pdf')
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    elif handle is not None:
+        handle.close()
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Personal documents: browsers may keep them but must revalidate.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,177 @@
+from django.db import transaction
+from django.db.models import F, QuerySet, Window
+from django.db.models.functions import RowNumber
+
+from .attendance import attendance_counts, attendance_percentage
+from .models import StudentMark
+
+
+# Number of most recent marks records considered per student.
+RISK_MARKS_WINDOW = 30
+# Size of the latest/previous buckets used for the trend check.
+RISK_TREND_BUCKET = 5
+
+
+def _student_id_filter(students):
+    """Return a value usable in `student_id__in` for a queryset or an iterable of ids."""
+    if isinstance(students, QuerySet):
+        return students.order_by().values('pk')
+    return [getattr(s, 'pk', s) for s in students]
+
+
+def _attendance_by_student(student_ids):
+    return {
+        student_id: attendance_percentage(present, total)
+        for student_id, (present, total) in attendance_counts(student_ids).items()
+    }
+
+
+def _recent_marks_by_student(student_ids):
+    rows = (
+        StudentMark.objects.filter(student_id__in=student_ids)
+        .annotate(
+            rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('student_id')],
+                order_by=[F('updated_at').desc(), F('id').desc()],
+            )
+        )
+        .filter(rank__lte=RISK_MARKS_WINDOW)
+        .order_by('student_id', 'rank')
+        .values_list('student_id', 'is_absent', 'marks_obtained', 'max_marks', 'pass_marks')
+    )
+    lookup = {}
+    for student_id, is_absent, marks_obtained, max_marks, pass_marks in rows:
+        lookup.setdefault(student_id, []).append((is_absent, marks_obtained, max_marks, pass_marks))
+    return lookup
+
+
+def score_risk(attendance_pct, marks_rows):
+    """Score one student from attendance % and recent (is_absent, obtained, max, pass) rows, newest first."""
+    fail_count = 0
+    valid_percentages = []
+    for is_absent, marks_obtained, max_marks, pass_marks in marks_rows:
+        if is_absent:
+            fail_count += 1
+            continue
+        if pass_marks is not None and marks_obtained is not None and marks_obtained < pass_marks:
+            fail_count += 1
+        if marks_obtained is not None and max_marks and max_marks > 0:
+            valid_percentages.append(float(marks_obtained) * 100.0 / float(max_marks))
+
+    avg_marks_pct = round(sum(valid_percentages) / len(valid_percentages), 1) if valid_percentages else None
+
+    score = 0
+    suggestions = []
+
+    if attendance_pct is not None:
+        if attendance_pct < 75:
+            score += 25
+            suggestions.append('Attendance improvement plan')
+        if attendance_pct < 60:
+            score += 15
+
+    if fail_count > 0:
+        score += min(40, fail_count * 12)
+        suggestions.append('Remedial support recommended')
+
+    if avg_marks_pct is not None:
+        if avg_marks_pct < 50:
+            score += 20
+        elif avg_marks_pct < 65:
+            score += 10
+
+    latest = valid_percentages[:RISK_TREND_BUCKET]
+    previous = valid_percentages[RISK_TREND_BUCKET:RISK_TREND_BUCKET * 2]
+    trend = None
+    if latest and previous:
+        latest_avg = sum(latest) / len(latest)
+        previous_avg = sum(previous) / len(previous)
+        trend = round(latest_avg - previous_avg, 1)
+        if latest_avg + 8 < previous_avg:
+            score += 10
+            suggestions.append('Marks trend is declining')
+
+    if score >= 60:
+        level = 'HIGH'
+    elif score >= 35:
+        level = 'MEDIUM'
+    else:
+        level = 'LOW'
+
+    if level == 'HIGH' and 'Mentor counselling needed' not in suggestions:
+        suggestions.append('Mentor counselling needed')
+
+    return {
+        'score': min(score, 100),
+        'level': level,
+        'attendance_pct': attendance_pct,
+        'avg_marks_pct': avg_marks_pct,
+        'fail_count': fail_count,
+        'trend': trend,
+        'suggestions': suggestions,
+    }
+
+
+def compute_cohort_risk(students):
+    """Compute risk for a whole cohort in two grouped queries.
+
+    `students` may be a Student queryset (used as a subquery) or an iterable
+    of Student objects / ids. Returns {student_id: risk dict}.
+    """
+    student_ids = _student_id_filter(students)
+    if isinstance(student_ids, QuerySet):
+        id_list = list(student_ids.values_list('pk', flat=True))
+    else:
+        id_list = student_ids
+    if not id_list:
+        return {}
+
+    attendance_lookup = _attendance_by_student(student_ids)
+    marks_lookup = _recent_marks_by_student(student_ids)
+
+    return {
+        student_id: score_risk(attendance_lookup.get(student_id), marks_lookup.get(student_id, []))
+        for student_id in id_list
+    }
+
+
+SNAPSHOT_FIELDS = ['score', 'level', 'attendance_pct', 'avg_marks_pct', 'fail_count', 'trend', 'suggestions', 'computed_at']
+
+
+def refresh_risk_snapshots(student_ids, batch_size=500):
+    """Recompute and upsert StudentRiskSnapshot rows for the given students."""
+    from .models import Student, StudentRiskSnapshot
+
+    student_ids = list({sid for sid in student_ids if sid})
+    refreshed = 0
+    for offset in range(0, len(student_ids), batch_size):
+        batch = Student.objects.filter(pk__in=student_ids[offset:offset + batch_size])
+        risk_lookup = compute_cohort_risk(batch)
+        StudentRiskSnapshot.objects.bulk_create(
+            [
+                StudentRiskSnapshot(
+                    student_id=student_id,
+                    score=risk['score'],
+                    level=risk['level'],
+                    attendance_pct=risk['attendance_pct'],
+                    avg_marks_pct=risk['avg_marks_pct'],
+                    fail_count=risk['fail_count'],
+                    trend=risk['trend'],
+                    suggestions=risk['suggestions'],
+                )
+                for student_id, risk in risk_lookup.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['student'],
+            update_fields=SNAPSHOT_FIELDS,
+        )
+        refreshed += len(risk_lookup)
+    return refreshed
+
+
+def queue_risk_refresh(student_ids):
+    """Refresh snapshots for these students once the current transaction commits."""
+    student_ids = {sid for sid in student_ids if sid}
+    if student_ids:
+        transaction.on_commit(lambda: refresh_risk_snapshots(student_ids))
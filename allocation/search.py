@@ -0,0 +1,199 @@
+"""SQLite FTS5 search over students, subjects and notices.
+
+Each index is an external-content FTS5 table over its model table, kept in
+sync by SQLite triggers so bulk_create/update()/cascade deletes are covered
+too. Queries fall back to the old icontains filters when FTS5 is not
+available (other database backends, SQLite builds without FTS5, or queries
+too short for the trigram tokenizer).
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.apps import apps
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+
+# Trigram tables match any substring of 3+ characters, which keeps the old
+# icontains semantics for names and enrollment/subject codes. Notice bodies are
+# long prose, so they use word tokens with prefix matching instead.
+SEARCH_INDEXES = {
+    'student': {
+        'model': 'allocation.Student',
+        'table': 'allocation_student',
+        'columns': ('enrollment_no', 'name', 'mentor_name'),
+        'tokenizer': 'trigram',
+    },
+    'subject': {
+        'model': 'allocation.Subject',
+        'table': 'allocation_subject',
+        'columns': ('code', 'name'),
+        'tokenizer': 'trigram',
+    },
+    'notice': {
+        'model': 'allocation.Notice',
+        'table': 'allocation_notice',
+        'columns': ('title', 'body'),
+        'tokenizer': 'unicode61 remove_diacritics 2',
+    },
+}
+
+TRIGRAM_MIN_LENGTH = 3
+
+# rank_order() ranks this many best matches; the rest sort after them.
+RANKED_LIMIT = 500
+
+# {database alias: {index name: tokenizer or None}}
+_index_state = {}
+
+
+def _fts_table(index):
+    return f"{SEARCH_INDEXES[index]['table']}_fts"
+
+
+def _sqlite_supports(cursor, tokenizer):
+    try:
+        cursor.execute(f"CREATE VIRTUAL TABLE temp._fts_probe USING fts5(x, tokenize='{tokenizer}')")
+        cursor.execute('DROP TABLE temp._fts_probe')
+        return True
+    except Exception:
+        return False
+
+
+def _trigger_sql(index):
+    spec = SEARCH_INDEXES[index]
+    table, fts = spec['table'], _fts_table(index)
+    cols = ', '.join(spec['columns'])
+    new_vals = ', '.join(f'new.{c}' for c in spec['columns'])
+    old_vals = ', '.join(f'old.{c}' for c in spec['columns'])
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals});"
+    insert_new = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals});"
+    return {
+        f'{fts}_ai': f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f'{fts}_ad': f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+        f'{fts}_au': f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN {delete_old} {insert_new} END",
+    }
+
+
+def ensure_search_index(using='default', rebuild=False):
+    """Create missing FTS tables/triggers and rebuild any index that was (re)created.
+
+    Safe to call repeatedly; it runs after every migrate because SQLite table
+    rebuilds during migrations drop the triggers on the rebuilt table.
+    Returns the list of rebuilt index names.
+    """
+    connection = connections[using]
+    _index_state.pop(using, None)
+    if connection.vendor != 'sqlite':
+        return []
+
+    rebuilt = []
+    with connection.cursor() as cursor:
+        if not _sqlite_supports(cursor, 'unicode61'):
+            return []
+        has_trigram = _sqlite_supports(cursor, 'trigram')
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+
+        for index, spec in SEARCH_INDEXES.items():
+            if spec['table'] not in existing:
+                continue
+            fts = _fts_table(index)
+            needs_rebuild = rebuild
+            if fts not in existing:
+                tokenizer = spec['tokenizer']
+                if tokenizer == 'trigram' and not has_trigram:
+                    tokenizer = 'unicode61 remove_diacritics 2'
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {fts} USING fts5({', '.join(spec['columns'])}, "
+                    f"content='{spec['table']}', content_rowid='id', tokenize='{tokenizer}')"
+                )
+                needs_rebuild = True
+            for name, sql in _trigger_sql(index).items():
+                if name not in existing:
+                    cursor.execute(sql)
+                    needs_rebuild = True
+            if needs_rebuild:
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+                rebuilt.append(index)
+    return rebuilt
+
+
+def _tokenizer(index, using):
+    state = _index_state.get(using)
+    if state is None:
+        state = {}
+        connection = connections[using]
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'")
+                tables = dict(cursor.fetchall())
+            for name in SEARCH_INDEXES:
+                sql = tables.get(_fts_table(name))
+                if sql:
+                    state[name] = 'trigram' if "'trigram'" in sql else 'unicode61'
+        _index_state[using] = state
+    return state.get(index)
+
+
+def build_match(index, query, columns=None, using='default'):
+    """Return an FTS5 MATCH expression for `query`, or None when FTS cannot serve it."""
+    tokenizer = _tokenizer(index, using)
+    query = (query or '').strip()
+    if not tokenizer or not query:
+        return None
+
+    columns = columns or SEARCH_INDEXES[index]['columns']
+    column_filter = '{' + ' '.join(columns) + '}'
+    if tokenizer == 'trigram':
+        if len(query) < TRIGRAM_MIN_LENGTH:
+            return None
+        # The whole query as one phrase == substring match, like icontains.
+        return f'{column_filter} : "' + query.replace('"', '""') + '"'
+
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return None
+    return f'{column_filter} : (' + ' AND '.join(f'"{term}"*' for term in terms) + ')'
+
+
+def _fallback_q(index, query, columns=None):
+    columns = columns or SEARCH_INDEXES[index]['columns']
+    return reduce(or_, (Q(**{f'{col}__icontains': query}) for col in columns))
+
+
+def search_queryset(queryset, index, query, columns=None):
+    """Filter `queryset` to rows matching `query` in the given index columns."""
+    match = build_match(index, query, columns, using=queryset.db)
+    if match is None:
+        return queryset.filter(_fallback_q(index, query, columns))
+    fts = _fts_table(index)
+    return queryset.filter(pk__in=RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [match]))
+
+
+
+def ranked_ids(index, query, limit=50, columns=None, using='default'):
+    """Return up to `limit` matching primary keys, best bm25 rank first."""
+    match = build_match(index, query, columns, using=using)
+    if match is None:
+        model = apps.get_model(SEARCH_INDEXES[index]['model'])
+        qs = model.objects.using(using).filter(_fallback_q(index, query, columns)).order_by('pk')
+        return list(qs.values_list('pk', flat=True)[:limit])
+
+    fts = _fts_table(index)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s ORDER BY rank LIMIT %s', [match, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def rank_order(index, query, columns=None, limit=RANKED_LIMIT, using='default'):
+    """Return a never-NULL sort key: a row's position among the `limit` best matches.
+
+    Rows past the limit (or not matching at all) share the key `limit`, so
+    order by it ascending and break ties with another column.
+    """
+    positions = [When(pk=pk, then=Value(position)) for position, pk in
+                 enumerate(ranked_ids(index, query, limit, columns, using))]
+    return Case(*positions, default=Value(limit), output_field=IntegerField())
@@ -0,0 +1,139 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import (
+    Attendance, ClassSession, ClassSessionAbsence, StudentMark, StudentSubject, ResultSheet, MentorActionLog,
+    MarksAuditTrail, MarksFreezeRule, Student,
+)
+from .attendance import refresh_attendance_rollups, unpack_roster
+from .marks import invalidate_marks_statistics
+from .profile_cache import bump_student_data_version
+from .result_cache import forget_public_results
+from .risk import queue_risk_refresh
+from .search import ensure_search_index
+
+
+# Bulk write paths that bypass save() (bulk_create/update) call
+# refresh_attendance_rollups() / queue_risk_refresh() /
+# bump_student_data_version() / forget_public_results() themselves.
+@receiver(post_save, sender=Attendance)
+def refresh_rollup_on_attendance(sender, instance, **kwargs):
+    refresh_attendance_rollups([instance.student_id], [instance.subject_id], [instance.date.replace(day=1)])
+
+
+@receiver(post_save, sender=ClassSessionAbsence)
+def refresh_rollup_on_absence(sender, instance, **kwargs):
+    session = instance.session
+    refresh_attendance_rollups([instance.student_id], [session.subject_id], [session.date.replace(day=1)])
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_save, sender=ClassSessionAbsence)
+@receiver(post_save, sender=StudentMark)
+def refresh_risk_on_write(sender, instance, **kwargs):
+    queue_risk_refresh([instance.student_id])
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_save, sender=ClassSessionAbsence)
+@receiver(post_save, sender=StudentMark)
+@receiver(post_save, sender=StudentSubject)
+@receiver(post_save, sender=ResultSheet)
+@receiver(post_save, sender=MentorActionLog)
+@receiver(post_save, sender=MarksAuditTrail)
+def invalidate_profile_on_write(sender, instance, **kwargs):
+    bump_student_data_version([instance.student_id])
+
+
+@receiver(post_save, sender=StudentMark)
+@receiver(post_save, sender=MarksFreezeRule)
+@receiver(post_delete, sender=StudentMark)
+@receiver(post_delete, sender=MarksFreezeRule)
+def invalidate_marks_statistics_on_write(sender, instance, **kwargs):
+    invalidate_marks_statistics(instance.subject_id, instance.exam_type, instance.exam_session, instance.attempt_no)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def forget_public_result_on_student_write(sender, instance, **kwargs):
+    forget_public_results([instance.enrollment_no])
+
+
+@receiver(post_save, sender=ResultSheet)
+@receiver(post_delete, sender=ResultSheet)
+def forget_public_result_on_sheet_write(sender, instance, **kwargs):
+    forget_public_results(Student.objects.filter(pk=instance.student_id).values_list('enrollment_no', flat=True))
+
+
+# Deletes, including every row of a cascade, are collected per thread and
+# refreshed in one pass once the transaction commits (_refresh_after_deletes).
+_deleted = threading.local()
+
+
+def _pending_deletes():
+    pending = getattr(_deleted, 'pending', None)
+    if pending is None:
+        pending = _deleted.pending = {
+            'students': set(), 'rollup_students': set(), 'subjects': set(), 'months': set(), 'sessions': set(),
+        }
+    # Registered for every row: only the first callback finds work, and rows
+    # queued in a rolled-back transaction are picked up by the next commit.
+    transaction.on_commit(_refresh_after_deletes)
+    return pending
+
+
+def _refresh_after_deletes():
+    pending = getattr(_deleted, 'pending', None)
+    _deleted.pending = None
+    if not pending:
+        return
+    # Absences whose session outlived the delete; a deleted session queued its own subject and month.
+    for subject_id, day in ClassSession.objects.filter(pk__in=pending['sessions']).values_list('subject_id', 'date'):
+        pending['subjects'].add(subject_id)
+        pending['months'].add(day.replace(day=1))
+    if pending['rollup_students']:
+        refresh_attendance_rollups(pending['rollup_students'], pending['subjects'], pending['months'])
+    queue_risk_refresh(pending['students'])
+    bump_student_data_version(pending['students'])
+
+
+def _queue_rollup_refresh(student_ids, subject_id=None, day=None):
+    pending = _pending_deletes()
+    pending['rollup_students'].update(student_ids)
+    pending['students'].update(student_ids)
+    if subject_id is not None:
+        pending['subjects'].add(subject_id)
+        pending['months'].add(day.replace(day=1))
+    return pending
+
+
+@receiver(post_delete, sender=Attendance)
+def refresh_after_attendance_delete(sender, instance, **kwargs):
+    _queue_rollup_refresh([instance.student_id], instance.subject_id, instance.date)
+
+
+@receiver(post_delete, sender=ClassSessionAbsence)
+def refresh_after_absence_delete(sender, instance, **kwargs):
+    _queue_rollup_refresh([instance.student_id])['sessions'].add(instance.session_id)
+
+
+@receiver(post_delete, sender=ClassSession)
+def refresh_after_session_delete(sender, instance, **kwargs):
+    _queue_rollup_refresh(unpack_roster(instance.roster), instance.subject_id, instance.date)
+
+
+@receiver(post_delete, sender=StudentMark)
+@receiver(post_delete, sender=StudentSubject)
+@receiver(post_delete, sender=ResultSheet)
+@receiver(post_delete, sender=MentorActionLog)
+@receiver(post_delete, sender=MarksAuditTrail)
+def refresh_after_delete(sender, instance, **kwargs):
+    _pending_deletes()['students'].add(instance.student_id)
+
+
+def ensure_search_index_after_migrate(sender, using, **kwargs):
+    # Connected in AllocationConfig.ready(); migrations that rebuild a table drop its triggers.
+    ensure_search_index(using=using)
@@ -1,3 +1,1591 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .attendance import (
+    attendance_counts, class_attendance_statuses, convert_rows_to_sessions, enrollments_changed, raw_attendance_counts,
+    refresh_attendance_rollups, save_class_attendance, unpack_roster,
+)
+from .ingest import (
+    RESULT_UPLOAD, STUDENT_UPLOAD, Field, Schema, bulk_create_students, iter_table, iter_workbook_rows, publish_results,
+    read_table, read_workbook, report_upload_progress, save_result_rows,
+)
+from .marks import (
+    mark_version, marks_audit_queryset, marks_statistics, preview_marks_import, read_marks_sheet, save_marks_bulk,
+)
+from .models import (
+    Attendance, AttendanceRollup, Branch, ClassSession, ClassSessionAbsence, Faculty, MarksAuditTrail, MarksFreezeRule,
+    MentorActionLog, MentorAssignment, Notice, ResultEntry, ResultSheet, Semester, Student, StudentMark,
+    StudentRiskSnapshot, StudentSubject, Subject,
+)
+from .pagination import keyset_page
+from .profile_cache import get_cached_profile_sections, student_data_version
+from .result_cache import get_public_result, public_result_key
+from .result_pdfs import prerender_result_pdfs, result_pdf_path
+from .risk import compute_cohort_risk, refresh_risk_snapshots
+from .search import build_match, ranked_ids, search_queryset
+from .timeline import timeline_page
+
+
+def make_cohort(size=6, semester_no=5, divisions=('A', 'B')):
+    """A branch and semester with two subjects and `size` students enrolled in both."""
+    branch = Branch.objects.create(name='Computer Engineering', code='CE')
+    semester = Semester.objects.create(number=semester_no)
+    subjects = [
+        Subject.objects.create(code=f'CE{semester_no}0{idx}', name=f'Subject {idx}', branch=branch, semester=semester)
+        for idx in (1, 2)
+    ]
+    students = [
+        Student.objects.create(
+            enrollment_no=f'24CE{idx:04d}',
+            name=f'Student {idx}',
+            branch=branch,
+            semester=semester,
+            division=divisions[idx % len(divisions)],
+            admission_year=2024,
+        )
+        for idx in range(size)
+    ]
+    StudentSubject.objects.bulk_create(
+        [StudentSubject(student=student, subject=subject) for student in students for subject in subjects]
+    )
+    return branch, semester, subjects, students
+
+
+def legacy_risk(student):
+    """The per-student scorer compute_cohort_risk() replaced, kept as the reference."""
+    records = Attendance.objects.filter(student=student)
+    total = records.count()
+    attendance_pct = round(records.filter(status='P').count() * 100.0 / total, 1) if total else None
+
+    fail_count = 0
+    valid_percentages = []
+    for record in StudentMark.objects.filter(student=student).order_by('-updated_at')[:30]:
+        if record.is_absent:
+            fail_count += 1
+            continue
+        if record.pass_marks is not None and record.marks_obtained is not None and record.marks_obtained < record.pass_marks:
+            fail_count += 1
+        if record.marks_obtained is not None and record.max_marks and record.max_marks > 0:
+            valid_percentages.append(float(record.marks_obtained) * 100.0 / float(record.max_marks))
+    avg_marks_pct = round(sum(valid_percentages) / len(valid_percentages), 1) if valid_percentages else None
+
+    score = 0
+    if attendance_pct is not None:
+        score += 25 if attendance_pct < 75 else 0
+        score += 15 if attendance_pct < 60 else 0
+    if fail_count:
+        score += min(40, fail_count * 12)
+    if avg_marks_pct is not None:
+        score += 20 if avg_marks_pct < 50 else 10 if avg_marks_pct < 65 else 0
+    latest, previous = valid_percentages[:5], valid_percentages[5:10]
+    if latest and previous and sum(latest) / len(latest) + 8 < sum(previous) / len(previous):
+        score += 10
+    level = 'HIGH' if score >= 60 else 'MEDIUM' if score >= 35 else 'LOW'
+    return {'score': min(score, 100), 'level': level, 'attendance_pct': attendance_pct,
+            'avg_marks_pct': avg_marks_pct, 'fail_count': fail_count}
+
+
+class CohortTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.branch, cls.semester, cls.subjects, cls.students = make_cohort()
+
+    def setUp(self):
+        cache.clear()
+
+
+class MarkedCohortTestCase(CohortTestCase):
+    """The cohort with attendance and twelve marks per student, varied enough to span every risk level."""
+
+    def setUp(self):
+        super().setUp()
+        start = date(2026, 7, 1)
+        for idx, student in enumerate(self.students):
+            # Student idx misses every (idx + 2)th class and scores lower the higher idx is;
+            # odd students also dropped 10 marks in their five newest exams (a declining trend).
+            Attendance.objects.bulk_create([
+                Attendance(student=student, subject=self.subjects[day % 2], date=start + timedelta(days=day),
+                           status='A' if (day + 1) % (idx + 2) == 0 else 'P')
+                for day in range(20)
+            ])
+            marks = [
+                StudentMark(student=student, subject=self.subjects[0], semester=self.semester, exam_type='MID',
+                            exam_session=f'S{attempt:02d}', max_marks=Decimal('50'), pass_marks=Decimal('20'),
+                            marks_obtained=None if attempt == idx else Decimal(45 - idx * 5 - (10 if attempt < 5 and idx % 2 else 0)),
+                            is_absent=attempt == idx)
+                for attempt in range(12)
+            ]
+            StudentMark.objects.bulk_create(marks)
+        refresh_attendance_rollups(self.students)
+        # Distinct timestamps, so both scorers see the same "most recent" order.
+        now = timezone.now()
+        for offset, pk in enumerate(StudentMark.objects.order_by('pk').values_list('pk', flat=True)):
+            StudentMark.objects.filter(pk=pk).update(updated_at=now - timedelta(minutes=offset))
+
+
+class CohortRiskTests(MarkedCohortTestCase):
+    def test_cohort_scores_match_the_per_student_scorer(self):
+        risk = compute_cohort_risk(Student.objects.all())
+        self.assertEqual(set(risk), {s.id for s in self.students})
+        for student in self.students:
+            expected = legacy_risk(student)
+            self.assertEqual({key: risk[student.id][key] for key in expected}, expected, student.enrollment_no)
+        self.assertGreater(len({r['level'] for r in risk.values()}), 1)
+
+    def test_cohort_runs_a_fixed_number_of_queries(self):
+        with self.assertNumQueries(3):
+            compute_cohort_risk(Student.objects.all())
+        with self.assertNumQueries(2):
+            compute_cohort_risk(self.students[:2])
+
+
+class RiskSnapshotTests(MarkedCohortTestCase):
+    def test_refresh_stores_the_computed_risk(self):
+        self.assertEqual(refresh_risk_snapshots([s.id for s in self.students]), len(self.students))
+        risk = compute_cohort_risk(self.students)
+        snapshots = {snap.student_id: snap.as_risk() for snap in StudentRiskSnapshot.objects.all()}
+        self.assertEqual(snapshots, risk)
+
+    def test_refresh_updates_existing_snapshots(self):
+        student = self.students[0]
+        refresh_risk_snapshots([student.id])
+        StudentMark.objects.filter(student=student).update(marks_obtained=Decimal('0'))
+        refresh_risk_snapshots([student.id])
+        self.assertEqual(StudentRiskSnapshot.objects.filter(student=student).count(), 1)
+        self.assertEqual(StudentRiskSnapshot.objects.get(student=student).as_risk(), compute_cohort_risk([student])[student.id])
+
+    def test_mark_save_refreshes_the_snapshot_on_commit(self):
+        student = self.students[1]
+        mark = StudentMark.objects.filter(student=student).first()
+        mark.is_absent = True
+        with self.captureOnCommitCallbacks(execute=True):
+            mark.save()
+        self.assertEqual(StudentRiskSnapshot.objects.get(student=student).as_risk(), compute_cohort_risk([student])[student.id])
+
+    def test_mark_delete_refreshes_the_snapshot_on_commit(self):
+        student = self.students[3]
+        refresh_risk_snapshots([student.id])
+        before = StudentRiskSnapshot.objects.get(student=student).as_risk()
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentMark.objects.filter(student=student, exam_session__lt='S06').delete()
+        self.assertNotEqual(StudentRiskSnapshot.objects.get(student=student).as_risk(), before)
+        self.assertEqual(StudentRiskSnapshot.objects.get(student=student).as_risk(), compute_cohort_risk([student])[student.id])
+
+    def test_student_list_filters_and_sorts_on_snapshots(self):
+        refresh_risk_snapshots([s.id for s in self.students])
+        self.client.force_login(User.objects.create_user('examcell', password='x', is_staff=True))
+        levels = dict(StudentRiskSnapshot.objects.values_list('student_id', 'level'))
+        for level in ('HIGH', 'MEDIUM', 'LOW'):
+            response = self.client.get(reverse('student_list'), {'risk_level': level})
+            listed = {row['student'].id for row in response.context['students']}
+            self.assertEqual(listed, {sid for sid, value in levels.items() if value == level})
+
+        response = self.client.get(reverse('student_list'), {'sort': 'risk', 'order': 'desc'})
+        scores = [row['risk']['score'] for row in response.context['students']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+
+class KeysetPageTests(CohortTestCase):
+    def walk(self, key, descending=False, page_size=4):
+        ids, cursor = [], None
+        while True:
+            page = keyset_page(Student.objects.all(), key, descending=descending, after=cursor, page_size=page_size)
+            ids += [student.pk for student in page['rows']]
+            if not page['has_next']:
+                return ids
+            cursor = page['next_cursor']
+
+    def test_next_cursors_walk_every_row_once(self):
+        # Equal keys: the pk breaks the tie, so no row is skipped or repeated at a page edge.
+        Student.objects.filter(pk__in=[s.pk for s in self.students[1:5]]).update(name='Same Name')
+        expected = list(Student.objects.order_by('name', 'pk').values_list('pk', flat=True))
+        self.assertEqual(self.walk('name', page_size=2), expected)
+        self.assertEqual(self.walk('name', descending=True, page_size=4), expected[::-1])
+
+    def test_prev_cursor_returns_the_previous_page(self):
+        first = keyset_page(Student.objects.all(), 'enrollment_no', page_size=2)
+        self.assertFalse(first['has_prev'])
+        second = keyset_page(Student.objects.all(), 'enrollment_no', after=first['next_cursor'], page_size=2)
+        self.assertTrue(second['has_prev'])
+        back = keyset_page(Student.objects.all(), 'enrollment_no', before=second['prev_cursor'], page_size=2)
+        self.assertEqual(back['rows'], first['rows'])
+        self.assertTrue(back['has_next'])
+        self.assertFalse(back['has_prev'])
+
+    def test_cursor_from_another_salt_returns_the_first_page(self):
+        first = keyset_page(Student.objects.all(), 'name', page_size=2, salt='by-name')
+        other = keyset_page(Student.objects.all(), 'name', after=first['next_cursor'], page_size=2, salt='by-year')
+        self.assertEqual(other['rows'], first['rows'])
+        self.assertFalse(other['has_prev'])
+        tampered = keyset_page(Student.objects.all(), 'name', after=first['next_cursor'] + 'x', page_size=2,
+                               salt='by-name')
+        self.assertEqual(tampered['rows'], first['rows'])
+
+
+class SearchTests(CohortTestCase):
+    def search(self, index, query, model=Student):
+        return set(search_queryset(model.objects.all(), index, query).values_list('pk', flat=True))
+
+    def add_students(self, *names):
+        return Student.objects.bulk_create([
+            Student(enrollment_no=f'24CE9{idx:03d}', name=name, branch=self.branch, semester=self.semester)
+            for idx, name in enumerate(names)
+        ])
+
+    def test_trigram_index_matches_any_substring(self):
+        self.assertEqual(self.search('student', 'ce0003'), {self.students[3].pk})
+        self.assertEqual(self.search('student', 'dent 4'), {self.students[4].pk})
+        self.assertEqual(self.search('subject', 'ject 2', model=Subject), {self.subjects[1].pk})
+
+    def test_notice_words_match_by_prefix(self):
+        notice = Notice.objects.create(title='Examination timetable', body='Mid-semester exams start on Monday.')
+        Notice.objects.create(title='Holiday', body='The campus stays closed.')
+        self.assertEqual(self.search('notice', 'exam time', model=Notice), {notice.pk})
+        self.assertEqual(self.search('notice', 'mon', model=Notice), {notice.pk})
+        # Word tokens: the middle of a word is not a match.
+        self.assertEqual(self.search('notice', 'xamination', model=Notice), set())
+
+    def test_triggers_follow_bulk_writes(self):
+        student, = self.add_students('Zephyrine Okafor')
+        self.assertEqual(self.search('student', 'zephyr'), {student.pk})
+        Student.objects.filter(pk=student.pk).update(name='Quillon Okafor')
+        self.assertEqual(self.search('student', 'zephyr'), set())
+        self.assertEqual(self.search('student', 'quillon'), {student.pk})
+        Student.objects.filter(pk=student.pk).delete()
+        self.assertEqual(self.search('student', 'okafor'), set())
+
+    def test_short_queries_fall_back_to_icontains(self):
+        self.assertIsNone(build_match('student', 't5'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.search('student', '05'), {self.students[5].pk})
+        self.assertIn('LIKE', queries.captured_queries[0]['sql'])
+        self.assertEqual(ranked_ids('student', '05'), [self.students[5].pk])
+
+    def test_ranked_ids_put_the_best_match_first(self):
+        weak, strong = self.add_students('Okafor Adebayo-Williamson', 'Okafor Okafor')
+        self.assertEqual(ranked_ids('student', 'okafor'), [strong.pk, weak.pk])
+        self.assertEqual(ranked_ids('student', 'okafor', limit=1), [strong.pk])
+
+    def test_student_list_orders_matches_by_relevance(self):
+        weak, strong = self.add_students('Okafor Adebayo-Williamson', 'Okafor Okafor')
+        self.client.force_login(User.objects.create_user('examcell', password='x', is_staff=True))
+        response = self.client.get(reverse('student_list'), {'query': 'okafor'})
+        self.assertEqual([row['student'].pk for row in response.context['students']], [strong.pk, weak.pk])
+        response = self.client.get(reverse('student_list'), {'query': 'okafor', 'sort': 'enrollment_no'})
+        self.assertEqual([row['student'].pk for row in response.context['students']], [weak.pk, strong.pk])
+
+    def test_admin_search_orders_matches_by_relevance(self):
+        weak, strong = self.add_students('Okafor Adebayo-Williamson', 'Okafor Okafor')
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        response = self.client.get(reverse('admin:allocation_student_changelist'), {'q': 'okafor'})
+        self.assertEqual([student.pk for student in response.context['cl'].result_list], [strong.pk, weak.pk])
+
+
+class ProfileCacheTests(CohortTestCase):
+    def setUp(self):
+        super().setUp()
+        self.builds = 0
+
+    def cached_profile(self, student):
+        def build():
+            self.builds += 1
+            return self.builds
+        return get_cached_profile_sections(student.id, build)
+
+    def test_writes_invalidate_the_cached_profile(self):
+        student, other = self.students[:2]
+        self.assertEqual(self.cached_profile(student), 1)
+        self.assertEqual(self.cached_profile(student), 1)
+        extra = Subject.objects.create(code='CE599', name='Elective', branch=self.branch, semester=self.semester)
+        writes = [
+            lambda: StudentMark.objects.create(student=student, subject=self.subjects[0], semester=self.semester,
+                                               exam_type='MID', exam_session='OCT 2026', marks_obtained=Decimal('40')),
+            lambda: Attendance.objects.create(student=student, subject=self.subjects[0], date=date(2026, 9, 1),
+                                              status='P'),
+            lambda: StudentSubject.objects.create(student=student, subject=extra),
+            lambda: StudentSubject.objects.filter(student=student, subject=extra).delete(),
+        ]
+        for expected, write in enumerate(writes, start=2):
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            self.assertEqual(self.cached_profile(student), expected)
+        self.assertEqual(self.cached_profile(student), len(writes) + 1)
+
+        # Another student's entry is untouched by these writes.
+        cached = self.cached_profile(other)
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(student=student, subject=self.subjects[1], date=date(2026, 9, 2), status='A')
+        self.assertEqual(self.cached_profile(other), cached)
+
+    def test_bump_waits_for_the_commit(self):
+        student = self.students[0]
+        version = student_data_version(student.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Attendance.objects.create(student=student, subject=self.subjects[0], date=date(2026, 9, 1), status='P')
+            self.assertEqual(student_data_version(student.id), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(student_data_version(student.id), version)
+
+
+class TimelineTests(CohortTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = self.students[0]
+        self.moment = timezone.now().replace(microsecond=0)
+        marks = StudentMark.objects.bulk_create([
+            StudentMark(student=self.student, subject=self.subjects[0], semester=self.semester, exam_type='MID',
+                        exam_session=f'S{idx:02d}', marks_obtained=Decimal('40'))
+            for idx in range(5)
+        ])
+        logs = MentorActionLog.objects.bulk_create([
+            MentorActionLog(student=self.student, note=f'note {idx}') for idx in range(3)
+        ])
+        sheet = ResultSheet.objects.create(student=self.student, semester=self.semester, exam_session='NOV 2026')
+        # Two marks, two logs and the sheet share one timestamp; the rest are older.
+        for model, pks in ((StudentMark, [m.pk for m in marks]), (MentorActionLog, [log.pk for log in logs])):
+            field = 'updated_at' if model is StudentMark else 'created_at'
+            for offset, pk in enumerate(pks):
+                model.objects.filter(pk=pk).update(**{field: self.moment - timedelta(days=max(offset - 1, 0) * 2)})
+        ResultSheet.objects.filter(pk=sheet.pk).update(created_at=self.moment)
+        MentorActionLog.objects.create(student=self.students[1], note='another student')
+
+    def expected_keys(self):
+        keys = [(mark.updated_at, 'MARK', mark.pk) for mark in StudentMark.objects.filter(student=self.student)]
+        keys += [(log.created_at, 'MENTOR', log.pk) for log in MentorActionLog.objects.filter(student=self.student)]
+        keys += [(sheet.created_at, 'RESULT', sheet.pk) for sheet in ResultSheet.objects.filter(student=self.student)]
+        return [(when, event_type) for when, event_type, _ in sorted(keys, reverse=True)]
+
+    def walk(self, page_size):
+        items, cursor, pages = [], None, 0
+        while True:
+            page = timeline_page(self.student.id, after=cursor, page_size=page_size)
+            items += page['items']
+            pages += 1
+            if not page['has_next']:
+                return items, pages
+            cursor = page['next_cursor']
+
+    def test_pages_merge_the_sources_newest_first(self):
+        expected = self.expected_keys()
+        self.assertEqual(len(expected), 9)
+        # Ties on the date are ordered by type, then id, so a page edge inside them loses nothing.
+        self.assertEqual([event_type for _, event_type in expected[:5]], ['RESULT', 'MENTOR', 'MENTOR', 'MARK', 'MARK'])
+        for page_size in (1, 2, 4, 20):
+            items, pages = self.walk(page_size)
+            self.assertEqual([(item['date'], item['type']) for item in items], expected, page_size)
+            self.assertEqual(pages, -(-len(expected) // page_size))
+        # Notes 0 and 1 share the timestamp, so the higher id comes first.
+        notes = [item['meta'] for item in self.walk(3)[0] if item['type'] == 'MENTOR']
+        self.assertEqual(notes, ['System: note 1', 'System: note 0', 'System: note 2'])
+
+    def test_tampered_cursor_returns_the_first_page(self):
+        first = timeline_page(self.student.id, page_size=3)
+        for cursor in (first['next_cursor'] + 'x', 'garbage', ''):
+            page = timeline_page(self.student.id, after=cursor, page_size=3)
+            # Cursors carry a signing timestamp, so compare the pages rather than the tokens.
+            self.assertEqual((page['items'], page['has_next']), (first['items'], first['has_next']))
+
+    def test_json_view_pages_with_the_cursor(self):
+        self.client.force_login(User.objects.create_user('examcell', is_staff=True))
+        MentorActionLog.objects.bulk_create([MentorActionLog(student=self.student, note='older') for _ in range(15)])
+        url = reverse('student_timeline_json', args=[self.student.id])
+        first = self.client.get(url).json()
+        self.assertTrue(first['has_next'])
+        second = self.client.get(url, {'after': first['next_cursor']}).json()
+        self.assertEqual((len(first['items']), len(second['items'])), (20, 4))
+        self.assertFalse(second['has_next'])
+        self.assertEqual(self.client.get(url, {'after': 'garbage'}).json()['items'], first['items'])
+
+
+class ClassAttendanceTests(CohortTestCase):
+    day = date(2026, 9, 1)
+
+    def assertRollupsMatchRaw(self):
+        raw = raw_attendance_counts(self.students)
+        stored = {
+            (row.student_id, row.subject_id, row.month): (row.present, row.total)
+            for row in AttendanceRollup.objects.all()
+        }
+        self.assertEqual(stored, raw)
+
+    def test_save_writes_one_row_per_enrolled_student(self):
+        subject = self.subjects[0]
+        absent = self.students[0].id
+        self.assertEqual(save_class_attendance(subject, self.day, {absent: 'A'}), len(self.students))
+        self.assertEqual(
+            class_attendance_statuses(subject, self.day),
+            {s.id: 'A' if s.id == absent else 'P' for s in self.students},
+        )
+        self.assertEqual(attendance_counts([absent], [subject])[absent], (0, 1))
+        self.assertRollupsMatchRaw()
+
+    def test_resave_only_writes_changed_students(self):
+        subject = self.subjects[0]
+        save_class_attendance(subject, self.day, {})
+        self.assertEqual(save_class_attendance(subject, self.day, {}), 0)
+        self.assertEqual(save_class_attendance(subject, self.day, {self.students[1].id: 'A'}), 1)
+        self.assertEqual(len(class_attendance_statuses(subject, self.day)), len(self.students))
+        self.assertEqual(attendance_counts([self.students[1]], [subject])[self.students[1].id], (0, 1))
+        self.assertRollupsMatchRaw()
+
+    def test_save_is_limited_to_the_given_divisions(self):
+        save_class_attendance(self.subjects[0], self.day, {}, divisions=['A'])
+        marked = set(class_attendance_statuses(self.subjects[0], self.day))
+        self.assertEqual(marked, {s.id for s in self.students if s.division == 'A'})
+
+    def test_unknown_status_falls_back_to_default(self):
+        student = self.students[2]
+        save_class_attendance(self.subjects[0], self.day, {student.id: 'X'}, default_status='A')
+        self.assertEqual(class_attendance_statuses(self.subjects[0], self.day)[student.id], 'A')
+
+    def test_deletes_refresh_derived_data_on_commit(self):
+        subject, student = self.subjects[0], self.students[0]
+        save_class_attendance(subject, self.day, {student.id: 'A'})
+        save_class_attendance(subject, self.day + timedelta(days=1), {})
+        version = student_data_version(student.id)
+        self.assertEqual(attendance_counts([student], [subject])[student.id], (1, 2))
+        # The absence is a row in one layout and a ClassSessionAbsence in the other.
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.filter(student=student, date=self.day).delete()
+            ClassSessionAbsence.objects.filter(student=student).delete()
+        self.assertNotEqual(attendance_counts([student], [subject])[student.id], (1, 2))
+        self.assertNotEqual(student_data_version(student.id), version)
+        self.assertTrue(StudentRiskSnapshot.objects.filter(student=student).exists())
+        self.assertRollupsMatchRaw()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.all().delete()
+            ClassSession.objects.all().delete()
+        self.assertEqual(attendance_counts(self.students), {})
+        self.assertFalse(AttendanceRollup.objects.exists())
+
+    def test_query_count_does_not_grow_with_the_class(self):
+        with CaptureQueriesContext(connection) as one_division:
+            save_class_attendance(self.subjects[0], self.day, {}, divisions=['A'])
+        with CaptureQueriesContext(connection) as whole_class:
+            save_class_attendance(self.subjects[1], self.day, {})
+        self.assertEqual(len(one_division), len(whole_class))
+
+
+@override_settings(ATTENDANCE_STORAGE='sessions')
+class SessionAttendanceTests(ClassAttendanceTests):
+    """The same behaviour with the class-session layout, plus what the recorded roster guarantees."""
+
+    def test_resave_only_writes_changed_students(self):
+        # A session is rewritten as a whole, but only changed students' rollups move.
+        subject = self.subjects[0]
+        save_class_attendance(subject, self.day, {})
+        with CaptureQueriesContext(connection) as unchanged:
+            save_class_attendance(subject, self.day, {})
+        self.assertFalse([q for q in unchanged.captured_queries if 'allocation_attendancerollup' in q['sql']
+                          and q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))])
+        save_class_attendance(subject, self.day, {self.students[1].id: 'A'})
+        self.assertEqual(attendance_counts([self.students[1]], [subject])[self.students[1].id], (0, 1))
+        self.assertRollupsMatchRaw()
+
+    def test_query_count_does_not_grow_with_the_class(self):
+        # One session per division, so compare classes with the same number of divisions.
+        Student.objects.filter(pk__in=[s.pk for s in self.students[:4]]).update(division='C')
+        with CaptureQueriesContext(connection) as small:
+            save_class_attendance(self.subjects[0], self.day, {}, divisions=['A'])
+        with CaptureQueriesContext(connection) as large:
+            save_class_attendance(self.subjects[1], self.day, {}, divisions=['C'])
+        self.assertEqual(len(small), len(large))
+
+    def test_sessions_store_only_absences(self):
+        save_class_attendance(self.subjects[0], self.day, {self.students[0].id: 'A'})
+        self.assertFalse(Attendance.objects.exists())
+        self.assertEqual(ClassSessionAbsence.objects.count(), 1)
+        # The roster is packed into the session row, four bytes per student.
+        sessions = {session.division: session for session in ClassSession.objects.all()}
+        self.assertEqual(set(sessions), {'A', 'B'})
+        for division, session in sessions.items():
+            roster = sorted(s.id for s in self.students if s.division == division)
+            self.assertEqual(list(unpack_roster(session.roster)), roster)
+            self.assertEqual((session.head_count, len(session.roster)), (len(roster), 4 * len(roster)))
+
+    def test_both_layouts_report_the_same_counts(self):
+        absences = {s.id: 'A' for s in self.students[::3]}
+        save_class_attendance(self.subjects[0], self.day, absences)
+        with override_settings(ATTENDANCE_STORAGE='rows'):
+            save_class_attendance(self.subjects[0], self.day + timedelta(days=1), absences)
+            save_class_attendance(self.subjects[1], self.day, absences)
+        from_sessions = attendance_counts(self.students, [self.subjects[0]])
+        self.assertTrue(all(total == 2 for _, total in from_sessions.values()))
+        self.assertEqual(
+            {sid: present for sid, (present, _) in from_sessions.items()},
+            {s.id: 0 if s.id in absences else 2 for s in self.students},
+        )
+        self.assertEqual(attendance_counts(self.students, [self.subjects[1]]), {
+            s.id: (0 if s.id in absences else 1, 1) for s in self.students
+        })
+        self.assertRollupsMatchRaw()
+
+    def test_saving_in_one_layout_replaces_the_other(self):
+        subject = self.subjects[0]
+        save_class_attendance(subject, self.day, {})
+        with override_settings(ATTENDANCE_STORAGE='rows'):
+            save_class_attendance(subject, self.day, {self.students[0].id: 'A'})
+        self.assertFalse(ClassSession.objects.exists())
+        save_class_attendance(subject, self.day, {})
+        self.assertFalse(Attendance.objects.exists())
+        self.assertEqual(attendance_counts(self.students, [subject]), {s.id: (1, 1) for s in self.students})
+        self.assertRollupsMatchRaw()
+
+    def test_late_enrolment_is_not_credited_with_earlier_sessions(self):
+        subject = self.subjects[0]
+        save_class_attendance(subject, self.day, {})
+        late = Student.objects.create(
+            enrollment_no='24CE9999', name='Late', branch=self.branch, semester=self.semester, division='A',
+        )
+        StudentSubject.objects.create(student=late, subject=subject)
+        refresh_attendance_rollups([late])
+        self.assertEqual(attendance_counts([late], [subject]), {})
+        self.assertNotIn(late.id, class_attendance_statuses(subject, self.day))
+
+        save_class_attendance(subject, self.day + timedelta(days=1), {})
+        self.assertEqual(attendance_counts([late], [subject]), {late.id: (1, 1)})
+
+    def test_past_sessions_survive_division_moves_and_unenrolment(self):
+        subject = self.subjects[0]
+        moved, dropped = self.students[0], self.students[1]
+        save_class_attendance(subject, self.day, {moved.id: 'A'})
+        before = raw_attendance_counts(self.students, [subject])
+
+        moved.division = 'B' if moved.division == 'A' else 'A'
+        moved.save()
+        StudentSubject.objects.filter(student=dropped, subject=subject).delete()
+        self.assertEqual(raw_attendance_counts(self.students, [subject]), before)
+
+    def test_convert_rows_to_sessions_keeps_every_count(self):
+        with override_settings(ATTENDANCE_STORAGE='rows'):
+            for offset in range(3):
+                save_class_attendance(self.subjects[0], self.day + timedelta(days=offset), {
+                    s.id: 'A' for s in self.students[offset::3]
+                })
+        # Rows no longer match the enrolment: one student left, one joined another division.
+        StudentSubject.objects.filter(student=self.students[0], subject=self.subjects[0]).delete()
+        Student.objects.filter(pk=self.students[1].pk).update(division='C')
+        before = raw_attendance_counts(self.students)
+
+        stats = convert_rows_to_sessions()
+        self.assertEqual(stats['rows_converted'], 3 * len(self.students))
+        self.assertFalse(Attendance.objects.exists())
+        self.assertEqual(raw_attendance_counts(self.students), before)
+
+
+class AttendanceRollupTests(CohortTestCase):
+    def test_single_saves_refresh_their_month(self):
+        student, subject = self.students[0], self.subjects[0]
+        Attendance.objects.create(student=student, subject=subject, date=date(2026, 8, 3), status='P')
+        record = Attendance.objects.create(student=student, subject=subject, date=date(2026, 9, 3), status='P')
+        record.status = 'A'
+        record.save()
+        months = dict(AttendanceRollup.objects.filter(student=student).values_list('month', 'present'))
+        self.assertEqual(months, {date(2026, 8, 1): 1, date(2026, 9, 1): 0})
+        self.assertEqual(attendance_counts([student])[student.id], (1, 2))
+
+    def test_reconcile_fixes_drift(self):
+        save_class_attendance(self.subjects[0], date(2026, 9, 1), {self.students[0].id: 'A'})
+        Attendance.objects.filter(student=self.students[0]).delete()
+        AttendanceRollup.objects.filter(student=self.students[1]).update(present=0)
+        call_command('reconcile_attendance_rollups', stdout=StringIO())
+        self.assertNotIn(self.students[0].id, attendance_counts(self.students))
+        self.assertEqual(attendance_counts([self.students[1]])[self.students[1].id], (1, 1))
+
+    def test_enrolment_changes_leave_the_rollups_alone(self):
+        student, subject = self.students[0], self.subjects[0]
+        save_class_attendance(subject, date(2026, 9, 1), {})
+        StudentSubject.objects.filter(student=student, subject=subject).delete()
+        version = student_data_version(student.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                StudentSubject.objects.create(student=student, subject=subject)
+                enrollments_changed([student.id])
+        self.assertFalse([q for q in queries.captured_queries if 'allocation_attendancerollup' in q['sql']])
+        self.assertNotEqual(student_data_version(student.id), version)
+        self.assertEqual(attendance_counts([student], [subject])[student.id], (1, 1))
+
+
+class ElectiveUploadTests(CohortTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.electives = [
+            Subject.objects.create(code=f'EL{idx}', name=f'Elective {idx}', branch=cls.branch, semester=cls.semester,
+                                   is_elective=True, elective_group='G1')
+            for idx in (1, 2)
+        ]
+        cls.admin = User.objects.create_user('examcell', password='x', is_staff=True)
+
+    def upload(self, rows):
+        lines = ['enrollment_no,elective_group,subject_code'] + [','.join(row) for row in rows]
+        upload = SimpleUploadedFile('electives.csv', '\n'.join(lines).encode())
+        self.client.force_login(self.admin)
+        return self.client.post(reverse('manage_enrollments'), {
+            'branch': self.branch.id, 'semester': self.semester.id, 'action': 'upload_electives', 'file': upload,
+        })
+
+    def electives_of(self, student):
+        return set(StudentSubject.objects.filter(student=student, subject__in=self.electives)
+                   .values_list('subject__code', flat=True))
+
+    def test_upload_assigns_one_elective_per_group(self):
+        first, second, third = self.students[:3]
+        StudentSubject.objects.create(student=first, subject=self.electives[0])
+        with mock.patch('allocation.views.enrollments_changed') as changed:
+            response = self.upload([
+                (first.enrollment_no.lower(), 'G1', 'EL1'),
+                (second.enrollment_no, 'G1', 'EL1'),
+                (second.enrollment_no, 'G1', 'el2'),
+                (third.enrollment_no, 'g1', 'EL2'),
+                ('NOSUCH', 'G1', 'EL1'),
+            ])
+        self.assertEqual(response.status_code, 200)
+        results = response.context['upload_results']
+        self.assertEqual((results['created'], results['skipped'], results['total']), (3, 1, 5))
+        self.assertEqual(results['errors'], 1)
+        self.assertEqual(self.electives_of(first), {'EL1'})
+        self.assertEqual(self.electives_of(second), {'EL2'})
+        self.assertEqual(self.electives_of(third), {'EL2'})
+        # One refresh for the whole upload, covering only students whose enrolment changed.
+        self.assertEqual(changed.call_count, 1)
+        self.assertEqual(set(changed.call_args.args[0]), {second.id, third.id})
+
+    def test_upload_does_not_refresh_from_the_enrolment_signal(self):
+        with mock.patch('allocation.signals.refresh_attendance_rollups') as signal_refresh:
+            self.upload([(student.enrollment_no, 'G1', 'EL1') for student in self.students])
+        signal_refresh.assert_not_called()
+        self.assertEqual(
+            StudentSubject.objects.filter(subject=self.electives[0]).count(), len(self.students),
+        )
+
+
+class MarksBulkSaveTests(CohortTestCase):
+    def save(self, entries, **kwargs):
+        kwargs.setdefault('max_marks', Decimal('50'))
+        kwargs.setdefault('pass_marks', Decimal('20'))
+        return save_marks_bulk(self.subjects[0], self.semester, 'MID', 'OCT 2026', 1, entries, **kwargs)
+
+    def test_first_save_creates_rows_without_audit(self):
+        result = self.save({s.id: (False, Decimal(30 + idx)) for idx, s in enumerate(self.students)})
+        self.assertEqual(sorted(result['created']), sorted(s.id for s in self.students))
+        self.assertEqual(StudentMark.objects.count(), len(self.students))
+        self.assertFalse(MarksAuditTrail.objects.exists())
+
+    def test_changes_write_one_audit_row_each(self):
+        editor = User.objects.create_user('editor')
+        first, second, third = self.students[:3]
+        self.save({first.id: (False, Decimal('30')), second.id: (False, Decimal('40')), third.id: (False, Decimal('45'))})
+        result = self.save(
+            {first.id: (False, Decimal('35')), second.id: (True, None), third.id: (False, Decimal('45'))},
+            changed_by=editor, reason='Rechecked',
+        )
+        self.assertEqual(sorted(result['updated']), sorted([first.id, second.id]))
+        self.assertEqual(result['unchanged'], [third.id])
+        audits = {audit.student_id: audit for audit in MarksAuditTrail.objects.all()}
+        self.assertEqual(set(audits), {first.id, second.id})
+        self.assertEqual((audits[first.id].old_marks, audits[first.id].new_marks), (Decimal('30'), Decimal('35')))
+        self.assertEqual((audits[second.id].old_absent, audits[second.id].new_absent), (False, True))
+        self.assertIsNone(audits[second.id].new_marks)
+        self.assertEqual({(a.changed_by, a.reason, a.action) for a in audits.values()}, {(editor, 'Rechecked', 'UPDATE')})
+        self.assertEqual(audits[first.id].student_mark, StudentMark.objects.get(student=first))
+
+    def test_pass_mark_change_is_audited(self):
+        student = self.students[0]
+        self.save({student.id: (False, Decimal('30'))})
+        self.save({student.id: (False, Decimal('30'))}, pass_marks=Decimal('25'))
+        audit = MarksAuditTrail.objects.get()
+        self.assertEqual((audit.old_pass_marks, audit.new_pass_marks), (Decimal('20'), Decimal('25')))
+
+    def test_query_count_does_not_grow_with_the_column(self):
+        self.save({s.id: (False, Decimal('10')) for s in self.students})
+        with CaptureQueriesContext(connection) as one:
+            self.save({self.students[0].id: (False, Decimal('11'))})
+        with CaptureQueriesContext(connection) as all_rows:
+            self.save({s.id: (False, Decimal('12')) for s in self.students})
+        self.assertEqual(len(one), len(all_rows))
+
+    def test_stale_versions_are_not_written(self):
+        first, second = self.students[:2]
+        saved = self.save({first.id: (False, Decimal('30')), second.id: (False, Decimal('31'))}, versions={
+            first.id: '', second.id: '',
+        })['versions']
+        # Someone else saves the first student's mark in between.
+        self.save({first.id: (False, Decimal('33'))})
+        current = StudentMark.objects.get(student=first)
+
+        result = self.save(
+            {first.id: (False, Decimal('40')), second.id: (False, Decimal('41'))},
+            versions={first.id: saved[first.id], second.id: saved[second.id]},
+        )
+        self.assertEqual(list(result['stale']), [first.id])
+        self.assertEqual(mark_version(result['stale'][first.id]), mark_version(current))
+        self.assertEqual(result['updated'], [second.id])
+        self.assertEqual(StudentMark.objects.get(student=first).marks_obtained, Decimal('33'))
+        self.assertEqual(StudentMark.objects.get(student=second).marks_obtained, Decimal('41'))
+
+    def test_new_row_with_a_version_is_stale(self):
+        student = self.students[0]
+        result = self.save({student.id: (False, Decimal('30'))}, versions={student.id: 'made-up'})
+        self.assertEqual(result['stale'], {student.id: None})
+        self.assertFalse(StudentMark.objects.exists())
+
+
+class MarksAutosaveTests(CohortTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        user = User.objects.create_user('mentor')
+        cls.faculty = Faculty.objects.create(user=user, employee_id='F001')
+        MentorAssignment.objects.create(faculty=cls.faculty, semester=cls.semester, division='A')
+        cls.division_a = [s for s in cls.students if s.division == 'A']
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.faculty.user)
+
+    def post(self, cells, division=('A',), **sheet):
+        payload = {
+            'semester': self.semester.id, 'subject': self.subjects[0].id, 'division': list(division),
+            'exam_type': 'MID', 'exam_session': 'OCT 2026', 'attempt_no': 1, 'max_marks': '50', 'pass_marks': '20',
+            'cells': {str(student_id): cell for student_id, cell in cells.items()}, **sheet,
+        }
+        return self.client.post(reverse('marks_entry_save_json'), json.dumps(payload), content_type='application/json')
+
+    def test_saves_cells_and_returns_versions(self):
+        first, second = self.division_a[:2]
+        response = self.post({first.id: {'marks': '31.5', 'version': ''}, second.id: {'absent': True, 'version': ''}})
+        body = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body['errors'], {})
+        self.assertEqual(body['saved'][str(first.id)], mark_version(StudentMark.objects.get(student=first)))
+        self.assertEqual(StudentMark.objects.get(student=first).marks_obtained, Decimal('31.5'))
+        self.assertTrue(StudentMark.objects.get(student=second).is_absent)
+
+    def test_stale_cell_returns_the_current_mark(self):
+        student = self.division_a[0]
+        version = self.post({student.id: {'marks': '30', 'version': ''}}).json()['saved'][str(student.id)]
+        self.post({student.id: {'marks': '35', 'version': version}})
+        body = self.post({student.id: {'marks': '40', 'version': version}}).json()
+        self.assertEqual(body['saved'], {})
+        self.assertEqual(body['stale'][str(student.id)]['marks'], '35.00')
+        self.assertEqual(StudentMark.objects.get(student=student).marks_obtained, Decimal('35'))
+
+    def test_invalid_cells_are_reported_per_student(self):
+        first, second = self.division_a[:2]
+        outsider = next(s for s in self.students if s.division != 'A')
+        body = self.post({
+            first.id: {'marks': '12.345', 'version': ''},
+            second.id: {'marks': '51', 'version': ''},
+            outsider.id: {'marks': '10', 'version': ''},
+        }).json()
+        self.assertEqual(body['errors'], {
+            str(first.id): 'Marks can have at most 2 decimal places.',
+            str(second.id): 'Marks must be between 0 and 50.',
+            str(outsider.id): 'Student is not on this marks sheet.',
+        })
+        self.assertFalse(StudentMark.objects.exists())
+
+    def test_faculty_must_mentor_the_divisions(self):
+        response = self.post({}, division=('B',))
+        self.assertEqual(response.status_code, 403)
+
+
+class MarksImportTests(CohortTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user('examcell', is_staff=True)
+        cls.sheet = {
+            'semester': cls.semester.id, 'subject': cls.subjects[0].id, 'exam_type': 'MID',
+            'exam_session': 'OCT 2026', 'attempt_no': 1, 'max_marks': '50', 'pass_marks': '20',
+        }
+
+    def marks_file(self, *rows, header='Enrollment No,Marks,Absent'):
+        return SimpleUploadedFile('marks.csv', '\n'.join((header,) + rows).encode())
+
+    def preview(self, upload):
+        return preview_marks_import(
+            read_marks_sheet(upload), Student.objects.filter(semester=self.semester), self.subjects[0],
+            'MID', 'OCT 2026', 1, Decimal('50'), Decimal('20'),
+        )
+
+    def test_missing_columns_are_reported(self):
+        with self.assertRaisesMessage(ValueError, 'Missing required columns: marks.'):
+            read_marks_sheet(self.marks_file('24CE0000', header='Enrollment No'))
+
+    def test_preview_validates_rows_and_diffs_stored_marks(self):
+        first, second, third, fourth = self.students[:4]
+        save_marks_bulk(self.subjects[0], self.semester, 'MID', 'OCT 2026', 1, {
+            first.id: (False, Decimal('30')), second.id: (False, Decimal('40')),
+        }, max_marks=Decimal('50'), pass_marks=Decimal('20'))
+        preview = self.preview(self.marks_file(
+            f'{first.enrollment_no},30,',
+            f'{second.enrollment_no},AB,',
+            f'{third.enrollment_no},41.5,',
+            f'{fourth.enrollment_no},12.345,',
+            'NOSUCH,10,',
+            f'{self.students[4].enrollment_no},10,yes',
+            ',,',
+        ))
+        self.assertEqual(preview['counts'], {'new': 1, 'changed': 1, 'unchanged': 1, 'errors': 3})
+        self.assertEqual(preview['entries'], {
+            first.id: (False, Decimal('30')), second.id: (True, None), third.id: (False, Decimal('41.5')),
+        })
+        self.assertEqual(
+            [(change['enrollment_no'], change['old'], change['new'], change['status']) for change in preview['changes']],
+            [(second.enrollment_no, Decimal('40'), 'AB', 'changed'), (third.enrollment_no, None, Decimal('41.5'), 'new')],
+        )
+        # Data rows are numbered from 1 below the header, as in the other uploads.
+        self.assertEqual([(error['row'], error['message']) for error in preview['errors']], [
+            (4, 'Marks can have at most 2 decimal places.'),
+            (5, 'Student is not on this marks sheet.'),
+            (6, 'Marked absent but marks were also given.'),
+        ])
+        self.assertEqual(preview['versions'][third.id], '')
+
+    def test_enrollment_numbers_match_case_insensitively(self):
+        student = self.students[0]
+        Student.objects.filter(pk=student.pk).update(enrollment_no='24ce0000')
+        preview = self.preview(self.marks_file('24CE0000,10,', f'{self.students[1].enrollment_no.lower()},12,'))
+        self.assertEqual(set(preview['entries']), {student.id, self.students[1].id})
+
+    def test_header_is_found_below_a_title(self):
+        upload = self.marks_file('Enrollment No,Marks,Absent', f'{self.students[0].enrollment_no},10,',
+                                 header='Mid semester marks,,')
+        preview = self.preview(upload)
+        self.assertEqual(preview['entries'], {self.students[0].id: (False, Decimal('10'))})
+
+    def test_duplicate_enrollments_are_rejected(self):
+        student = self.students[0]
+        preview = self.preview(self.marks_file(f'{student.enrollment_no},10,', f'{student.enrollment_no},12,'))
+        self.assertEqual(preview['entries'], {})
+        self.assertEqual(preview['counts']['errors'], 2)
+
+    def test_preview_then_confirm_saves_the_previewed_marks(self):
+        self.client.force_login(self.admin)
+        first, second = self.students[:2]
+        response = self.client.post(reverse('marks_entry'), {
+            **self.sheet, 'action': 'preview_import',
+            'marks_file': self.marks_file(f'{first.enrollment_no},33,', f'{second.enrollment_no},ab,'),
+        })
+        preview = response.context['import_preview']
+        self.assertEqual(preview['counts']['new'], 2)
+        self.assertFalse(StudentMark.objects.exists())
+
+        response = self.client.post(reverse('marks_entry'), {
+            **self.sheet, 'action': 'confirm_import', 'import_token': preview['token'],
+        })
+        self.assertEqual(response.context['message'], 'Imported marks: 2 new, 0 updated, 0 unchanged.')
+        self.assertEqual(StudentMark.objects.get(student=first).marks_obtained, Decimal('33'))
+        self.assertTrue(StudentMark.objects.get(student=second).is_absent)
+
+        # The preview is single use.
+        response = self.client.post(reverse('marks_entry'), {
+            **self.sheet, 'action': 'confirm_import', 'import_token': preview['token'],
+        })
+        self.assertEqual(response.context['message'], 'This import preview has expired. Upload the file again.')
+
+    def test_confirm_skips_rows_changed_after_the_preview(self):
+        self.client.force_login(self.admin)
+        student = self.students[0]
+        response = self.client.post(reverse('marks_entry'), {
+            **self.sheet, 'action': 'preview_import', 'marks_file': self.marks_file(f'{student.enrollment_no},33,'),
+        })
+        token = response.context['import_preview']['token']
+        save_marks_bulk(self.subjects[0], self.semester, 'MID', 'OCT 2026', 1, {student.id: (False, Decimal('20'))},
+                        max_marks=Decimal('50'), pass_marks=Decimal('20'))
+        response = self.client.post(reverse('marks_entry'), {
+            **self.sheet, 'action': 'confirm_import', 'import_token': token,
+        })
+        self.assertIn('1 row(s) changed after the preview and were skipped.', response.context['message'])
+        self.assertEqual(StudentMark.objects.get(student=student).marks_obtained, Decimal('20'))
+
+    def test_confirm_requires_the_same_sheet(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('marks_entry'), {
+            **self.sheet, 'action': 'preview_import', 'marks_file': self.marks_file(f'{self.students[0].enrollment_no},33,'),
+        })
+        response = self.client.post(reverse('marks_entry'), {
+            **self.sheet, 'max_marks': '100', 'action': 'confirm_import',
+            'import_token': response.context['import_preview']['token'],
+        })
+        self.assertEqual(response.context['message'], 'This import preview has expired. Upload the file again.')
+        self.assertFalse(StudentMark.objects.exists())
+
+
+class MarksStatisticsTests(CohortTestCase):
+    column = ('MID', 'OCT 2026', 1)
+
+    def setUp(self):
+        super().setUp()
+        # Division A (even students): 10, 30 and an absentee; division B: 20, 40 and a blank row.
+        self.save({student.id: (False, Decimal(mark)) for student, mark in zip(self.students, (10, 20, 30, 40))})
+        self.save({self.students[4].id: (True, None)})
+        StudentMark.objects.create(student=self.students[5], subject=self.subjects[0], semester=self.semester,
+                                   exam_type='MID', exam_session='OCT 2026', max_marks=Decimal('50'))
+
+    def save(self, entries):
+        with self.captureOnCommitCallbacks(execute=True):
+            save_marks_bulk(self.subjects[0], self.semester, *self.column, entries,
+                            max_marks=Decimal('50'), pass_marks=Decimal('20'))
+
+    def stats(self):
+        return marks_statistics(self.subjects[0], *self.column)
+
+    def test_figures_cover_present_students_only(self):
+        stats = self.stats()
+        self.assertEqual({key: stats[key] for key in ('entered', 'present', 'absent', 'passed')},
+                         {'entered': 5, 'present': 4, 'absent': 1, 'passed': 3})
+        self.assertEqual((stats['pass_rate'], stats['absent_rate']), (75.0, 20.0))
+        self.assertEqual((stats['mean'], stats['median'], stats['std']), (25.0, 25.0, 11.18))
+        self.assertEqual((stats['min'], stats['max']), (10.0, 40.0))
+        self.assertEqual(stats['percentiles']['p50'], 25.0)
+        self.assertEqual([bucket['count'] for bucket in stats['histogram']], [0, 0, 1, 0, 1, 0, 1, 0, 1, 0])
+        self.assertEqual(
+            [(row['division'], row['entered'], row['passed'], row['pass_rate'], row['mean']) for row in stats['divisions']],
+            [('A', 3, 1, 50.0, 20.0), ('B', 2, 2, 100.0, 30.0)],
+        )
+        self.assertFalse(stats['is_frozen'])
+
+    def test_empty_column_has_no_figures(self):
+        stats = marks_statistics(self.subjects[1], *self.column)
+        self.assertEqual((stats['entered'], stats['present'], stats['mean'], stats['pass_rate']), (0, 0, None, None))
+        self.assertEqual(stats['percentiles'], {})
+
+    def test_cached_until_a_mark_is_saved(self):
+        self.stats()
+        with self.assertNumQueries(0):
+            self.stats()
+        self.save({self.students[0].id: (False, Decimal('50'))})
+        self.assertEqual(self.stats()['max'], 50.0)
+        with self.captureOnCommitCallbacks(execute=True):
+            mark = StudentMark.objects.get(student=self.students[1], subject=self.subjects[0])
+            mark.marks_obtained = Decimal('5')
+            mark.save()
+        self.assertEqual(self.stats()['min'], 5.0)
+
+    def test_freezing_the_column_refreshes_the_flag(self):
+        self.stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            MarksFreezeRule.objects.create(semester=self.semester, subject=self.subjects[0], exam_type='MID',
+                                           exam_session='OCT 2026', attempt_no=1)
+        self.assertTrue(self.stats()['is_frozen'])
+
+    def test_faculty_see_only_the_divisions_they_mentor(self):
+        faculty = Faculty.objects.create(user=User.objects.create_user('mentor'), employee_id='F001')
+        MentorAssignment.objects.create(faculty=faculty, semester=self.semester, division='A')
+        self.client.force_login(faculty.user)
+        params = {'subject': self.subjects[0].id, 'exam_type': 'MID', 'exam_session': 'oct 2026', 'attempt_no': 1}
+        response = self.client.get(reverse('marks_statistics_json'), {**params, 'division': 'A'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['statistics']['entered'], 5)
+        for division in (['B'], ['A', 'B'], []):
+            response = self.client.get(reverse('marks_statistics_json'), {**params, 'division': division})
+            self.assertEqual(response.status_code, 403, division)
+
+        self.client.force_login(User.objects.create_user('clerk'))
+        self.assertEqual(self.client.get(reverse('marks_statistics_json'), params).status_code, 403)
+
+
+class MarksAuditLogTests(CohortTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user('examcell', is_staff=True)
+        cls.clerk = User.objects.create_user('clerk', is_staff=True)
+        cls.start = timezone.make_aware(datetime(2026, 9, 1, 10, 0))
+        audits = MarksAuditTrail.objects.bulk_create([
+            MarksAuditTrail(
+                student=cls.students[idx % 6], subject=cls.subjects[idx % 2], semester=cls.semester, exam_type='MID',
+                exam_session='OCT 2026' if idx % 3 else 'APR 2026', changed_by=cls.admin if idx % 4 else cls.clerk,
+                new_marks=Decimal(idx),
+            )
+            for idx in range(60)
+        ])
+        # One change per hour over three days, with a few sharing a timestamp.
+        for idx, audit in enumerate(audits):
+            MarksAuditTrail.objects.filter(pk=audit.pk).update(changed_at=cls.start + timedelta(hours=idx - idx % 5 // 4))
+
+    def assertFilters(self, expected, **filters):
+        self.assertEqual(set(marks_audit_queryset(**filters).values_list('pk', flat=True)),
+                         set(MarksAuditTrail.objects.filter(expected).values_list('pk', flat=True)))
+
+    def test_each_filter_narrows_the_trail(self):
+        student = self.students[2]
+        self.assertFilters(Q(subject=self.subjects[1]), subject=self.subjects[1])
+        self.assertFilters(Q(exam_session='APR 2026'), exam_session='APR 2026')
+        self.assertFilters(Q(changed_by=self.clerk), changed_by=self.clerk)
+        self.assertFilters(Q(student=student), enrollment_no=student.enrollment_no)
+        self.assertFilters(Q(subject=self.subjects[0], changed_by=self.clerk), subject=self.subjects[0],
+                           changed_by=self.clerk)
+        # date_to includes the whole day.
+        self.assertFilters(Q(changed_at__date=date(2026, 9, 2)), date_from=date(2026, 9, 2), date_to=date(2026, 9, 2))
+        self.assertFilters(Q(changed_at__date__gte=date(2026, 9, 2)), date_from=date(2026, 9, 2))
+
+    def test_pages_walk_the_trail_newest_first(self):
+        self.client.force_login(self.admin)
+        expected = list(MarksAuditTrail.objects.order_by('-changed_at', '-pk').values_list('pk', flat=True))
+        seen, query = [], ''
+        while query is not None:
+            response = self.client.get(reverse('marks_audit_log') + query)
+            seen += [audit.pk for audit in response.context['audits']]
+            query = response.context['next_page_url']
+        self.assertEqual(seen, expected)
+        self.assertIsNotNone(response.context['prev_page_url'])
+
+    def test_filtered_pages_keep_the_filters(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('marks_audit_log'), {'exam_session': 'oct 2026'})
+        self.assertEqual(len(response.context['audits']), 40)
+        self.assertTrue(all(audit.exam_session == 'OCT 2026' for audit in response.context['audits']))
+        response = self.client.get(reverse('marks_audit_log'), {'date_from': '2026-09-01'})
+        self.assertIn('date_from=2026-09-01', response.context['next_page_url'])
+        response = self.client.get(reverse('marks_audit_log') + response.context['next_page_url'])
+        self.assertEqual(len(response.context['audits']), 10)
+
+    def test_invalid_filters_list_nothing(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('marks_audit_log'), {'date_from': 'yesterday'})
+        self.assertIn('date_from', response.context['form'].errors)
+        self.assertEqual(list(response.context['audits']), [])
+        response = self.client.get(reverse('marks_audit_log'), {'subject': '999999'})
+        self.assertEqual(list(response.context['audits']), [])
+
+    def test_only_staff_may_browse(self):
+        self.client.force_login(User.objects.create_user('mentor'))
+        self.assertRedirects(self.client.get(reverse('marks_audit_log')), reverse('dashboard'),
+                             fetch_redirect_response=False)
+
+
+class StudentUploadTests(CohortTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.electives = [
+            Subject.objects.create(code=f'EL{idx}', name=f'Elective {idx}', branch=cls.branch, semester=cls.semester,
+                                   is_elective=True, elective_group='G1')
+            for idx in (1, 2)
+        ]
+        cls.admin = User.objects.create_user('examcell', is_staff=True)
+
+    def upload(self, *rows, header='Enrollment No,Name,Div,Admission Year,Electives'):
+        self.client.force_login(self.admin)
+        return self.client.post(reverse('upload_students'), {
+            'branch': self.branch.id, 'semester': self.semester.id,
+            'file': SimpleUploadedFile('students.csv', '\n'.join((header,) + rows).encode()),
+        })
+
+    def student_rows(self, count, start=100):
+        return STUDENT_UPLOAD.parse_frame(pd.DataFrame({
+            'enrollment_no': [f'24CE{idx:04d}' for idx in range(start, start + count)],
+            'name': [f'Student {idx}' for idx in range(start, start + count)],
+            'elective': ['EL1'] * count,
+        })).rows
+
+    def test_upload_creates_students_and_skips_duplicates(self):
+        with mock.patch('allocation.ingest.enrollments_changed') as changed:
+            response = self.upload(
+                f'{self.students[0].enrollment_no},Already Here,A,2024,',
+                '24CE0100,New Student,B,2024,"el1, EL1"',
+                '24CE0100,Same Again,B,2024,',
+                '24CE0101,Second Student,,2025,EL2',
+            )
+        self.assertEqual(response.context['message'], 'Upload complete: 2 created, 2 skipped.')
+        self.assertEqual(response.context['results']['total'], 4)
+        self.assertEqual(response.context['results']['errors'], [])
+        created = Student.objects.get(enrollment_no='24CE0100')
+        self.assertEqual((created.name, created.division, created.admission_year), ('New Student', 'B', 2024))
+        self.assertEqual((created.branch, created.semester), (self.branch, self.semester))
+        self.assertEqual(Student.objects.get(enrollment_no='24CE0101').division, 'A')
+        self.assertEqual(Student.objects.get(enrollment_no=self.students[0].enrollment_no).name, 'Student 0')
+        # A code repeated in one cell enrols the student once.
+        self.assertEqual(list(created.subjects_enrolled.values_list('subject__code', flat=True)), ['EL1'])
+        # One refresh for the whole upload, covering the new enrolments.
+        changed.assert_called_once()
+        new_ids = Student.objects.filter(enrollment_no__in=['24CE0100', '24CE0101']).values_list('id', flat=True)
+        self.assertEqual(set(changed.call_args.args[0]), set(new_ids))
+
+    def test_invalid_rows_and_elective_codes_are_reported(self):
+        response = self.upload(
+            '24CE0100,Too Early,A,1999,',
+            '24CE0101,Not A Year,A,soon,',
+            '24CE0102,Wrong Codes,A,2024,EL1;CE501;NOPE',
+            ',No Enrollment,A,2024,',
+        )
+        errors = response.context['results']['errors']
+        self.assertEqual(len(errors), 5)
+        self.assertIn('Row 1: admission year must be between 2000 and 2100', errors)
+        self.assertIn('Row 2: invalid admission year', errors)
+        self.assertIn('Row 3: CE501 is not marked as an elective subject.', errors)
+        self.assertIn('Row 3: elective code NOPE not found in this branch/semester.', errors)
+        self.assertTrue(any(error.startswith('Row 4: ') for error in errors))
+        # The bad codes do not reject the row: the student is created with the valid elective.
+        self.assertEqual(
+            list(Student.objects.filter(enrollment_no__startswith='24CE01').values_list('enrollment_no', flat=True)),
+            ['24CE0102'],
+        )
+        self.assertEqual(list(StudentSubject.objects.filter(student__enrollment_no='24CE0102')
+                              .values_list('subject__code', flat=True)), ['EL1'])
+
+    def test_missing_columns_are_reported(self):
+        response = self.upload('24CE0100', header='Enrollment No')
+        self.assertEqual(response.context['message'], 'Missing required columns: name.')
+        self.assertFalse(Student.objects.filter(enrollment_no='24CE0100').exists())
+
+    def test_query_count_does_not_grow_with_the_sheet(self):
+        counts = []
+        for start, size in ((100, 2), (200, 20)):
+            with CaptureQueriesContext(connection) as queries:
+                outcome = bulk_create_students(self.student_rows(size, start), self.branch, self.semester)
+            self.assertEqual((outcome['created'], outcome['skipped']), (size, 0))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(StudentSubject.objects.filter(subject=self.electives[0]).count(), 22)
+
+
+RESULT_HEADER = 'Enrollment No,Sem,Exam Session,SPI,Result,Course Code,Course Name,Credit,Grade'
+
+
+def text_frame(rows):
+    return pd.DataFrame(rows[1:], columns=rows[0], dtype=str)
+
+
+def csv_upload(lines, name='sheet.csv'):
+    return SimpleUploadedFile(name, '\n'.join(lines).encode())
+
+
+def xlsx_upload(rows, name='sheet.xlsx'):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class SchemaTests(TestCase):
+    schema = Schema('SampleRow', [
+        Field('code', ['course_code'], required=True, blank=False, upper=True),
+        Field('credit', ['credits'], kind='number', invalid='invalid credit for {code}'),
+        Field('year', kind='int', invalid='invalid year', checks=[(lambda year: year < 2000, 'year before 2000')]),
+        Field('held_on', ['date'], kind='date'),
+        Field('codes', ['subjects'], kind='codes', upper=True),
+        Field('division', default='A'),
+    ], blank_message='missing code')
+
+    def test_fields_coerce_their_kind(self):
+        parsed = self.schema.parse_frame(text_frame([
+            ['Course Code', 'Credits', 'Year', 'Date', 'Subjects', 'Division'],
+            [' ce501 ', '4.5', '2024.0', '2026-09-01', 'a, b;c|d', ''],
+            ['ce502', '', '', 'not a date', '', 'B'],
+        ]))
+        self.assertEqual(parsed.rows, [
+            self.schema.row(1, 'CE501', 4.5, 2024, date(2026, 9, 1), ['A', 'B', 'C', 'D'], 'A'),
+            self.schema.row(2, 'CE502', None, None, None, [], 'B'),
+        ])
+        self.assertEqual((parsed.errors, parsed.missing, parsed.total), ([], [], 2))
+
+    def test_errors_name_the_row_and_the_first_failed_check(self):
+        parsed = self.schema.parse_frame(text_frame([
+            ['code', 'credit', 'year'],
+            ['', 'four', '2024'],
+            ['', '', ''],
+            ['x1', 'four', ''],
+            ['x2', '3', 'soon'],
+            ['x3', '3', '1999'],
+            ['x4', '3', '2001'],
+        ]), first_row=10)
+        self.assertEqual(parsed.errors, [
+            'Row 10: missing code',
+            'Row 12: invalid credit for x1',
+            'Row 13: invalid year',
+            'Row 14: year before 2000',
+        ])
+        # The blank row is neither parsed nor counted.
+        self.assertEqual([(row.row_index, row.code) for row in parsed.rows], [(15, 'X4')])
+        self.assertEqual(parsed.total, 5)
+
+    def test_missing_required_columns_stop_the_parse(self):
+        parsed = self.schema.parse_frame(text_frame([['credits', 'year'], ['4', '2024']]))
+        self.assertEqual((parsed.rows, parsed.missing, parsed.total), ([], ['code'], 0))
+
+    def test_headers_resolve_through_their_aliases(self):
+        # Keys ignore case, spaces and punctuation; the first listed alias wins.
+        self.assertEqual(self.schema.resolve({0: 'COURSE-CODE', 1: 'Code', 2: ' Credits '}), {'code': 1, 'credit': 2})
+        with self.assertRaises(ValueError):
+            Field('x', kind='decimal')
+
+
+class ChunkedUploadTests(CohortTestCase):
+    def lines(self, count):
+        # As spreadsheets export them: title rows padded to the sheet width.
+        rows = [f'24CE9{idx:03d},Student {idx}' for idx in range(count)]
+        return ['Semester 5 students,', ',', 'Enrollment No,Name'] + rows
+
+    def parse(self, upload, chunk_rows):
+        return list(STUDENT_UPLOAD.parse_chunks(iter_table(upload, chunk_rows=chunk_rows)))
+
+    def test_csv_chunks_number_rows_across_boundaries(self):
+        for chunk_rows in (3, 4, 5, 100):
+            sheets = self.parse(csv_upload(self.lines(7)), chunk_rows)
+            rows = [row for sheet in sheets for row in sheet.rows]
+            self.assertEqual([row.row_index for row in rows], list(range(1, 8)), chunk_rows)
+            self.assertEqual([row.enrollment_no for row in rows], [f'24CE9{idx:03d}' for idx in range(7)])
+            self.assertEqual(sum(sheet.total for sheet in sheets), 7)
+
+    def test_xlsx_chunks_keep_the_header_width(self):
+        rows = [['Roll list'], ['Enrollment No', 'Name', 'Div']]
+        rows += [[f'24CE9{idx:03d}', f'Student {idx}'] + (['B'] if idx % 2 else []) for idx in range(5)]
+        chunks = list(iter_table(xlsx_upload(rows), chunk_rows=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 2, 1])
+        self.assertEqual({len(chunk.columns) for chunk in chunks}, {3})
+        sheets = list(STUDENT_UPLOAD.parse_chunks(chunks))
+        parsed = [row for sheet in sheets for row in sheet.rows]
+        self.assertEqual([(row.row_index, row.division) for row in parsed],
+                         [(1, 'A'), (2, 'B'), (3, 'A'), (4, 'B'), (5, 'A')])
+
+    def test_header_must_be_in_the_first_chunk(self):
+        sheets = self.parse(csv_upload(self.lines(3)), chunk_rows=2)
+        self.assertEqual(len(sheets), 1)
+        self.assertEqual(sheets[0].missing, ['enrollment_no', 'name'])
+
+    def test_header_is_the_first_row_naming_the_required_fields(self):
+        lines = ['Enrollment,Roll list', 'Enrollment No,Name', '24CE9000,First']
+        sheets = self.parse(csv_upload(lines), chunk_rows=100)
+        self.assertEqual([(row.row_index, row.name) for row in sheets[0].rows], [(1, 'First')])
+
+    def test_upload_progress_is_served_to_staff(self):
+        admin = User.objects.create_user('examcell', is_staff=True)
+        self.client.force_login(admin)
+        token = 'upload-1234'
+        url = reverse('upload_progress_json', args=[token])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with override_settings(UPLOAD_CHUNK_ROWS=3):
+            self.client.post(reverse('upload_students'), {
+                'branch': self.branch.id, 'semester': self.semester.id, 'upload_token': token,
+                'file': csv_upload(self.lines(5)),
+            })
+        state = self.client.get(url).json()
+        self.assertEqual({key: state[key] for key in ('ok', 'rows', 'created', 'percent', 'done')},
+                         {'ok': True, 'rows': 5, 'created': 5, 'percent': 100, 'done': True})
+
+        report_upload_progress('bad token!', rows=1)
+        self.assertEqual(self.client.get(reverse('upload_progress_json', args=['short'])).status_code, 404)
+        self.client.force_login(User.objects.create_user('mentor'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class WorkbookReadTests(TestCase):
+    def test_xlsx_is_streamed_read_only(self):
+        import openpyxl
+
+        upload = xlsx_upload([['Enrollment No', 'Year', 'Marks'], ['24CE0001', 2024, 45.5], ['24CE0002', None, 40.0]])
+        with mock.patch('openpyxl.load_workbook', wraps=openpyxl.load_workbook) as load:
+            frame = read_table(upload)
+        self.assertTrue(load.call_args.kwargs['read_only'])
+        self.assertTrue(load.call_args.kwargs['data_only'])
+        # Whole floats lose their '.0', blanks become ''.
+        self.assertEqual(frame.values.tolist(), [
+            ['Enrollment No', 'Year', 'Marks'], ['24CE0001', '2024', '45.5'], ['24CE0002', '', '40'],
+        ])
+
+    def test_error_cells_read_as_blank(self):
+        upload = xlsx_upload([['code', 'value'], ['A', '#N/A'], ['B', '#DIV/0!'], ['C', 3]])
+        self.assertEqual(list(iter_workbook_rows(upload)), [('code', 'value'), ('A', None), ('B', None), ('C', 3)])
+        self.assertEqual(read_table(upload)[1].tolist(), ['value', '', '', '3'])
+        self.assertEqual(read_workbook(upload)[1].tolist()[1:3], [None, None])
+
+    def test_xls_files_fall_back_to_pandas(self):
+        sheet = pd.DataFrame([['Enrollment No', 'Name'], ['24CE0001', 'First']])
+        with mock.patch('allocation.ingest.pd.read_excel', return_value=sheet) as read_excel, \
+                mock.patch('allocation.ingest.iter_workbook_rows') as workbook_rows:
+            upload = SimpleUploadedFile('legacy.XLS', b'not really a workbook')
+            self.assertIs(read_table(upload), sheet)
+            self.assertEqual([chunk for chunk in iter_table(upload, chunk_rows=1)], [sheet])
+            self.assertIs(read_workbook(upload), sheet)
+        self.assertEqual(read_excel.call_count, 3)
+        self.assertIsNone(read_excel.call_args.kwargs['header'])
+        workbook_rows.assert_not_called()
+
+    def test_unreadable_files_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            read_table(SimpleUploadedFile('broken.xlsx', b'not a zip file'))
+        with self.assertRaises(ValueError):
+            list(iter_table(SimpleUploadedFile('broken.xlsx', b'not a zip file')))
+
+
+class ResultUploadTests(CohortTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user('examcell', is_staff=True)
+
+    def result_line(self, student, code, grade, session='NOV 2026', spi='8.5'):
+        return f'{student.enrollment_no},5,{session},{spi},PASS,{code},Course {code},4,{grade}'
+
+    def upload(self, *lines):
+        self.client.force_login(self.admin)
+        return self.client.post(reverse('upload_marksheet'), {
+            'file': SimpleUploadedFile('results.csv', '\n'.join((RESULT_HEADER,) + lines).encode()),
+        })
+
+    def result_rows(self, students, codes=('CE501', 'CE502')):
+        return RESULT_UPLOAD.parse_frame(pd.DataFrame([
+            {'enrollment_no': s.enrollment_no, 'semester': '5', 'exam_session': 'NOV 2026', 'course_code': code,
+             'course_name': f'Course {code}', 'course_credit': '4', 'grade': 'A'}
+            for s in students for code in codes
+        ])).rows
+
+    def grades_of(self, student):
+        return dict(ResultEntry.objects.filter(result_sheet__student=student).values_list('course_code', 'grade'))
+
+    def test_upload_creates_sheets_and_reports_bad_rows(self):
+        first, second = self.students[:2]
+        with mock.patch('allocation.views.publish_results') as publish:
+            response = self.upload(
+                self.result_line(first, 'CE501', 'A'),
+                self.result_line(first, 'CE502', 'B+'),
+                self.result_line(second, 'CE501', 'A-').replace(second.enrollment_no, second.enrollment_no.lower()),
+                'NOSUCH,5,NOV 2026,8,PASS,CE501,Course,4,A',
+                self.result_line(first, 'CE501', 'A').replace(',5,', ',3,', 1),
+                self.result_line(first, 'CE503', 'A').replace(',4,', ',four,'),
+            )
+        self.assertEqual(response.context['message'], 'Upload complete: 2 created, 0 updated.')
+        self.assertEqual(response.context['results']['total'], 6)
+        errors = response.context['results']['errors']
+        self.assertEqual(len(errors), 3)
+        self.assertIn('Row 4: student not found (NOSUCH)', errors)
+        self.assertIn('Row 6: invalid course credit for CE503', errors)
+        sheet = ResultSheet.objects.get(student=first)
+        self.assertEqual((sheet.semester, sheet.exam_session, sheet.spi), (self.semester, 'NOV 2026', Decimal('8.5')))
+        self.assertEqual(self.grades_of(first), {'CE501': 'A', 'CE502': 'B+'})
+        self.assertEqual(self.grades_of(second), {'CE501': 'A-'})
+        # Results are published once, after the last chunk.
+        publish.assert_called_once_with({first.id, second.id})
+
+    def test_reupload_replaces_the_courses_of_a_sheet(self):
+        student = self.students[0]
+        self.upload(self.result_line(student, 'CE501', 'B'), self.result_line(student, 'CE502', 'B'))
+        sheet_id = ResultSheet.objects.get(student=student).id
+        response = self.upload(self.result_line(student, 'CE501', 'A+', spi='9.1'))
+        self.assertEqual(response.context['message'], 'Upload complete: 0 created, 1 updated.')
+        sheet = ResultSheet.objects.get(student=student)
+        self.assertEqual((sheet.id, sheet.spi), (sheet_id, Decimal('9.1')))
+        self.assertEqual(self.grades_of(student), {'CE501': 'A+'})
+
+    def test_a_sheet_split_across_chunks_keeps_every_course(self):
+        student = self.students[0]
+        written = set()
+        first = save_result_rows(self.result_rows([student], codes=['CE501']), written)
+        second = save_result_rows(self.result_rows([student], codes=['CE502']), written)
+        self.assertEqual((first['created'], second['created'], second['updated']), (1, 0, 0))
+        self.assertEqual(self.grades_of(student), {'CE501': 'A', 'CE502': 'A'})
+        self.assertEqual(written, {(student.id, self.semester.id, 'NOV 2026')})
+
+    def test_query_count_does_not_grow_with_the_sheet(self):
+        counts = []
+        for students in (self.students[:1], self.students[1:]):
+            with CaptureQueriesContext(connection) as queries:
+                outcome = save_result_rows(self.result_rows(students), set())
+            self.assertFalse(outcome['errors'])
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(ResultEntry.objects.count(), 2 * len(self.students))
+
+
+class PublishedResultTestCase(CohortTestCase):
+    """The cohort with a two-course result sheet for the first student."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.student = cls.students[0]
+        cls.sheet = ResultSheet.objects.create(student=cls.student, semester=cls.semester, exam_session='NOV 2026',
+                                               spi=Decimal('8.50'), cpi=Decimal('8.10'))
+        ResultEntry.objects.bulk_create([
+            ResultEntry(result_sheet=cls.sheet, course_code=subject.code, course_name=subject.name,
+                        course_credit=Decimal('4'), grade='A')
+            for subject in cls.subjects
+        ])
+
+
+class PublicResultCacheTests(PublishedResultTestCase):
+    def lookup(self):
+        return get_public_result(self.student.enrollment_no.lower(), self.semester.number)
+
+    def test_second_lookup_is_served_from_the_cache(self):
+        result_context, error = self.lookup()
+        self.assertIsNone(error)
+        self.assertEqual([row['grade'] for row in result_context['rows']], ['A', 'A'])
+        with self.assertNumQueries(0):
+            cached, error = self.lookup()
+        self.assertEqual(cached['sheet'].pk, self.sheet.pk)
+
+    def test_unknown_students_and_missing_sheets_are_not_cached(self):
+        self.assertEqual(get_public_result('NOSUCH', self.semester.number), (None, None))
+        other = self.students[1]
+        self.assertEqual(get_public_result(other.enrollment_no, self.semester.number),
+                         (None, 'Result not available yet. Please contact Exam Cell.'))
+        self.assertIsNone(cache.get(public_result_key(other.enrollment_no, self.semester.number)))
+
+    def test_student_save_drops_the_entry(self):
+        key = public_result_key(self.student.enrollment_no, self.semester.number)
+        self.lookup()
+        self.assertIsNotNone(cache.get(key))
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.get(pk=self.student.pk).save()
+        self.assertIsNone(cache.get(key))
+
+    def test_sheet_save_drops_the_entry(self):
+        self.lookup()
+        with self.captureOnCommitCallbacks(execute=True):
+            ResultSheet.objects.filter(pk=self.sheet.pk).update(result_status='FAIL')
+        # update() sends no signal: the cached result is still served.
+        self.assertEqual(self.lookup()[0]['sheet'].result_status, 'PASS')
+        with self.captureOnCommitCallbacks(execute=True):
+            ResultSheet.objects.get(pk=self.sheet.pk).save()
+        self.assertEqual(self.lookup()[0]['sheet'].result_status, 'FAIL')
+
+    def test_upload_drops_the_entries_it_replaced(self):
+        self.lookup()
+        admin = User.objects.create_user('examcell', is_staff=True)
+        self.client.force_login(admin)
+        lines = [RESULT_HEADER, f'{self.student.enrollment_no},5,NOV 2026,9.0,PASS,CE501,Subject 1,4,A+']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('upload_marksheet'), {
+                'file': SimpleUploadedFile('results.csv', '\n'.join(lines).encode()),
+            })
+        result_context, _ = self.lookup()
+        self.assertEqual([(row['code'], row['grade']) for row in result_context['rows']], [('CE501', 'A+')])
+        self.assertEqual(result_context['sheet'].spi, Decimal('9.00'))
+
+    @override_settings(RESULT_PDF_WORKERS=0)
+    def test_upload_fills_the_cache_without_pdf_workers(self):
+        self.client.force_login(User.objects.create_user('examcell', is_staff=True))
+        lines = [RESULT_HEADER, f'{self.student.enrollment_no},5,NOV 2026,9.0,PASS,CE501,Subject 1,4,A+']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('upload_marksheet'), {
+                'file': SimpleUploadedFile('results.csv', '\n'.join(lines).encode()),
+            })
+        with self.assertNumQueries(0):
+            result_context, _ = self.lookup()
+        self.assertEqual([(row['code'], row['grade']) for row in result_context['rows']], [('CE501', 'A+')])
+
+    @override_settings(RESULT_PDF_WORKERS=2)
+    def test_publish_rebuilds_the_entries_when_pdfs_are_prerendered(self):
+        with mock.patch('allocation.ingest.prerender_result_pdfs') as prerender:
+            publish_results([self.student.id, self.students[1].id])
+        cached = cache.get(public_result_key(self.student.enrollment_no, self.semester.number))
+        self.assertEqual(cached['sheet'].pk, self.sheet.pk)
+        self.assertEqual([context['sheet'].pk for context in prerender.call_args.args[0]], [self.sheet.pk])
+        with self.assertNumQueries(0):
+            self.lookup()
+
+
+class ResultPdfTests(PublishedResultTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def download(self, **headers):
+        return self.client.get(reverse('public_result_pdf'), {
+            'enrollment_no': self.student.enrollment_no, 'semester': self.semester.number,
+        }, headers=headers)
+
+    def stored_digest(self):
+        return ResultSheet.objects.get(pk=self.sheet.pk).pdf_digest
+
+    def test_first_download_stores_the_pdf_and_records_its_digest(self):
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+        digest = self.stored_digest()
+        self.assertEqual(response['ETag'], f'"{digest}"')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertIn('Last-Modified', response)
+        with open(result_pdf_path(digest), 'rb') as handle:
+            self.assertEqual(handle.read(), response.content)
+
+        # Later downloads stream the stored file.
+        streamed = self.download()
+        self.addCleanup(streamed.close)
+        self.assertEqual(streamed.status_code, 200)
+        self.assertEqual(b''.join(streamed.streaming_content), response.content)
+
+    def test_unchanged_result_is_not_modified(self):
+        first = self.download()
+        response = self.download(if_none_match=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], first['ETag'])
+        response = self.download(if_modified_since=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        response = self.download(if_none_match='"stale"')
+        self.addCleanup(response.close)
+        self.assertEqual(response.status_code, 200)
+
+    def test_changed_result_replaces_the_stored_pdf(self):
+        first = self.download()
+        old_path = result_pdf_path(self.stored_digest())
+        with self.captureOnCommitCallbacks(execute=True):
+            sheet = ResultSheet.objects.get(pk=self.sheet.pk)
+            sheet.spi = Decimal('9.00')
+            sheet.save()
+        response = self.download(if_none_match=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response['ETag'], f'"{self.stored_digest()}"')
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(result_pdf_path(self.stored_digest())))
+
+    def test_invalid_and_unknown_lookups(self):
+        url = reverse('public_result_pdf')
+        self.assertEqual(self.client.get(url, {'enrollment_no': 'X', 'semester': 'five'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'enrollment_no': 'NOSUCH', 'semester': 5}).status_code, 404)
+
+    @override_settings(RESULT_PDF_WORKERS=2)
+    def test_prerender_queues_missing_files_and_records_digests(self):
+        result_context, _ = get_public_result(self.student.enrollment_no, self.semester.number)
+        pool = mock.Mock()
+        pool.submit.side_effect = lambda fn, *args: fn(*args)
+        with mock.patch('allocation.result_pdfs._render_pool', return_value=pool):
+            self.assertEqual(len(prerender_result_pdfs([result_context])), 1)
+            # The file exists now, so nothing is queued again.
+            self.assertEqual(prerender_result_pdfs([result_context]), [])
+        digest = self.stored_digest()
+        self.assertTrue(os.path.exists(result_pdf_path(digest)))
+        self.assertEqual(self.download(if_none_match=f'"{digest}"').status_code, 304)
+
+    @override_settings(RESULT_PDF_WORKERS=0)
+    def test_prerender_is_off_without_workers(self):
+        result_context, _ = get_public_result(self.student.enrollment_no, self.semester.number)
+        self.assertEqual(prerender_result_pdfs([result_context]), [])
+        self.assertEqual(self.stored_digest(), '')
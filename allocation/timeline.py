@@ -0,0 +1,117 @@
+"""Unified student timeline: marks, mentor actions and result sheets.
+
+The three sources are merged and ordered by the database in one UNION ALL
+query on (date, type, id), newest first, and paged with a cursor on that
+triple so older history can be loaded without any per-source caps. Only the
+ids on the requested page are then loaded for display.
+"""
+from django.db.models import CharField, F, Q, Value
+
+from .models import MentorActionLog, ResultSheet, StudentMark
+from .pagination import decode_cursor, encode_cursor
+
+
+TIMELINE_PAGE_SIZE = 20
+TIMELINE_CURSOR_SALT = 'student-timeline'
+
+# type -> (model, date field). Types compare as strings in the cursor order.
+TIMELINE_SOURCES = {
+    'MARK': (StudentMark, 'updated_at'),
+    'MENTOR': (MentorActionLog, 'created_at'),
+    'RESULT': (ResultSheet, 'created_at'),
+}
+
+
+def _source_events(event_type, student_id, cursor):
+    model, date_field = TIMELINE_SOURCES[event_type]
+    qs = model.objects.filter(student_id=student_id)
+    if cursor is not None:
+        date, cursor_type, cursor_id = cursor
+        # Rows strictly after the cursor in (date DESC, type DESC, id DESC) order.
+        older = Q(**{f'{date_field}__lt': date})
+        if event_type < cursor_type:
+            older |= Q(**{date_field: date})
+        elif event_type == cursor_type:
+            older |= Q(**{date_field: date, 'id__lt': cursor_id})
+        qs = qs.filter(older)
+    return qs.order_by().annotate(
+        event_date=F(date_field),
+        event_type=Value(event_type, output_field=CharField()),
+    ).values_list('event_date', 'event_type', 'id')
+
+
+def _mark_item(mark):
+    if mark.is_absent:
+        result_label = 'Absent'
+    elif mark.marks_obtained is None:
+        result_label = 'Pending'
+    elif mark.pass_marks is not None and mark.marks_obtained < mark.pass_marks:
+        result_label = 'Fail'
+    else:
+        result_label = 'Pass'
+    return {
+        'date': mark.updated_at,
+        'type': 'MARK',
+        'title': f"{mark.subject.code} {mark.get_exam_type_display()} Attempt {mark.attempt_no}",
+        'meta': f"{mark.exam_session} | {result_label}",
+    }
+
+
+def _mentor_item(log):
+    author = log.created_by.get_full_name() if log.created_by else 'System'
+    return {
+        'date': log.created_at,
+        'type': 'MENTOR',
+        'title': log.get_action_type_display(),
+        'meta': f"{author}: {log.note[:120]}",
+    }
+
+
+def _result_item(sheet):
+    return {
+        'date': sheet.created_at,
+        'type': 'RESULT',
+        'title': f"Result uploaded - Sem {sheet.semester.number}",
+        'meta': f"{sheet.exam_session} | {sheet.result_status}",
+    }
+
+
+def _load_items(keys):
+    ids_by_type = {}
+    for _, event_type, pk in keys:
+        ids_by_type.setdefault(event_type, []).append(pk)
+
+    loaded = {}
+    if ids_by_type.get('MARK'):
+        for mark in StudentMark.objects.filter(id__in=ids_by_type['MARK']).select_related('subject'):
+            loaded[('MARK', mark.id)] = _mark_item(mark)
+    if ids_by_type.get('MENTOR'):
+        for log in MentorActionLog.objects.filter(id__in=ids_by_type['MENTOR']).select_related('created_by'):
+            loaded[('MENTOR', log.id)] = _mentor_item(log)
+    if ids_by_type.get('RESULT'):
+        for sheet in ResultSheet.objects.filter(id__in=ids_by_type['RESULT']).select_related('semester'):
+            loaded[('RESULT', sheet.id)] = _result_item(sheet)
+
+    # A row deleted between the two queries is simply skipped.
+    return [loaded[(event_type, pk)] for _, event_type, pk in keys if (event_type, pk) in loaded]
+
+
+def timeline_page(student_id, after=None, page_size=TIMELINE_PAGE_SIZE):
+    """Return one page of a student's timeline, newest first.
+
+    `after` is the `next_cursor` of the previous page; an invalid cursor
+    returns the first page. Returns {'items', 'has_next', 'next_cursor'}.
+    """
+    cursor = decode_cursor(after, TIMELINE_CURSOR_SALT, length=3)
+
+    first, *rest = [_source_events(event_type, student_id, cursor) for event_type in TIMELINE_SOURCES]
+    merged = first.union(*rest, all=True).order_by('-event_date', '-event_type', '-id')
+    keys = list(merged[:page_size + 1])
+
+    has_next = len(keys) > page_size
+    keys = keys[:page_size]
+    return {
+        'items': _load_items(keys),
+        'has_next': has_next,
+        'next_cursor': encode_cursor(list(keys[-1]), TIMELINE_CURSOR_SALT) if has_next else None,
+    }
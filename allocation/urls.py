@@ -1,14 +1,14 @@
 from django.urls import path
 from .auth_views import login_view, logout_view, force_password_change
 from .views import (
-    dashboard, student_list, student_profile, add_student, delete_student,
+    dashboard, student_list, student_profile, student_timeline_json, add_student, delete_student,
     student_marks_download_csv, student_marks_download_pdf,
     bulk_delete_students, bulk_promote_students, download_selected_students,
     mark_attendance,
-    marks_entry,
+    marks_entry, marks_entry_save_json, marks_statistics_json, marks_audit_log,
     manual_attendance_sheet_preview,
     allocate, preview, download_pdf, download_seating_excel, manage_roles, manage_subjects, upload_students, manage_enrollments,
-    assign_subjects, upload_marksheet, public_result, public_result_pdf,
+    assign_subjects, upload_marksheet, upload_progress_json, public_result, public_result_pdf,
     edit_subject, delete_subject, attendance_report, attendance_summary_download, seating_home,
     download_student_upload_sample, download_marks_upload_sample,
     download_elective_upload_sample, download_seating_pdf_sample, sample_files,
@@ -32,6 +32,7 @@ urlpatterns = [
     # Student Management
     path('students/', student_list, name='student_list'),
     path('student/<int:student_id>/', student_profile, name='student_profile'),
+    path('student/<int:student_id>/timeline/', student_timeline_json, name='student_timeline_json'),
     path('student/<int:student_id>/marks/csv/', student_marks_download_csv, name='student_marks_download_csv'),
     path('student/<int:student_id>/marks/pdf/', student_marks_download_pdf, name='student_marks_download_pdf'),
     path('student/<int:student_id>/delete/', delete_student, name='delete_student'),
@@ -43,6 +44,9 @@ urlpatterns = [
     # Attendance
     path('attendance/', mark_attendance, name='mark_attendance'),
     path('marks-entry/', marks_entry, name='marks_entry'),
+    path('marks-entry/save/', marks_entry_save_json, name='marks_entry_save_json'),
+    path('marks-entry/stats/', marks_statistics_json, name='marks_statistics_json'),
+    path('marks-audit/', marks_audit_log, name='marks_audit_log'),
     path('attendance/manual-sheet-preview/', manual_attendance_sheet_preview, name='manual_attendance_sheet_preview'),
     
     # Marks entry removed
@@ -67,6 +71,7 @@ urlpatterns = [
     path('subjects/<int:subject_id>/delete/', delete_subject, name='delete_subject'),
     path('students/upload/', upload_students, name='upload_students'),
     path('results/upload/', upload_marksheet, name='upload_marksheet'),
+    path('uploads/progress/<str:token>/', upload_progress_json, name='upload_progress_json'),
     path('enrollments/', manage_enrollments, name='manage_enrollments'),
     path('samples/students/', download_student_upload_sample, name='download_student_upload_sample'),
     path('samples/attendance-students/', download_attendance_upload_sample, name='download_attendance_upload_sample'),
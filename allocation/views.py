@@ -2,8 +2,9 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.http import HttpResponse, JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.db.models import Count, Q, Avg, Sum, Case, When, IntegerField, F
-from django.db import IntegrityError
+from django.db.models import Count, Q, Avg, F, Value, Exists, OuterRef
+from django.db.models.functions import Coalesce, Upper
+from django.db import IntegrityError, transaction
 from django.core.files.storage import default_storage
 from django.conf import settings
 from decimal import Decimal, InvalidOperation
@@ -23,13 +24,33 @@ from reportlab.lib.utils import ImageReader
 from .forms import (
     CEForm, StudentForm, StudentSearchForm, AttendanceForm, ExcelUploadForm,
     StudentUploadForm, MarksheetUploadForm, ResultLookupForm, SubjectForm,
-    NoticeForm, FacultyMarksEntryForm
+    NoticeForm, FacultyMarksEntryForm, MarksAuditFilterForm
 )
 from .models import (
     CESeating, Student, Faculty, Subject, Semester, Branch,
-    Attendance, StudentSubject, ResultSheet, ResultEntry,
+    Attendance, StudentSubject,
     Notice, PushSubscription, NoticeAttachment, StudentMark,
-    MentorActionLog, MarksFreezeRule, MarksAuditTrail, MentorAssignment
+    MentorActionLog, MarksFreezeRule, MarksAuditTrail, MentorAssignment,
+    StudentRiskSnapshot
+)
+from .risk import compute_cohort_risk, score_risk, queue_risk_refresh
+from .pagination import keyset_page
+from .exports import streaming_csv_response, iter_queryset_rows
+from .search import rank_order, search_queryset
+from .timeline import timeline_page
+from .attendance import (
+    save_class_attendance, attendance_counts, class_attendance_statuses, faculty_attendance_status,
+    enrollments_changed,
+)
+from .marks import (
+    save_marks_bulk, mark_version, read_marks_sheet, preview_marks_import, marks_statistics, marks_audit_queryset,
+)
+from .profile_cache import get_cached_profile_sections, bump_student_data_version
+from .result_cache import get_public_result, forget_public_results
+from .result_pdfs import result_pdf_response
+from .ingest import (
+    read_table, read_workbook, iter_table, STUDENT_UPLOAD, RESULT_UPLOAD, ELECTIVE_UPLOAD, ATTENDANCE_STUDENTS_UPLOAD,
+    bulk_create_students, save_result_rows, publish_results, report_upload_progress, upload_progress, read_percent,
 )
 import pandas as pd
 import io
@@ -39,7 +60,9 @@ from datetime import datetime, timedelta
 import calendar
 import re
 import hashlib
+import secrets
 import sys
+from itertools import chain
 
 try:
     from pywebpush import webpush, WebPushException
@@ -495,13 +518,12 @@ self.addEventListener('notificationclick', function(event) {
     return HttpResponse(script, content_type='application/javascript')
 
 
-def _create_result_announcement(sheet_map, created_count, updated_count, user):
-    if not sheet_map:
+def _create_result_announcement(semester_numbers, exam_sessions, total_sheets, created_count, updated_count, user):
+    if not total_sheets:
         return
 
-    semester_numbers = sorted({data['semester'].number for data in sheet_map.values()})
-    exam_sessions = sorted({data['exam_session'] for data in sheet_map.values()})
-    total_sheets = len(sheet_map)
+    semester_numbers = sorted(semester_numbers)
+    exam_sessions = sorted(exam_sessions)
 
     sem_text = ', '.join(f"Sem {sem}" for sem in semester_numbers)
     session_text = ', '.join(exam_sessions)
@@ -701,35 +723,6 @@ def public_home(request):
         return redirect('dashboard')
     return render(request, 'home.html')
 
-def _build_result_context(student, semester_no=None):
-    sheet_qs = ResultSheet.objects.filter(student=student)
-    if semester_no:
-        sheet_qs = sheet_qs.filter(semester__number=semester_no)
-    sheet = sheet_qs.order_by('-created_at').first()
-
-    if not sheet:
-        return None, 'Result not available yet. Please contact Exam Cell.'
-
-    entries = sheet.entries.all().order_by('course_code')
-    if not entries.exists():
-        return None, 'Result data is incomplete. Please contact Exam Cell.'
-
-    rows = []
-    for entry in entries:
-        rows.append({
-            'code': entry.course_code,
-            'name': entry.course_name,
-            'credit': entry.course_credit,
-            'grade': entry.grade,
-        })
-
-    return {
-        'student': student,
-        'sheet': sheet,
-        'rows': rows,
-    }, None
-
-
 def _derive_batch_years(enrollment_no):
     prefix = ''.join(ch for ch in (enrollment_no or '') if ch.isdigit())[:2]
     if len(prefix) != 2:
@@ -746,124 +739,30 @@ def _derive_batch_years(enrollment_no):
     return start_year, start_year + 4
 
 
-def _calculate_attendance_percentage_for_student(student_id):
-    agg = Attendance.objects.filter(student_id=student_id).aggregate(
-        total=Count('id'),
-        present=Sum(Case(When(status='P', then=1), default=0, output_field=IntegerField())),
-    )
-    total = agg.get('total') or 0
-    present = agg.get('present') or 0
-    if total <= 0:
-        return None
-    return round((present * 100.0) / total, 1)
-
-
 def _compute_student_risk(student):
-    attendance_pct = _calculate_attendance_percentage_for_student(student.id)
-    marks_qs = StudentMark.objects.filter(student=student).order_by('-updated_at')
-
-    marks_rows = list(marks_qs[:30])
-    fail_count = 0
-    valid_percentages = []
-    for record in marks_rows:
-        if record.is_absent:
-            fail_count += 1
-            continue
-        if record.pass_marks is not None and record.marks_obtained is not None and record.marks_obtained < record.pass_marks:
-            fail_count += 1
-        if record.marks_obtained is not None and record.max_marks and record.max_marks > 0:
-            valid_percentages.append(float(record.marks_obtained) * 100.0 / float(record.max_marks))
-
-    avg_marks_pct = round(sum(valid_percentages) / len(valid_percentages), 1) if valid_percentages else None
-
-    score = 0
-    suggestions = []
-
-    if attendance_pct is not None:
-        if attendance_pct < 75:
-            score += 25
-            suggestions.append('Attendance improvement plan')
-        if attendance_pct < 60:
-            score += 15
-
-    if fail_count > 0:
-        score += min(40, fail_count * 12)
-        suggestions.append('Remedial support recommended')
-
-    if avg_marks_pct is not None:
-        if avg_marks_pct < 50:
-            score += 20
-        elif avg_marks_pct < 65:
-            score += 10
-
-    latest = valid_percentages[:5]
-    previous = valid_percentages[5:10]
-    if latest and previous:
-        latest_avg = sum(latest) / len(latest)
-        previous_avg = sum(previous) / len(previous)
-        if latest_avg + 8 < previous_avg:
-            score += 10
-            suggestions.append('Marks trend is declining')
-
-    if score >= 60:
-        level = 'HIGH'
-    elif score >= 35:
-        level = 'MEDIUM'
-    else:
-        level = 'LOW'
-
-    if level == 'HIGH' and 'Mentor counselling needed' not in suggestions:
-        suggestions.append('Mentor counselling needed')
-
-    return {
-        'score': min(score, 100),
-        'level': level,
-        'attendance_pct': attendance_pct,
-        'avg_marks_pct': avg_marks_pct,
-        'fail_count': fail_count,
-        'suggestions': suggestions,
-    }
+    return compute_cohort_risk([student.id])[student.id]
 
 
-def _build_student_timeline(student):
-    items = []
-
-    for mark in StudentMark.objects.filter(student=student).select_related('subject', 'semester').order_by('-updated_at')[:40]:
-        if mark.is_absent:
-            result_label = 'Absent'
-        elif mark.marks_obtained is None:
-            result_label = 'Pending'
-        elif mark.pass_marks is not None and mark.marks_obtained < mark.pass_marks:
-            result_label = 'Fail'
-        else:
-            result_label = 'Pass'
-
-        items.append({
-            'date': mark.updated_at,
-            'type': 'MARK',
-            'title': f"{mark.subject.code} {mark.get_exam_type_display()} Attempt {mark.attempt_no}",
-            'meta': f"{mark.exam_session} | {result_label}",
-        })
-
-    for log in MentorActionLog.objects.filter(student=student).select_related('created_by').order_by('-created_at')[:20]:
-        author = log.created_by.get_full_name() if log.created_by else 'System'
-        items.append({
-            'date': log.created_at,
-            'type': 'MENTOR',
-            'title': log.get_action_type_display(),
-            'meta': f"{author}: {log.note[:120]}",
-        })
+def _snapshot_risk(student):
+    try:
+        return student.risk_snapshot.as_risk()
+    except StudentRiskSnapshot.DoesNotExist:
+        return score_risk(None, [])
 
-    for sheet in ResultSheet.objects.filter(student=student).select_related('semester').order_by('-created_at')[:10]:
-        items.append({
-            'date': sheet.created_at,
-            'type': 'RESULT',
-            'title': f"Result uploaded - Sem {sheet.semester.number}",
-            'meta': f"{sheet.exam_session} | {sheet.result_status}",
-        })
 
-    items.sort(key=lambda row: row['date'], reverse=True)
-    return items[:50]
+def _student_attendance_summary(student, subjects):
+    """{subject code: {'present', 'total', 'percentage'}} for this student, across both attendance layouts."""
+    counts = attendance_counts([student.id], subjects, by_subject=True)
+    summary = {}
+    for subject in subjects:
+        present_count, total_classes = counts.get((student.id, subject.id), (0, 0))
+        percentage = (present_count / total_classes * 100) if total_classes > 0 else 0
+        summary[subject.code] = {
+            'present': present_count,
+            'total': total_classes,
+            'percentage': round(percentage, 1)
+        }
+    return summary
 
 
 def _get_mentor_scope(user):
@@ -877,6 +776,36 @@ def _get_mentor_scope(user):
     )
 
 
+STUDENT_CSV_HEADER = [
+    'Enrollment No', 'Name', 'Branch', 'Semester',
+    'Division', 'Admission Year', 'Mentor', 'Email', 'Phone'
+]
+STUDENT_CSV_FIELDS = (
+    'enrollment_no', 'name', 'branch__name', 'semester__number',
+    'division', 'admission_year', 'mentor_name', 'email', 'phone',
+)
+
+
+def _student_csv_row(row):
+    return [value if value is not None else '' for value in row]
+
+
+def _student_csv_response(students, filename):
+    return streaming_csv_response(
+        filename,
+        STUDENT_CSV_HEADER,
+        iter_queryset_rows(students, STUDENT_CSV_FIELDS, transform=_student_csv_row),
+    )
+
+
+def _mentor_scope_q(mentor_scope, prefix=''):
+    """Q matching students whose (semester, division) is in a _get_mentor_scope() set."""
+    scope_q = Q(pk__in=[])
+    for semester_id, division in mentor_scope or ():
+        scope_q |= Q(**{f'{prefix}semester_id': semester_id, f'{prefix}division': division})
+    return scope_q
+
+
 def _is_class_mentor(user, student):
     if getattr(user, 'is_staff', False):
         return True
@@ -1013,49 +942,26 @@ def _parse_attendance_students_file(uploaded_file):
     if not is_csv and not is_excel:
         return [], "Unsupported file type. Please upload a .csv or .xlsx file."
 
+    if is_excel and not is_legacy_xls:
+        try:
+            import openpyxl  # noqa: F401
+        except Exception:
+            return [], (
+                "Could not read uploaded student file: openpyxl is not installed in the "
+                f"Django server environment. Run '{sys.executable} -m pip install openpyxl' "
+                "and restart the server."
+            )
+
     try:
-        if is_csv:
-            df = pd.read_csv(uploaded_file)
-        elif is_legacy_xls:
-            df = pd.read_excel(uploaded_file)
-        else:
-            try:
-                import openpyxl  # noqa: F401
-            except Exception:
-                return [], (
-                    "Could not read uploaded student file: openpyxl is not installed in the "
-                    f"Django server environment. Run '{sys.executable} -m pip install openpyxl' "
-                    "and restart the server."
-                )
-            df = pd.read_excel(uploaded_file, engine='openpyxl')
-    except Exception as exc:
+        raw = read_table(uploaded_file)
+    except ValueError as exc:
         return [], f"Could not read uploaded student file: {exc}"
 
-    if df is None or df.empty:
+    if raw.empty:
         return [], "Uploaded student file is empty."
 
-    def normalize_col(value):
-        return re.sub(r'[^a-z0-9]+', '', str(value).strip().lower())
-
-    column_map = {normalize_col(col): col for col in df.columns}
-
-    def find_col(*aliases):
-        for alias in aliases:
-            col = column_map.get(alias)
-            if col is not None:
-                return col
-        return None
-
-    enrollment_col = find_col('enrollmentno', 'enrollment', 'enrolmentno', 'enrolment')
-    name_col = find_col('name', 'studentname', 'student')
-    division_col = find_col('division', 'div')
-    elective_col = find_col('elective', 'electives', 'electivesubject')
-    elective1_col = find_col('elective1', 'elective_1', 'electiveone', 'electivefirst')
-    elective2_col = find_col('elective2', 'elective_2', 'electivesecond')
-    room_no_col = find_col('roomno', 'roomnumber', 'room')
-    exam_no_col = find_col('examno', 'examnumber', 'seatno')
-
-    if enrollment_col is None or name_col is None:
+    parsed = ATTENDANCE_STUDENTS_UPLOAD.parse(raw)
+    if parsed.missing:
         return [], (
             "Invalid file format. Required columns: Enrollment No and Name "
             "(case-insensitive). Optional: Division, Elective, Room No, Exam No."
@@ -1063,38 +969,22 @@ def _parse_attendance_students_file(uploaded_file):
 
     rows = []
     skipped = 0
-    for _, row in df.iterrows():
-        enrollment_no = _clean_cell(row.get(enrollment_col))
-        name = _clean_cell(row.get(name_col))
-
-        if not enrollment_no and not name:
-            continue
-        if not enrollment_no:
+    for r in parsed.rows:
+        if not r.enrollment_no:
             skipped += 1
             continue
-
-        elective_1 = _clean_cell(row.get(elective1_col)) if elective1_col is not None else ''
-        elective_2 = _clean_cell(row.get(elective2_col)) if elective2_col is not None else ''
-        if not elective_1 and not elective_2 and elective_col is not None:
-            elective_raw = _clean_cell(row.get(elective_col))
-            if elective_raw:
-                parts = [
-                    part.strip()
-                    for part in re.split(r'[;,|]+', elective_raw)
-                    if part and part.strip()
-                ]
-                elective_1 = parts[0] if len(parts) > 0 else ''
-                elective_2 = parts[1] if len(parts) > 1 else ''
-
+        elective_1, elective_2 = r.elective_1, r.elective_2
+        if not elective_1 and not elective_2:
+            elective_1, elective_2 = (r.elective + ['', ''])[:2]
         rows.append({
             'sr': 0,
-            'enrollment_no': enrollment_no,
-            'name': name,
-            'division': _clean_cell(row.get(division_col)) if division_col is not None else '',
+            'enrollment_no': r.enrollment_no,
+            'name': r.name,
+            'division': r.division,
             'elective_1': elective_1,
             'elective_2': elective_2,
-            'room_no': _clean_cell(row.get(room_no_col)) if room_no_col is not None else '',
-            'exam_no': _clean_cell(row.get(exam_no_col)) if exam_no_col is not None else '',
+            'room_no': r.room_no,
+            'exam_no': r.exam_no,
         })
 
     if not rows:
@@ -1294,7 +1184,7 @@ def faculty_dashboard(request):
     except:
         return redirect('login')
     
-    subjects = faculty.subjects.all()
+    subjects = list(faculty.subjects.all())
     mentored_classes = MentorAssignment.objects.filter(faculty=faculty).select_related('semester').order_by('semester__number', 'division')
     
     # Get last accessed subject/semester
@@ -1302,28 +1192,20 @@ def faculty_dashboard(request):
     last_semester = faculty.last_semester
     
     # Pending work indicators
-    pending_attendance = {}
-    
-    for subject in subjects:
-        # Check attendance
-        today = timezone.now().date()
-        today_attendance = Attendance.objects.filter(
-            subject=subject,
-            date=today,
-            marked_by=faculty
-        ).count()
-        
-        if today_attendance == 0:
-            pending_attendance[subject.id] = 'Not marked today'
-        
-        # Marks entry removed from system
-    
+    attendance_status = faculty_attendance_status(faculty, subjects, timezone.localdate())
+    pending_attendance = {
+        subject.id: 'Not marked today'
+        for subject in subjects
+        if not attendance_status[subject.id]['marked_today']
+    }
+
     context = {
         'faculty': faculty,
         'subjects': subjects,
         'last_subject': last_subject,
         'last_semester': last_semester,
         'pending_attendance': pending_attendance,
+        'attendance_status': attendance_status,
         'mentored_classes': mentored_classes,
         # 'pending_marks' removed
     }
@@ -1341,6 +1223,8 @@ def student_list(request):
     
     selected_divisions = []
     selected_risk_level = (request.GET.get('risk_level') or '').strip().upper()
+    sort = request.GET.get('sort', '')
+    order = request.GET.get('order', 'asc')
     if request.GET:
         query = request.GET.get('query', '')
         branch = request.GET.get('branch')
@@ -1352,14 +1236,9 @@ def student_list(request):
                 selected_divisions = [single_division]
         mentor = request.GET.get('mentor')
         admission_year = request.GET.get('admission_year')
-        sort = request.GET.get('sort', '')
-        order = request.GET.get('order', 'asc')
         
         if query:
-            students = students.filter(
-                Q(name__icontains=query) |
-                Q(enrollment_no__icontains=query)
-            )
+            students = search_queryset(students, 'student', query, columns=('name', 'enrollment_no'))
         
         if branch:
             students = students.filter(branch_id=branch)
@@ -1376,68 +1255,84 @@ def student_list(request):
         if admission_year:
             students = students.filter(admission_year=admission_year)
 
-        # Sorting
-        sort_map = {
-            'name': 'name',
-            'enrollment_no': 'enrollment_no',
-            'branch': 'branch__name',
-            'semester': 'semester__number',
-            'division': 'division',
-            'admission_year': 'admission_year',
-            'mentor': 'mentor_name',
-            'uploaded': 'id',
-        }
-        sort_field = sort_map.get(sort, 'enrollment_no')
-        if order == 'desc':
-            sort_field = '-' + sort_field
-        students = students.order_by(sort_field)
+    if selected_risk_level in dict(StudentRiskSnapshot.LEVEL_CHOICES):
+        risk_filter = Q(risk_snapshot__level=selected_risk_level)
+        if selected_risk_level == 'LOW':
+            # Students with no attendance or marks yet have no snapshot and score LOW.
+            risk_filter |= Q(risk_snapshot__isnull=True)
+        students = students.filter(risk_filter)
+
+    # Sorting: every key is non-null so it can drive keyset pagination (id breaks ties).
+    sort_map = {
+        'name': F('name'),
+        'enrollment_no': F('enrollment_no'),
+        'branch': F('branch__name'),
+        'semester': F('semester__number'),
+        'division': F('division'),
+        'admission_year': Coalesce('admission_year', Value(0)),
+        'mentor': F('mentor_name'),
+        'uploaded': F('id'),
+        'risk': Coalesce('risk_snapshot__score', Value(0)),
+    }
+    query = (request.GET.get('query') or '').strip()
+    if query:
+        # Best bm25 matches first; ids order whatever falls past search.RANKED_LIMIT.
+        sort_map['relevance'] = rank_order('student', query, columns=('name', 'enrollment_no'))
+    if sort not in sort_map:
+        sort = 'relevance' if query else 'enrollment_no'
+    if order != 'desc':
+        order = 'asc'
 
     mentor_scope = _get_mentor_scope(request.user)
+
+    if request.GET.get('download') == 'csv':
+        export_students = students
+        if not request.user.is_staff:
+            export_students = export_students.filter(_mentor_scope_q(mentor_scope))
+        sort_field = sort_map[sort]
+        export_students = export_students.order_by(
+            sort_field.desc() if order == 'desc' else sort_field.asc(), 'id'
+        )
+        return _student_csv_response(export_students, 'students.csv')
+
+    page = keyset_page(
+        students.select_related('branch', 'semester', 'risk_snapshot'),
+        sort_map[sort],
+        descending=(order == 'desc'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=settings.STUDENT_LIST_PAGE_SIZE,
+        # Relevance positions only hold for the query they were ranked for.
+        salt=f'student_list:{sort}:{order}' + (f':{query}' if sort == 'relevance' else ''),
+    )
+
     student_rows = []
-    for student in students:
-        risk = _compute_student_risk(student)
-        if selected_risk_level and risk['level'] != selected_risk_level:
-            continue
+    for student in page['rows']:
         is_mentor_class = True if request.user.is_staff else ((student.semester_id, student.division) in mentor_scope)
         student_rows.append({
             'student': student,
-            'risk': risk,
+            'risk': _snapshot_risk(student),
             'is_mentor_class': is_mentor_class,
         })
 
-    if request.GET.get('download') == 'csv':
-        export_rows = student_rows
-        if not request.user.is_staff:
-            export_rows = [row for row in student_rows if row['is_mentor_class']]
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="students.csv"'
-        writer = csv.writer(response)
-        writer.writerow([
-            'Enrollment No', 'Name', 'Branch', 'Semester',
-            'Division', 'Admission Year', 'Mentor', 'Email', 'Phone'
-        ])
-        for row in export_rows:
-            student = row['student']
-            writer.writerow([
-                student.enrollment_no,
-                student.name,
-                student.branch.name if student.branch else '',
-                student.semester.number if student.semester else '',
-                student.division,
-                student.admission_year or '',
-                student.mentor_name or '',
-                student.email or '',
-                student.phone or '',
-            ])
-        return response
-    
+    def _page_url(**cursor):
+        params = request.GET.copy()
+        for key in ('after', 'before', 'download'):
+            params.pop(key, None)
+        params.update(cursor)
+        return f'?{params.urlencode()}'
+
     context = {
         'students': student_rows,
         'form': form,
         'selected_divisions': selected_divisions,
         'selected_risk_level': selected_risk_level,
         'faculty_can_manage_all': request.user.is_staff,
+        'total_count': students.count(),
+        'page_size': settings.STUDENT_LIST_PAGE_SIZE,
+        'first_page_url': _page_url() if page['has_prev'] else None,
+        'prev_page_url': _page_url(before=page['prev_cursor']) if page['has_prev'] else None,
+        'next_page_url': _page_url(after=page['next_cursor']) if page['has_next'] else None,
     }
     return render(request, 'students/student_list.html', context)
 
@@ -1464,35 +1359,34 @@ def student_profile(request, student_id):
             return redirect('student_profile', student_id=student.id)
     
     # Basic info already in student object
-    
-    # Get enrolled subjects
-    enrolled_subjects = StudentSubject.objects.filter(student=student).select_related('subject')
-    
-    # Get attendance records
-    attendance_summary = {}
-    for subject_enrollment in enrolled_subjects:
-        subject = subject_enrollment.subject
-        total_classes = Attendance.objects.filter(subject=subject).count()
-        present_count = Attendance.objects.filter(
-            student=student,
-            subject=subject,
-            status='P'
-        ).count()
-        
-        percentage = (present_count / total_classes * 100) if total_classes > 0 else 0
-        attendance_summary[subject.code] = {
-            'present': present_count,
-            'total': total_classes,
-            'percentage': round(percentage, 1)
+
+    def _build_profile_sections():
+        # Get enrolled subjects
+        enrolled_subjects = list(StudentSubject.objects.filter(student=student).select_related('subject'))
+        all_marks_qs = StudentMark.objects.filter(student=student)
+        return {
+            'enrolled_subjects': enrolled_subjects,
+            # Get attendance records
+            'attendance_summary': _student_attendance_summary(student, [e.subject for e in enrolled_subjects]),
+            'exam_session_options': list(
+                all_marks_qs.exclude(exam_session='').values_list('exam_session', flat=True).distinct().order_by('exam_session')
+            ),
+            'attempt_options': list(
+                all_marks_qs.values_list('attempt_no', flat=True).distinct().order_by('attempt_no')
+            ),
+            'risk': _compute_student_risk(student),
+            'timeline': timeline_page(student.id),
+            'mentor_actions': list(MentorActionLog.objects.filter(student=student).select_related('created_by')[:20]),
+            'marks_audits': list(MarksAuditTrail.objects.filter(student=student).select_related('changed_by', 'subject')[:25]),
         }
-    
-    all_marks_qs = StudentMark.objects.filter(student=student).select_related('subject', 'semester')
+
+    sections = get_cached_profile_sections(student.id, _build_profile_sections)
 
     selected_exam_type = (request.GET.get('exam_type') or '').strip().upper()
     selected_exam_session = (request.GET.get('exam_session') or '').strip().upper()
     selected_attempt_no = (request.GET.get('attempt_no') or '').strip()
 
-    marks_qs = all_marks_qs
+    marks_qs = StudentMark.objects.filter(student=student).select_related('subject', 'semester')
     if selected_exam_type in ('MID', 'FINAL'):
         marks_qs = marks_qs.filter(exam_type=selected_exam_type)
     if selected_exam_session:
@@ -1503,29 +1397,13 @@ def student_profile(request, student_id):
         except ValueError:
             pass
 
-    risk = _compute_student_risk(student)
-    timeline = _build_student_timeline(student)
-    mentor_actions = MentorActionLog.objects.filter(student=student).select_related('created_by')[:20]
-    marks_audits = MarksAuditTrail.objects.filter(student=student).select_related('changed_by', 'subject')[:25]
-
     context = {
+        **sections,
         'student': student,
-        'enrolled_subjects': enrolled_subjects,
-        'attendance_summary': attendance_summary,
         'marks_records': marks_qs.order_by('-updated_at', 'subject__code'),
         'selected_exam_type': selected_exam_type,
         'selected_exam_session': selected_exam_session,
         'selected_attempt_no': selected_attempt_no,
-        'exam_session_options': list(
-            all_marks_qs.exclude(exam_session='').values_list('exam_session', flat=True).distinct().order_by('exam_session')
-        ),
-        'attempt_options': list(
-            all_marks_qs.values_list('attempt_no', flat=True).distinct().order_by('attempt_no')
-        ),
-        'risk': risk,
-        'timeline': timeline,
-        'mentor_actions': mentor_actions,
-        'marks_audits': marks_audits,
         'mentor_action_choices': MentorActionLog.ACTION_CHOICES,
         'can_log_actions': can_manage_class,
         'can_manage_class': can_manage_class,
@@ -1534,6 +1412,21 @@ def student_profile(request, student_id):
     return render(request, 'students/student_profile.html', context)
 
 
+@login_required(login_url='login')
+def student_timeline_json(request, student_id):
+    """Older timeline events for the student profile, one cursor page at a time."""
+    student = get_object_or_404(Student, id=student_id)
+    page = timeline_page(student.id, after=request.GET.get('after'))
+    return JsonResponse({
+        'items': [
+            {**item, 'date': timezone.localtime(item['date']).strftime('%d %b %Y, %I:%M %p')}
+            for item in page['items']
+        ],
+        'has_next': page['has_next'],
+        'next_cursor': page['next_cursor'],
+    })
+
+
 @login_required(login_url='login')
 def student_marks_download_csv(request, student_id):
     student = get_object_or_404(Student, id=student_id)
@@ -1557,48 +1450,55 @@ def student_marks_download_csv(request, student_id):
             pass
 
     marks_records = marks_records.order_by('-updated_at', 'subject__code')
+    exam_type_labels = dict(StudentMark.EXAM_TYPE_CHOICES)
 
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{student.enrollment_no}_marks_history.csv"'
-    writer = csv.writer(response)
-    writer.writerow([
-        'Enrollment No', 'Student Name', 'Exam Session', 'Exam Type', 'Attempt',
-        'Semester', 'Subject Code', 'Subject Name', 'Marks Obtained', 'Max Marks',
-        'Pass Marks', 'Absent', 'Status', 'Updated At'
-    ])
-
-    for record in marks_records:
-        if record.is_absent:
+    def _marks_csv_row(row):
+        (exam_session, exam_type, attempt_no, semester_no, subject_code, subject_name,
+         marks_obtained, max_marks, pass_marks, is_absent, updated_at) = row
+        if is_absent:
             status = 'ABSENT'
             marks_obtained = ''
-        elif record.pass_marks is not None and record.marks_obtained is not None and record.marks_obtained < record.pass_marks:
+        elif pass_marks is not None and marks_obtained is not None and marks_obtained < pass_marks:
             status = 'FAIL'
-            marks_obtained = record.marks_obtained
-        elif record.marks_obtained is not None:
+        elif marks_obtained is not None:
             status = 'PASS'
-            marks_obtained = record.marks_obtained
         else:
             status = ''
             marks_obtained = ''
 
-        writer.writerow([
+        return [
             student.enrollment_no,
             student.name,
-            record.exam_session,
-            record.get_exam_type_display(),
-            record.attempt_no,
-            record.semester.number,
-            record.subject.code,
-            record.subject.name,
+            exam_session,
+            exam_type_labels.get(exam_type, exam_type),
+            attempt_no,
+            semester_no,
+            subject_code,
+            subject_name,
             marks_obtained,
-            record.max_marks,
-            record.pass_marks if record.pass_marks is not None else '',
-            'YES' if record.is_absent else 'NO',
+            max_marks,
+            pass_marks if pass_marks is not None else '',
+            'YES' if is_absent else 'NO',
             status,
-            timezone.localtime(record.updated_at).strftime('%d-%m-%Y %I:%M %p'),
-        ])
+            timezone.localtime(updated_at).strftime('%d-%m-%Y %I:%M %p'),
+        ]
 
-    return response
+    return streaming_csv_response(
+        f'{student.enrollment_no}_marks_history.csv',
+        [
+            'Enrollment No', 'Student Name', 'Exam Session', 'Exam Type', 'Attempt',
+            'Semester', 'Subject Code', 'Subject Name', 'Marks Obtained', 'Max Marks',
+            'Pass Marks', 'Absent', 'Status', 'Updated At'
+        ],
+        iter_queryset_rows(
+            marks_records,
+            (
+                'exam_session', 'exam_type', 'attempt_no', 'semester__number', 'subject__code',
+                'subject__name', 'marks_obtained', 'max_marks', 'pass_marks', 'is_absent', 'updated_at',
+            ),
+            transform=_marks_csv_row,
+        ),
+    )
 
 
 @login_required(login_url='login')
@@ -1730,6 +1630,7 @@ def delete_student(request, student_id):
             })
         # Cascade deletes will handle related records
         student.delete()
+        forget_public_results([student.enrollment_no])
         return redirect('student_list')
 
     return render(request, 'students/confirm_delete.html', {
@@ -1746,10 +1647,15 @@ def bulk_delete_students(request):
     delete_all = request.POST.get('delete_all') == 'on'
     selected_ids = request.POST.getlist('student_ids')
 
+    to_delete = None
     if delete_all:
-        Student.objects.all().delete()
+        to_delete = Student.objects.all()
     elif selected_ids:
-        Student.objects.filter(id__in=selected_ids).delete()
+        to_delete = Student.objects.filter(id__in=selected_ids)
+    if to_delete is not None:
+        enrollment_nos = list(to_delete.values_list('enrollment_no', flat=True))
+        to_delete.delete()
+        forget_public_results(enrollment_nos)
 
     next_url = request.POST.get('next', '')
     if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
@@ -1779,6 +1685,7 @@ def bulk_promote_students(request):
                 to_update.append(student)
         if to_update:
             Student.objects.bulk_update(to_update, ['semester'])
+            forget_public_results(student.enrollment_no for student in to_update)
 
         # Keep mentor continuity for each promoted class (Sem+Division -> next Sem+Division).
         for from_sem_id, to_sem_id, division in promoted_class_pairs:
@@ -1822,38 +1729,14 @@ def download_selected_students(request):
             return redirect(next_url)
         return redirect('student_list')
 
-    students = (
-        Student.objects.filter(id__in=selected_ids)
-        .select_related('branch', 'semester')
-        .order_by('enrollment_no')
-    )
+    students = Student.objects.filter(id__in=selected_ids).order_by('enrollment_no')
 
     if not request.user.is_staff:
-        mentor_scope = _get_mentor_scope(request.user)
-        students = [s for s in students if (s.semester_id, s.division) in mentor_scope]
-        if not students:
+        students = students.filter(_mentor_scope_q(_get_mentor_scope(request.user)))
+        if not students.exists():
             return HttpResponse('No selected students are in your mentor classes.', status=403)
 
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="selected_students.csv"'
-    writer = csv.writer(response)
-    writer.writerow([
-        'Enrollment No', 'Name', 'Branch', 'Semester',
-        'Division', 'Admission Year', 'Mentor', 'Email', 'Phone'
-    ])
-    for student in students:
-        writer.writerow([
-            student.enrollment_no,
-            student.name,
-            student.branch.name if student.branch else '',
-            student.semester.number if student.semester else '',
-            student.division,
-            student.admission_year or '',
-            student.mentor_name or '',
-            student.email or '',
-            student.phone or '',
-        ])
-    return response
+    return _student_csv_response(students, 'selected_students.csv')
 
 # ============= ATTENDANCE VIEWS =============
 
@@ -1900,27 +1783,16 @@ def mark_attendance(request):
                 }
                 return render(request, 'attendance/mark_attendance.html', context)
 
-            # Get students enrolled in this subject (optionally filtered by division)
-            student_enrollments = StudentSubject.objects.filter(subject=subject)
-            if selected_divisions:
-                student_enrollments = student_enrollments.filter(student__division__in=selected_divisions)
-
-            # Process attendance from POST data
-            for enrollment in student_enrollments:
-                student = enrollment.student
-                status_key = f'student_{student.id}'
-                status = request.POST.get(status_key, 'P')
+            # Statuses posted as student_<id>; enrolled students not posted count as present.
+            statuses = {}
+            for key, value in request.POST.items():
+                if key.startswith('student_'):
+                    try:
+                        statuses[int(key[len('student_'):])] = value
+                    except ValueError:
+                        continue
 
-                # Update or create attendance record
-                Attendance.objects.update_or_create(
-                    student=student,
-                    subject=subject,
-                    date=date,
-                    defaults={
-                        'status': status,
-                        'marked_by': faculty
-                    }
-                )
+            save_class_attendance(subject, date, statuses, marked_by=faculty, divisions=selected_divisions)
 
             return redirect('mark_attendance')
     else:
@@ -1965,10 +1837,7 @@ def mark_attendance(request):
             selected_subject_obj = subject_obj
             
             # Get current attendance records
-            records = Attendance.objects.filter(subject=subject_obj, date=date)
-            if selected_divisions:
-                records = records.filter(student__division__in=selected_divisions)
-            current_attendance = {record.student_id: record.status for record in records}
+            current_attendance = class_attendance_statuses(subject_obj, date, selected_divisions)
         except:
             pass
     
@@ -1986,6 +1855,26 @@ def mark_attendance(request):
     return render(request, 'attendance/mark_attendance.html', context)
 
 
+MARKS_IMPORT_SESSION_KEY = 'marks_import_preview'
+
+
+def _marks_freeze_rule(semester_obj, subject_obj, exam_type, exam_session, attempt_no):
+    return MarksFreezeRule.objects.filter(
+        semester=semester_obj,
+        subject=subject_obj,
+        exam_type=exam_type,
+        exam_session=exam_session,
+        attempt_no=attempt_no,
+    ).first()
+
+
+def _marks_sheet_students(subject_obj, semester_obj, divisions):
+    students_qs = Student.objects.filter(branch=subject_obj.branch, semester=semester_obj)
+    if divisions:
+        students_qs = students_qs.filter(division__in=divisions)
+    return students_qs
+
+
 @login_required(login_url='login')
 def marks_entry(request):
     """Faculty/Admin marks entry for Mid/Final exams with attempt tracking."""
@@ -2004,6 +1893,8 @@ def marks_entry(request):
     freeze_rule = None
     is_frozen = False
     mentor_error = None
+    import_preview = None
+    marks_stats = None
 
     form_data = request.POST if request.method == 'POST' else request.GET
     form = FacultyMarksEntryForm(form_data or None, selected_semester_id=selected_semester_id)
@@ -2029,22 +1920,14 @@ def marks_entry(request):
             if not _is_mentor_for_scope(request.user, semester_obj, selected_divisions):
                 mentor_error = 'You can enter marks only for classes where you are assigned as mentor.'
             else:
-                freeze_rule = MarksFreezeRule.objects.filter(
-                    semester=semester_obj,
-                    subject=subject_obj,
-                    exam_type=exam_type,
-                    exam_session=exam_session,
-                    attempt_no=attempt_no,
-                ).first()
+                freeze_rule = _marks_freeze_rule(semester_obj, subject_obj, exam_type, exam_session, attempt_no)
                 is_frozen = bool(freeze_rule and freeze_rule.is_frozen)
+                sheet_key = [semester_obj.id, subject_obj.id, sorted(selected_divisions), exam_type, exam_session,
+                             attempt_no, str(max_marks), str(pass_marks)]
 
-                students_qs = Student.objects.filter(branch=subject_obj.branch, semester=semester_obj)
-                if selected_divisions:
-                    students_qs = students_qs.filter(division__in=selected_divisions)
-                students = list(students_qs.order_by('enrollment_no'))
+                students = list(_marks_sheet_students(subject_obj, semester_obj, selected_divisions).order_by('enrollment_no'))
 
-                if request.method == 'POST':
-                    action = (request.POST.get('action') or '').strip()
+                action = (request.POST.get('action') or '').strip() if request.method == 'POST' else ''
 
                 if action == 'freeze_marks' and request.user.is_staff:
                     note = (request.POST.get('freeze_note') or '').strip()
@@ -2085,7 +1968,7 @@ def marks_entry(request):
                         message = 'Marks are frozen for this combination. Unfreeze first to edit.'
                     else:
                         audit_reason = (request.POST.get('audit_reason') or '').strip()
-                        saved_count = 0
+                        entries = {}
                         for student in students:
                             marks_key = f'marks_{student.id}'
                             absent_key = f'absent_{student.id}'
@@ -2104,75 +1987,73 @@ def marks_entry(request):
                                 if marks_value < 0 or marks_value > max_marks:
                                     continue
 
-                            record = StudentMark.objects.filter(
-                                student=student,
-                                subject=subject_obj,
-                                exam_type=exam_type,
-                                exam_session=exam_session,
-                                attempt_no=attempt_no,
-                            ).first()
-
-                            old_state = None
-                            if record:
-                                old_state = {
-                                    'marks_obtained': record.marks_obtained,
-                                    'is_absent': record.is_absent,
-                                    'max_marks': record.max_marks,
-                                    'pass_marks': record.pass_marks,
-                                }
-                                record.semester = semester_obj
-                                record.max_marks = max_marks
-                                record.pass_marks = pass_marks
-                                record.marks_obtained = None if is_absent_mark else marks_value
-                                record.is_absent = is_absent_mark
-                                record.entered_by = faculty
-                                record.save()
-                            else:
-                                record = StudentMark.objects.create(
-                                    student=student,
-                                    subject=subject_obj,
-                                    semester=semester_obj,
-                                    exam_type=exam_type,
-                                    exam_session=exam_session,
-                                    attempt_no=attempt_no,
-                                    max_marks=max_marks,
-                                    pass_marks=pass_marks,
-                                    marks_obtained=None if is_absent_mark else marks_value,
-                                    is_absent=is_absent_mark,
-                                    entered_by=faculty,
-                                )
+                            entries[student.id] = (is_absent_mark, marks_value)
 
-                            changed = not old_state or (
-                                old_state['marks_obtained'] != record.marks_obtained or
-                                old_state['is_absent'] != record.is_absent or
-                                old_state['max_marks'] != record.max_marks or
-                                old_state['pass_marks'] != record.pass_marks
-                            )
+                        save_marks_bulk(
+                            subject_obj, semester_obj, exam_type, exam_session, attempt_no, entries,
+                            max_marks=max_marks,
+                            pass_marks=pass_marks,
+                            entered_by=faculty,
+                            changed_by=request.user,
+                            reason=audit_reason,
+                        )
+                        message = f'Marks saved for {len(entries)} students.'
 
-                            if changed and old_state:
-                                MarksAuditTrail.objects.create(
-                                    student_mark=record,
-                                    student=student,
-                                    subject=subject_obj,
-                                    semester=semester_obj,
-                                    exam_type=exam_type,
-                                    exam_session=exam_session,
-                                    attempt_no=attempt_no,
-                                    old_marks=old_state['marks_obtained'],
-                                    new_marks=record.marks_obtained,
-                                    old_absent=old_state['is_absent'],
-                                    new_absent=record.is_absent,
-                                    old_max_marks=old_state['max_marks'],
-                                    new_max_marks=record.max_marks,
-                                    old_pass_marks=old_state['pass_marks'],
-                                    new_pass_marks=record.pass_marks,
-                                    reason=audit_reason,
-                                    action='UPDATE',
-                                    changed_by=request.user,
-                                )
+                elif action == 'preview_import':
+                    upload = request.FILES.get('marks_file')
+                    if is_frozen:
+                        message = 'Marks are frozen for this combination. Unfreeze first to edit.'
+                    elif not upload:
+                        message = 'Choose a CSV or Excel file to import.'
+                    else:
+                        try:
+                            sheet_df = read_marks_sheet(upload)
+                        except ValueError as exc:
+                            message = str(exc)
+                        else:
+                            import_preview = preview_marks_import(
+                                sheet_df,
+                                _marks_sheet_students(subject_obj, semester_obj, selected_divisions),
+                                subject_obj, exam_type, exam_session, attempt_no, max_marks, pass_marks,
+                            )
+                            import_preview['token'] = secrets.token_urlsafe(12)
+                            request.session[MARKS_IMPORT_SESSION_KEY] = {
+                                'token': import_preview['token'],
+                                'sheet': sheet_key,
+                                'entries': {
+                                    str(student_id): [is_absent, None if value is None else str(value)]
+                                    for student_id, (is_absent, value) in import_preview['entries'].items()
+                                },
+                                'versions': {str(student_id): version for student_id, version in import_preview['versions'].items()},
+                            }
 
-                            saved_count += 1
-                        message = f'Marks saved for {saved_count} students.'
+                elif action == 'confirm_import':
+                    pending = request.session.get(MARKS_IMPORT_SESSION_KEY) or {}
+                    if is_frozen:
+                        message = 'Marks are frozen for this combination. Unfreeze first to edit.'
+                    elif not pending or pending.get('token') != request.POST.get('import_token') or pending.get('sheet') != sheet_key:
+                        message = 'This import preview has expired. Upload the file again.'
+                    else:
+                        del request.session[MARKS_IMPORT_SESSION_KEY]
+                        result = save_marks_bulk(
+                            subject_obj, semester_obj, exam_type, exam_session, attempt_no,
+                            {
+                                int(student_id): (is_absent, None if value is None else Decimal(value))
+                                for student_id, (is_absent, value) in pending['entries'].items()
+                            },
+                            max_marks=max_marks,
+                            pass_marks=pass_marks,
+                            entered_by=faculty,
+                            changed_by=request.user,
+                            reason=(request.POST.get('audit_reason') or '').strip() or 'Spreadsheet import',
+                            versions={int(student_id): version for student_id, version in pending['versions'].items()},
+                        )
+                        message = (
+                            f"Imported marks: {len(result['created'])} new, {len(result['updated'])} updated, "
+                            f"{len(result['unchanged'])} unchanged."
+                        )
+                        if result['stale']:
+                            message += f" {len(result['stale'])} row(s) changed after the preview and were skipped."
 
                 marks_qs = StudentMark.objects.filter(
                     subject=subject_obj,
@@ -2181,11 +2062,13 @@ def marks_entry(request):
                     attempt_no=attempt_no,
                 )
                 existing_marks = {m.student_id: m for m in marks_qs}
+                marks_stats = marks_statistics(subject_obj, exam_type, exam_session, attempt_no)
 
     return render(request, 'results/marks_entry.html', {
         'form': form,
         'students': students,
         'existing_marks': existing_marks,
+        'mark_versions': {student_id: mark_version(record) for student_id, record in existing_marks.items()},
         'selected_divisions': selected_divisions,
         'message': message,
         'subject_obj': subject_obj,
@@ -2195,6 +2078,187 @@ def marks_entry(request):
         'freeze_rule': freeze_rule,
         'is_frozen': is_frozen,
         'mentor_error': mentor_error,
+        'import_preview': import_preview,
+        'marks_stats': marks_stats,
+    })
+
+
+@login_required(login_url='login')
+def marks_statistics_json(request):
+    """Class statistics for one exam column (subject, exam_type, exam_session, attempt_no).
+
+    Faculty must mentor the requested `division`s of the subject's semester, as in marks_entry.
+    """
+    if not request.user.is_staff and not getattr(request.user, 'faculty', None):
+        return JsonResponse({'ok': False, 'error': 'Not allowed.'}, status=403)
+
+    try:
+        subject_id = int((request.GET.get('subject') or '').strip())
+    except ValueError:
+        return JsonResponse({'ok': False, 'error': 'subject must be a subject id.'}, status=400)
+    subject_obj = Subject.objects.filter(id=subject_id).select_related('semester').first()
+    exam_type = (request.GET.get('exam_type') or '').strip().upper()
+    exam_session = (request.GET.get('exam_session') or '').strip().upper()
+    try:
+        attempt_no = int(request.GET.get('attempt_no') or 1)
+    except ValueError:
+        attempt_no = 0
+    if not subject_obj or exam_type not in dict(StudentMark.EXAM_TYPE_CHOICES) or not exam_session or attempt_no < 1:
+        return JsonResponse({'ok': False, 'error': 'subject, exam_type, exam_session and attempt_no are required.'}, status=400)
+    divisions = [d for d in request.GET.getlist('division') if d]
+    if not _is_mentor_for_scope(request.user, subject_obj.semester, divisions):
+        return JsonResponse({'ok': False, 'error': 'You can view marks only for classes where you are assigned as mentor.'}, status=403)
+
+    return JsonResponse({
+        'ok': True,
+        'subject': subject_obj.code,
+        'exam_type': exam_type,
+        'exam_session': exam_session,
+        'attempt_no': attempt_no,
+        'statistics': marks_statistics(subject_obj, exam_type, exam_session, attempt_no),
+    })
+
+
+@login_required(login_url='login')
+@require_POST
+def marks_entry_save_json(request):
+    """Autosave endpoint for the marks grid: only changed cells, each with its row version."""
+    faculty = getattr(request.user, 'faculty', None)
+    if not request.user.is_staff and not faculty:
+        return JsonResponse({'ok': False, 'error': 'Not allowed.'}, status=403)
+
+    try:
+        payload = json.loads(request.body.decode('utf-8') or '{}')
+        cells = payload.get('cells') or {}
+        if not isinstance(cells, dict):
+            raise ValueError
+    except (ValueError, UnicodeDecodeError, AttributeError):
+        return JsonResponse({'ok': False, 'error': 'Invalid payload.'}, status=400)
+
+    form_data = {key: payload.get(key) for key in ('semester', 'subject', 'exam_type', 'exam_session', 'attempt_no', 'max_marks', 'pass_marks')}
+    divisions = [d for d in (payload.get('division') or []) if d]
+    form = FacultyMarksEntryForm({**form_data, 'division': divisions}, selected_semester_id=form_data['semester'])
+    if not form.is_valid():
+        return JsonResponse({'ok': False, 'error': 'Invalid marks sheet.', 'fields': form.errors}, status=400)
+
+    semester_obj = form.cleaned_data['semester']
+    subject_obj = form.cleaned_data['subject']
+    divisions = form.cleaned_data.get('division') or []
+    exam_type = form.cleaned_data['exam_type']
+    exam_session = (form.cleaned_data['exam_session'] or '').strip().upper()
+    attempt_no = form.cleaned_data['attempt_no']
+    max_marks = form.cleaned_data['max_marks']
+    if subject_obj.semester_id != semester_obj.id:
+        return JsonResponse({'ok': False, 'error': 'Selected subject does not belong to selected semester.'}, status=400)
+    if not _is_mentor_for_scope(request.user, semester_obj, divisions):
+        return JsonResponse({'ok': False, 'error': 'You can enter marks only for classes where you are assigned as mentor.'}, status=403)
+    freeze_rule = _marks_freeze_rule(semester_obj, subject_obj, exam_type, exam_session, attempt_no)
+    if freeze_rule and freeze_rule.is_frozen:
+        return JsonResponse({'ok': False, 'error': 'Marks are frozen for this combination.'}, status=409)
+
+    requested_ids = set()
+    for key in cells:
+        try:
+            requested_ids.add(int(key))
+        except (TypeError, ValueError):
+            continue
+    allowed_ids = set(
+        _marks_sheet_students(subject_obj, semester_obj, divisions)
+        .filter(id__in=requested_ids)
+        .values_list('id', flat=True)
+    )
+
+    entries, versions, errors = {}, {}, {}
+    for key, cell in cells.items():
+        try:
+            student_id = int(key)
+        except (TypeError, ValueError):
+            continue
+        if student_id not in allowed_ids or not isinstance(cell, dict):
+            errors[student_id] = 'Student is not on this marks sheet.'
+            continue
+        is_absent = bool(cell.get('absent'))
+        marks_value = None
+        if not is_absent:
+            try:
+                marks_value = Decimal(str(cell.get('marks')).strip())
+            except (InvalidOperation, ValueError):
+                errors[student_id] = 'Enter marks or mark the student absent.'
+                continue
+            if not marks_value.is_finite() or marks_value < 0 or marks_value > max_marks:
+                errors[student_id] = f'Marks must be between 0 and {max_marks}.'
+                continue
+            if (marks_value * 100) % 1 != 0:
+                errors[student_id] = 'Marks can have at most 2 decimal places.'
+                continue
+        entries[student_id] = (is_absent, marks_value)
+        versions[student_id] = str(cell.get('version') or '')
+
+    result = save_marks_bulk(
+        subject_obj, semester_obj, exam_type, exam_session, attempt_no, entries,
+        max_marks=max_marks,
+        pass_marks=form.cleaned_data.get('pass_marks'),
+        entered_by=faculty,
+        changed_by=request.user,
+        reason=(payload.get('reason') or '').strip()[:300],
+        versions=versions,
+    )
+    return JsonResponse({
+        'ok': True,
+        'saved': {str(student_id): version for student_id, version in result['versions'].items()},
+        'stale': {
+            str(student_id): {
+                'version': mark_version(record),
+                'marks': str(record.marks_obtained) if record and record.marks_obtained is not None else '',
+                'absent': bool(record and record.is_absent),
+            }
+            for student_id, record in result['stale'].items()
+        },
+        'errors': {str(student_id): message for student_id, message in errors.items()},
+    })
+
+
+@login_required(login_url='login')
+def marks_audit_log(request):
+    """Admin/exam-cell browser over the marks audit trail, newest first."""
+    if not request.user.is_staff:
+        return redirect('dashboard')
+
+    form = MarksAuditFilterForm(request.GET or None)
+    filters = form.cleaned_data if form.is_valid() else {}
+    audits = marks_audit_queryset(
+        subject=filters.get('subject'),
+        exam_session=(filters.get('exam_session') or '').strip().upper(),
+        changed_by=filters.get('changed_by'),
+        enrollment_no=(filters.get('enrollment_no') or '').strip(),
+        date_from=filters.get('date_from'),
+        date_to=filters.get('date_to'),
+    )
+    if form.is_bound and form.errors:
+        # Do not list the whole trail as if the rejected filters had matched.
+        audits = audits.none()
+    page = keyset_page(
+        audits.select_related('student', 'subject', 'changed_by'),
+        'changed_at',
+        descending=True,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        salt='marks_audit_log',
+    )
+
+    def _page_url(**cursor):
+        params = request.GET.copy()
+        for key in ('after', 'before'):
+            params.pop(key, None)
+        params.update(cursor)
+        return f'?{params.urlencode()}'
+
+    return render(request, 'results/marks_audit.html', {
+        'form': form,
+        'audits': page['rows'],
+        'first_page_url': _page_url() if page['has_prev'] else None,
+        'prev_page_url': _page_url(before=page['prev_cursor']) if page['has_prev'] else None,
+        'next_page_url': _page_url(after=page['next_cursor']) if page['has_next'] else None,
     })
 
 
@@ -2948,7 +3012,12 @@ def delete_subject(request, subject_id):
     if request.method == 'POST':
         branch_id = subject.branch_id
         semester_id = subject.semester_id
+        affected_student_ids = set(Attendance.objects.filter(subject=subject).values_list('student_id', flat=True).distinct())
+        affected_student_ids.update(StudentMark.objects.filter(subject=subject).values_list('student_id', flat=True).distinct())
+        affected_student_ids.update(StudentSubject.objects.filter(subject=subject).values_list('student_id', flat=True))
         subject.delete()
+        queue_risk_refresh(affected_student_ids)
+        bump_student_data_version(affected_student_ids)
         params = urlencode({'branch': branch_id, 'semester': semester_id})
         return redirect(f"/subjects/?{params}")
 
@@ -2976,143 +3045,52 @@ def upload_students(request):
             semester = form.cleaned_data['semester']
             f = form.cleaned_data['file']
 
-            # Read file using pandas
+            upload_token = request.POST.get('upload_token')
+
             try:
-                if str(f.name).lower().endswith('.csv'):
-                    df = pd.read_csv(f)
-                else:
-                    df = pd.read_excel(f)
-            except Exception as e:
+                chunks = STUDENT_UPLOAD.parse_chunks(iter_table(f))
+                parsed = next(chunks)
+            except ValueError as e:
                 message = f"Failed to read file: {e}"
-                df = None
-
-            if df is not None:
-                # Normalize column names
-                df.columns = [str(c).strip().lower().replace(' ', '_') for c in df.columns]
-
-                # Map common variants
-                colmap = {
-                    'enrollment_no': ['enrollment_no', 'enrollment', 'enrollment_number', 'enrollmentno'],
-                    'name': ['name', 'student_name', 'fullname'],
-                    'division': ['division', 'div'],
-                    'admission_year': ['admission_year', 'admissionyear', 'year_of_admission', 'year'],
-                    'mentor_name': ['mentor_name', 'mentor', 'class_teacher'],
-                    'email': ['email', 'mail'],
-                    'phone': ['phone', 'mobile', 'contact'],
-                    'elective_codes': ['elective', 'electives', 'elective_subjects', 'elective_codes', 'subjects', 'subject_codes', 'subject_code']
-                }
-
-                resolved = {}
-                for target, variants in colmap.items():
-                    for v in variants:
-                        if v in df.columns:
-                            resolved[target] = v
-                            break
+                parsed = None
 
-                required_missing = [k for k in ['enrollment_no', 'name'] if k not in resolved]
-                if required_missing:
-                    message = f"Missing required columns: {', '.join(required_missing)}."
+            if parsed is not None:
+                if parsed.missing:
+                    message = f"Missing required columns: {', '.join(parsed.missing)}."
                 else:
-                    # Prepare rows
-                    rows = []
                     errors = []
-                    elective_lookup = {
-                        s.code.strip().upper(): s
-                        for s in Subject.objects.filter(branch=branch, semester=semester, is_elective=True)
-                    }
-                    subject_lookup = {
-                        s.code.strip().upper(): s
-                        for s in Subject.objects.filter(branch=branch, semester=semester)
-                    }
-                    for i, row in df.iterrows():
-                        enroll = str(row[resolved['enrollment_no']]).strip()
-                        name = str(row[resolved['name']]).strip()
-                        division = str(row[resolved.get('division', '')]).strip() if resolved.get('division') else ''
-                        admission_year = None
-                        if resolved.get('admission_year'):
-                            year_value = row.get(resolved['admission_year'])
-                            if not pd.isna(year_value):
-                                try:
-                                    admission_year = int(float(str(year_value).strip()))
-                                except Exception:
-                                    errors.append(f"Row {i+1}: invalid admission year")
-                                    continue
-                                if admission_year < 2000 or admission_year > 2100:
-                                    errors.append(f"Row {i+1}: admission year must be between 2000 and 2100")
-                                    continue
-                        mentor_name = str(row[resolved.get('mentor_name', '')]).strip() if resolved.get('mentor_name') else ''
-                        email = str(row[resolved.get('email', '')]) if resolved.get('email') else ''
-                        phone = str(row[resolved.get('phone', '')]) if resolved.get('phone') else ''
-                        elective_raw = ''
-                        if resolved.get('elective_codes'):
-                            elective_value = row.get(resolved['elective_codes'])
-                            elective_raw = '' if pd.isna(elective_value) else str(elective_value).strip()
-                        elective_codes = []
-                        if elective_raw:
-                            elective_codes = [
-                                code.strip().upper()
-                                for code in re.split(r'[;,|]+', elective_raw)
-                                if code and code.strip()
-                            ]
-
-                        if not enroll or not name:
-                            errors.append(f"Row {i+1}: missing required fields")
-                            continue
-
-                        rows.append({
-                            'row_index': i + 1,
-                            'enrollment_no': enroll,
-                            'name': name,
-                            'division': division or 'A',
-                            'admission_year': admission_year,
-                            'mentor_name': mentor_name,
-                            'email': email,
-                            'phone': phone,
-                            'elective_codes': elective_codes,
-                            'elective_display': elective_raw,
-                        })
-
-                    # Insert records (skip duplicates)
+                    preview_rows = []
                     created = 0
                     skipped = 0
-                    for r in rows:
-                        if Student.objects.filter(enrollment_no=r['enrollment_no']).exists():
-                            skipped += 1
-                            continue
-                        student = Student.objects.create(
-                            enrollment_no=r['enrollment_no'],
-                            name=r['name'],
-                            division=r['division'],
-                            admission_year=r['admission_year'],
-                            mentor_name=r['mentor_name'],
-                            email=r['email'],
-                            phone=r['phone'],
-                            branch=branch,
-                            semester=semester,
-                        )
-                        if r['elective_codes']:
-                            for code in r['elective_codes']:
-                                subject = elective_lookup.get(code)
-                                if subject is None:
-                                    if code in subject_lookup:
-                                        errors.append(
-                                            f"Row {r['row_index']}: {code} is not marked as an elective subject."
-                                        )
-                                    else:
-                                        errors.append(
-                                            f"Row {r['row_index']}: elective code {code} not found in this branch/semester."
-                                        )
-                                    continue
-                                StudentSubject.objects.get_or_create(student=student, subject=subject)
-                        created += 1
+                    total = 0
+
+                    # Insert records (skip duplicates), one transaction per chunk.
+                    try:
+                        for part in chain([parsed], chunks):
+                            outcome = bulk_create_students(part.rows, branch, semester)
+                            created += outcome['created']
+                            skipped += outcome['skipped']
+                            total += len(part.rows)
+                            errors.extend(part.errors)
+                            errors.extend(outcome['errors'])
+                            preview_rows.extend(part.rows[:20 - len(preview_rows)])
+                            report_upload_progress(
+                                upload_token, rows=total, created=created, skipped=skipped,
+                                errors=len(errors), percent=read_percent(f), done=False,
+                            )
+                    except ValueError as exc:
+                        errors.append(f"Stopped reading the file after {total} rows: {exc}")
+                    report_upload_progress(
+                        upload_token, rows=total, created=created, skipped=skipped,
+                        errors=len(errors), percent=100, done=True,
+                    )
 
                     results = {
                         'created': created,
                         'skipped': skipped,
                         'errors': errors,
-                        'total': len(rows)
+                        'total': total
                     }
-                    preview_rows = rows[:20]
                     message = f"Upload complete: {created} created, {skipped} skipped."
         else:
             message = "Please select branch, semester and a valid file."
@@ -3124,6 +3102,7 @@ def upload_students(request):
         'message': message,
         'results': results,
         'preview_rows': preview_rows,
+        'upload_token': secrets.token_urlsafe(16),
     })
 
 
@@ -3145,60 +3124,28 @@ def upload_marksheet(request):
             f = form.cleaned_data['file']
             is_csv = str(f.name).lower().endswith('.csv')
 
+            upload_token = request.POST.get('upload_token')
+
             try:
-                if is_csv:
-                    df = pd.read_csv(f)
-                else:
-                    f.seek(0)
-                    df = pd.read_excel(f)
-            except Exception as e:
+                chunks = RESULT_UPLOAD.parse_chunks(iter_table(f))
+                parsed = next(chunks)
+            except ValueError as e:
                 message = f"Failed to read file: {e}"
-                df = None
-
-            if df is not None:
-                df.columns = [str(c).strip().lower().replace(' ', '_') for c in df.columns]
-
-                colmap = {
-                    'enrollment_no': ['enrollment_no', 'enrollment', 'enrollment_number', 'enrollmentno'],
-                    'semester': ['semester', 'sem', 'sem_no'],
-                    'exam_session': ['exam_session', 'exam', 'session', 'exam_month'],
-                    'issued_date': ['issued_date', 'issue_date', 'date'],
-                    'spi': ['spi'],
-                    'cpi': ['cpi'],
-                    'earned_credits': ['earned_credits', 'earned_credit'],
-                    'earned_grade_points': ['earned_grade_points', 'earned_gp', 'earned_points'],
-                    'total_credits': ['total_credits', 'total_credit'],
-                    'total_grade_points': ['total_grade_points', 'total_gp', 'total_points'],
-                    'result_status': ['result_status', 'result'],
-                    'course_code': ['course_code', 'code', 'subject_code', 'coursecode'],
-                    'course_name': ['course_name', 'subject_name', 'name'],
-                    'course_credit': ['course_credit', 'credit', 'course_credits'],
-                    'grade': ['grade'],
-                }
-
-                resolved = {}
-                for target, variants in colmap.items():
-                    for v in variants:
-                        if v in df.columns:
-                            resolved[target] = v
-                            break
+                parsed = None
 
-                required = ['enrollment_no', 'semester', 'exam_session', 'course_code', 'course_name', 'course_credit', 'grade']
-                required_missing = [k for k in required if k not in resolved]
+            if parsed is not None:
+                required_missing = parsed.missing
 
                 if required_missing and not is_csv:
                     try:
-                        f.seek(0)
-                        raw_df = pd.read_excel(f, header=None)
+                        raw_df = read_workbook(f)
                         parsed_rows, parse_error = _extract_consolidated_marks_rows(raw_df)
                     except Exception as exc:
                         parsed_rows, parse_error = None, f'Failed to parse consolidated sheet: {exc}'
 
                     if parsed_rows:
-                        df = pd.DataFrame(parsed_rows)
-                        df.columns = [str(c).strip().lower().replace(' ', '_') for c in df.columns]
-                        resolved = {k: k for k in colmap.keys() if k in df.columns}
-                        required_missing = [k for k in required if k not in resolved]
+                        parsed = RESULT_UPLOAD.parse_frame(pd.DataFrame(parsed_rows))
+                        required_missing = parsed.missing
                     elif parse_error:
                         message = parse_error
 
@@ -3208,141 +3155,52 @@ def upload_marksheet(request):
                 else:
                     errors = []
                     preview_rows = []
-                    sheet_map = {}
-                    entries_map = {}
-
-                    for i, row in df.iterrows():
-                        enroll = str(row[resolved['enrollment_no']]).strip()
-                        sem_raw = str(row[resolved['semester']]).strip()
-                        exam_session = str(row[resolved['exam_session']]).strip()
-                        course_code = str(row[resolved['course_code']]).strip()
-                        course_name = str(row[resolved['course_name']]).strip()
-
-                        if not enroll or not sem_raw or not exam_session or not course_code or not course_name:
-                            errors.append(f"Row {i+1}: missing required fields")
-                            continue
-
-                        try:
-                            semester_no = int(float(sem_raw))
-                        except Exception:
-                            errors.append(f"Row {i+1}: invalid semester for {enroll}")
-                            continue
-
-                        try:
-                            course_credit = float(row[resolved['course_credit']])
-                        except Exception:
-                            errors.append(f"Row {i+1}: invalid course credit for {course_code}")
-                            continue
-
-                        student = Student.objects.filter(enrollment_no__iexact=enroll).select_related('semester').first()
-                        if not student:
-                            errors.append(f"Row {i+1}: student not found ({enroll})")
-                            continue
-
-                        semester_obj = Semester.objects.filter(number=semester_no).first()
-                        if not semester_obj:
-                            errors.append(f"Row {i+1}: semester not found ({semester_no})")
-                            continue
-
-                        if student.semester_id != semester_obj.id:
-                            errors.append(f"Row {i+1}: semester mismatch for {enroll}")
-                            continue
-
-                        issued_date_val = None
-                        if resolved.get('issued_date') and not pd.isna(row[resolved['issued_date']]):
-                            try:
-                                issued_date_val = pd.to_datetime(row[resolved['issued_date']]).date()
-                            except Exception:
-                                errors.append(f"Row {i+1}: invalid issued date for {enroll}")
-                                continue
-
-                        spi = row[resolved['spi']] if resolved.get('spi') and not pd.isna(row[resolved['spi']]) else None
-                        cpi = row[resolved['cpi']] if resolved.get('cpi') and not pd.isna(row[resolved['cpi']]) else None
-                        earned_credits = row[resolved['earned_credits']] if resolved.get('earned_credits') and not pd.isna(row[resolved['earned_credits']]) else None
-                        earned_grade_points = row[resolved['earned_grade_points']] if resolved.get('earned_grade_points') and not pd.isna(row[resolved['earned_grade_points']]) else None
-                        total_credits = row[resolved['total_credits']] if resolved.get('total_credits') and not pd.isna(row[resolved['total_credits']]) else None
-                        total_grade_points = row[resolved['total_grade_points']] if resolved.get('total_grade_points') and not pd.isna(row[resolved['total_grade_points']]) else None
-                        result_status = str(row[resolved['result_status']]).strip() if resolved.get('result_status') and not pd.isna(row[resolved['result_status']]) else 'PASS'
-
-                        key = (student.id, semester_obj.id, exam_session)
-                        if key not in sheet_map:
-                            sheet_map[key] = {
-                                'student': student,
-                                'semester': semester_obj,
-                                'exam_session': exam_session,
-                                'issued_date': issued_date_val,
-                                'spi': spi,
-                                'cpi': cpi,
-                                'earned_credits': earned_credits,
-                                'earned_grade_points': earned_grade_points,
-                                'total_credits': total_credits,
-                                'total_grade_points': total_grade_points,
-                                'result_status': result_status,
-                            }
-
-                        entries_map.setdefault(key, []).append({
-                            'course_code': course_code,
-                            'course_name': course_name,
-                            'course_credit': course_credit,
-                            'grade': str(row[resolved['grade']]).strip() if resolved.get('grade') else '',
-                        })
-
-                        if len(preview_rows) < 20:
-                            preview_rows.append({
-                                'enrollment_no': enroll,
-                                'semester': semester_no,
-                                'exam_session': exam_session,
-                                'course_code': course_code,
-                                'course_name': course_name,
-                                'course_credit': course_credit,
-                                'grade': str(row[resolved['grade']]).strip() if resolved.get('grade') else '',
-                            })
-
+                    written = set()
+                    semester_numbers = set()
+                    exam_sessions = set()
                     created = 0
                     updated = 0
-                    for key, sheet_data in sheet_map.items():
-                        sheet, was_created = ResultSheet.objects.update_or_create(
-                            student=sheet_data['student'],
-                            semester=sheet_data['semester'],
-                            exam_session=sheet_data['exam_session'],
-                            defaults={
-                                'issued_date': sheet_data['issued_date'],
-                                'spi': sheet_data['spi'],
-                                'cpi': sheet_data['cpi'],
-                                'earned_credits': sheet_data['earned_credits'],
-                                'earned_grade_points': sheet_data['earned_grade_points'],
-                                'total_credits': sheet_data['total_credits'],
-                                'total_grade_points': sheet_data['total_grade_points'],
-                                'result_status': sheet_data['result_status'],
-                            }
-                        )
-                        if was_created:
-                            created += 1
-                        else:
-                            updated += 1
+                    total = 0
 
-                        ResultEntry.objects.filter(result_sheet=sheet).delete()
-                        entries = entries_map.get(key, [])
-                        ResultEntry.objects.bulk_create([
-                            ResultEntry(
-                                result_sheet=sheet,
-                                course_code=e['course_code'],
-                                course_name=e['course_name'],
-                                course_credit=e['course_credit'],
-                                grade=e['grade']
-                            ) for e in entries
-                        ])
+                    # One transaction per chunk; a sheet split across chunks keeps all its courses.
+                    try:
+                        for part in chain([parsed], chunks):
+                            outcome = save_result_rows(part.rows, written)
+                            total += part.total
+                            created += outcome['created']
+                            updated += outcome['updated']
+                            errors.extend(part.errors)
+                            errors.extend(outcome['errors'])
+                            preview_rows.extend(outcome['rows'][:20 - len(preview_rows)])
+                            for semester_no, exam_session in outcome['sheets'].values():
+                                semester_numbers.add(semester_no)
+                                exam_sessions.add(exam_session)
+                            report_upload_progress(
+                                upload_token, rows=total, created=created, updated=updated,
+                                errors=len(errors), percent=read_percent(f), done=False,
+                            )
+                    except ValueError as exc:
+                        errors.append(f"Stopped reading the file after {total} rows: {exc}")
+                    finally:
+                        # Also after a failed chunk: the earlier chunks are already committed.
+                        publish_results({key[0] for key in written})
+                    report_upload_progress(
+                        upload_token, rows=total, created=created, updated=updated,
+                        errors=len(errors), percent=100, done=True,
+                    )
 
                     results = {
                         'created': created,
                         'updated': updated,
                         'errors': errors,
-                        'total': len(df)
+                        'total': total
                     }
                     message = f"Upload complete: {created} created, {updated} updated."
                     if created or updated:
                         _create_result_announcement(
-                            sheet_map=sheet_map,
+                            semester_numbers=semester_numbers,
+                            exam_sessions=exam_sessions,
+                            total_sheets=len(written),
                             created_count=created,
                             updated_count=updated,
                             user=request.user,
@@ -3357,9 +3215,22 @@ def upload_marksheet(request):
         'message': message,
         'results': results,
         'preview_rows': preview_rows,
+        'upload_token': secrets.token_urlsafe(16),
     })
 
 
+@login_required(login_url='login')
+def upload_progress_json(request, token):
+    """Progress of a running student/result upload, polled by the upload pages."""
+    if not request.user.is_staff:
+        return JsonResponse({'ok': False, 'error': 'Not allowed.'}, status=403)
+
+    state = upload_progress(token)
+    if state is None:
+        return JsonResponse({'ok': False, 'error': 'No progress for this upload yet.'}, status=404)
+    return JsonResponse({'ok': True, **state})
+
+
 # ============= PUBLIC RESULT LOOKUP =============
 
 def public_result(request):
@@ -3369,19 +3240,14 @@ def public_result(request):
     if request.method == 'POST' and form.is_valid():
         enrollment = form.cleaned_data['enrollment_no'].strip()
         semester_no = form.cleaned_data['semester']
-        student = Student.objects.filter(
-            enrollment_no__iexact=enrollment,
-            semester__number=semester_no
-        ).select_related('branch', 'semester').first()
+        result_context, error = get_public_result(enrollment, semester_no)
 
-        if not student:
+        if error:
+            context['error'] = error
+        elif not result_context:
             context['error'] = 'Result not found for the given enrollment and semester.'
         else:
-            result_context, error = _build_result_context(student, semester_no=semester_no)
-            if error:
-                context['error'] = error
-            else:
-                context.update(result_context)
+            context.update(result_context)
 
     return render(request, 'results/result_lookup.html', context)
 
@@ -3394,177 +3260,15 @@ def public_result_pdf(request):
     except Exception:
         return HttpResponse('Invalid request.', status=400)
 
-    student = Student.objects.filter(
-        enrollment_no__iexact=enrollment,
-        semester__number=semester_no
-    ).select_related('branch', 'semester').first()
-
-    if not student:
-        return HttpResponse('Result not found.', status=404)
-
-    result_context, error = _build_result_context(student, semester_no=semester_no)
+    result_context, error = get_public_result(enrollment, semester_no)
     if error:
         return HttpResponse(error, status=404)
+    if not result_context:
+        return HttpResponse('Result not found.', status=404)
 
-    response = HttpResponse(content_type='application/pdf')
+    student = result_context['student']
     filename = f"Marksheet_{student.enrollment_no}_Sem{student.semester.number}.pdf"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-    from reportlab.lib.pagesizes import landscape
-    p = canvas.Canvas(response, pagesize=landscape(A4))
-    width, height = landscape(A4)
-    y = height - 40
-
-    sheet = result_context['sheet']
-
-    p.setFont("Helvetica-Bold", 14)
-    p.drawCentredString(width / 2, y, "KADI SARVA VISHWAVIDYALAYA")
-    y -= 18
-    p.drawCentredString(width / 2, y, "STATEMENT OF MARKS / GRADE")
-
-    y -= 18
-    p.setFont("Helvetica", 12)
-    p.drawCentredString(width / 2, y, f"Semester - {sheet.semester.number} Examination held in {sheet.exam_session}")
-
-    y -= 20
-    p.setFont("Helvetica", 12)
-    p.drawString(40, y, f"Enrollment No: {student.enrollment_no}")
-    y -= 12
-    p.drawString(40, y, f"Student Name: {student.name}")
-    y -= 12
-    p.drawString(40, y, f"Branch: {student.branch.name}")
-
-    y -= 18
-    
-    # Build main table with courses and remarks (grading scheme) on the right
-    # Header row with nested structure
-    main_table_data = []
-    
-    # Main header
-    header_row1 = ["Course Code", "Subject Name", "Course Credit", "Grade", "Remarks"]
-    main_table_data.append(header_row1)
-    
-    # Sub-header for remarks
-    header_row2 = ["", "", "", "", ""]
-    main_table_data.append(header_row2)
-    
-    # Course rows
-    course_rows = []
-    for row in result_context['rows']:
-        course_rows.append([
-            row['code'],
-            row['name'],
-            str(row['credit']),
-            row['grade'],
-            ""
-        ])
-    
-    # Calculate how many rows we have for courses
-    num_courses = len(course_rows)
-    
-    # Add course rows
-    main_table_data.extend(course_rows)
-    
-    # Create the main table
-    main_table = Table(main_table_data, colWidths=[1.2*inch, 3.2*inch, 1.0*inch, 0.8*inch, 2.5*inch])
-    
-    style_list = [
-        ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 9),
-        ('FONT', (0, 2), (-1, -1), 'Helvetica', 9),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (3, -1), 0.6, colors.black),
-        ('GRID', (4, 0), (4, -1), 0.6, colors.black),
-        ('BACKGROUND', (0, 0), (-1, 1), colors.whitesmoke),
-        ('SPAN', (4, 0), (4, 1)),  # Merge Remarks header
-        ('SPAN', (4, 2), (4, -1)),  # Merge all Remarks content cells
-    ]
-    
-    main_table.setStyle(TableStyle(style_list))
-    
-    # Create grading scheme sub-table for remarks column
-    scheme_data = [
-        ["Grading\nScheme", "Percentage\nAccording to Grade", "Grade\nPoints"],
-        ["A+", "90-100", "10"],
-        ["A", "80-89", "9"],
-        ["A-", "70-79", "8"],
-        ["B+", "60-69", "7"],
-        ["B", "50-59", "6"],
-        ["B-", "40-49", "5"],
-        ["F", "< 40", "0"],
-    ]
-    scheme_table = Table(scheme_data, colWidths=[0.8*inch, 1.0*inch, 0.6*inch])
-    scheme_table.setStyle(TableStyle([
-        ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 7),
-        ('FONT', (0, 1), (-1, -1), 'Helvetica', 7),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.4, colors.black),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-    ]))
-    
-    # Draw the main table
-    main_table.wrapOn(p, width - 80, height)
-    table_y = y - (len(main_table_data) * 16)
-    main_table.drawOn(p, 40, table_y)
-    
-    # Calculate position for scheme table in the remarks column
-    scheme_x = 40 + 1.2*inch + 3.2*inch + 1.0*inch + 0.8*inch + 0.1*inch
-    scheme_y = table_y + (len(main_table_data) * 16) - 32 - (len(scheme_data) * 12)
-    scheme_table.wrapOn(p, 2.4*inch, height)
-    scheme_table.drawOn(p, scheme_x, scheme_y)
-    
-    y = table_y - 25
-
-    # Summary tables side by side at bottom
-    left_summary_data = [
-        ["Credits", "Earned Grade\nPoints", "SPI"],
-        [str(sheet.earned_credits or ''), str(sheet.earned_grade_points or ''), str(sheet.spi or '')],
-    ]
-    left_summary = Table(left_summary_data, colWidths=[1.0*inch, 1.2*inch, 0.8*inch])
-    left_summary.setStyle(TableStyle([
-        ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 9),
-        ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.6, colors.black),
-    ]))
-    left_summary.wrapOn(p, 3.0*inch, height)
-    left_summary.drawOn(p, 40, y - 40)
-    
-    right_summary_data = [
-        ["Earned\nCredits", "Earned Grade\nPoints", "CPI"],
-        [str(sheet.total_credits or ''), str(sheet.total_grade_points or ''), str(sheet.cpi or '')],
-    ]
-    right_summary = Table(right_summary_data, colWidths=[1.0*inch, 1.2*inch, 0.8*inch])
-    right_summary.setStyle(TableStyle([
-        ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 9),
-        ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.6, colors.black),
-    ]))
-    right_summary.wrapOn(p, 3.0*inch, height)
-    right_summary.drawOn(p, 40 + 3.5*inch, y - 40)
-    
-    # Result at bottom
-    y = y - 60
-    p.setFont("Helvetica-Bold", 11)
-    p.drawString(40, y, f"RESULT : {sheet.result_status}")
-    
-    if sheet.issued_date:
-        p.setFont("Helvetica", 9)
-        p.drawRightString(width - 40, y, f"Issued Date: {sheet.issued_date.strftime('%d %b %Y')}")
-
-    p.setFont("Helvetica", 8)
-    p.drawCentredString(width / 2, 20, "Generated by Exam Cell")
-
-    p.save()
-    return response
-    p.drawCentredString(width / 2, 30, "Generated by Exam Cell")
-
-    p.save()
-    return response
+    return result_pdf_response(request, result_context, filename)
 
 
 # ============= ENROLLMENTS (TOGGLES) =============
@@ -3578,6 +3282,30 @@ def _subject_initials(name):
         return parts[0].upper()
     return ''.join(p[0].upper() for p in parts)
 
+def _enrollments_csv_response(students, subjects):
+    """Stream a Yes/No enrollment matrix; one EXISTS column per subject keeps it to a single query."""
+    header = ['Enrollment No', 'Name', 'Division']
+    flags = {}
+    for idx, s in enumerate(subjects):
+        initials = _subject_initials(s.name)
+        header.append(f"{s.code} ({initials})" if initials else s.code)
+        flags[f'enrolled_{idx}'] = Exists(
+            StudentSubject.objects.filter(student_id=OuterRef('pk'), subject_id=s.id)
+        )
+
+    def _row(values):
+        return list(values[:3]) + ['Yes' if enrolled else 'No' for enrolled in values[3:]]
+
+    return streaming_csv_response(
+        'enrollments.csv',
+        header,
+        iter_queryset_rows(
+            students.annotate(**flags),
+            ('enrollment_no', 'name', 'division', *flags),
+            transform=_row,
+        ),
+    )
+
 @login_required(login_url='login')
 def manage_enrollments(request):
     """Manage enrollments for a branch+semester.
@@ -3646,6 +3374,7 @@ def manage_enrollments(request):
                     [StudentSubject(student_id=sid, subject_id=subid) for sid, subid in to_create],
                     ignore_conflicts=True,
                 )
+                enrollments_changed(sid for sid, _ in to_create)
 
         if request.method == 'POST':
             action = request.POST.get('action')
@@ -3689,6 +3418,7 @@ def manage_enrollments(request):
                         student_id__in=[sid for sid, _ in to_delete],
                         subject_id__in=[subid for _, subid in to_delete if subid in elective_subject_ids],
                     ).delete()
+                enrollments_changed(sid for sid, _ in to_create | to_delete)
 
                 message = "Enrollments updated. Fixed subjects are assigned automatically."
             elif action == 'upload_electives':
@@ -3697,21 +3427,16 @@ def manage_enrollments(request):
                     upload_errors.append("Please select a file to upload.")
                 else:
                     try:
-                        if str(upload_file.name).lower().endswith('.csv'):
-                            df = pd.read_csv(upload_file)
-                        else:
-                            df = pd.read_excel(upload_file)
-                    except Exception as exc:
+                        chunks = ELECTIVE_UPLOAD.parse_chunks(iter_table(upload_file))
+                        parsed = next(chunks)
+                    except ValueError as exc:
                         upload_errors.append(f"Failed to read file: {exc}")
-                        df = None
+                        parsed = None
 
-                    if df is not None:
-                        df.columns = [str(c).strip().lower().replace(' ', '_') for c in df.columns]
-                        required = ['enrollment_no', 'elective_group', 'subject_code']
-                        missing = [c for c in required if c not in df.columns]
-                        if missing:
+                    if parsed is not None:
+                        if parsed.missing:
                             upload_errors.append(
-                                f"Missing required columns: {', '.join(missing)}."
+                                f"Missing required columns: {', '.join(parsed.missing)}."
                             )
                         else:
                             def _norm_group(value):
@@ -3731,89 +3456,114 @@ def manage_enrollments(request):
                                 if group_key:
                                     group_subjects.setdefault(group_key, []).append(subj)
 
-                            created = 0
-                            updated = 0
-                            skipped = 0
-
-                            for idx, row in df.iterrows():
-                                row_no = idx + 1
-                                enroll = str(row.get('enrollment_no', '')).strip()
-                                group_raw = row.get('elective_group', '')
-                                code_raw = row.get('subject_code', '')
-
-                                group_key = _norm_group(group_raw)
-                                subject_code = str(code_raw or '').strip().upper()
-
-                                if not enroll or not group_key or not subject_code:
-                                    upload_errors.append(
-                                        f"Row {row_no}: missing enrollment_no, elective_group, or subject_code."
-                                    )
-                                    continue
-
-                                student = Student.objects.filter(
-                                    enrollment_no__iexact=enroll,
+                            students_by_enrollment = {
+                                enrollment: student_id
+                                for student_id, enrollment in Student.objects.filter(
                                     branch_id=branch_id,
                                     semester_id=semester_id,
-                                ).first()
-                                if not student:
-                                    upload_errors.append(
-                                        f"Row {row_no}: student not found in selected branch/semester ({enroll})."
-                                    )
-                                    continue
-
-                                subject = subject_by_code.get(subject_code)
-                                if not subject:
-                                    upload_errors.append(
-                                        f"Row {row_no}: elective subject code not found ({subject_code})."
-                                    )
-                                    continue
-
-                                subject_group = _norm_group(subject.elective_group)
-                                if not subject_group:
-                                    upload_errors.append(
-                                        f"Row {row_no}: subject has no elective group ({subject_code})."
-                                    )
-                                    continue
-                                if subject_group != group_key:
-                                    upload_errors.append(
-                                        f"Row {row_no}: group mismatch for {subject_code} (expected {subject_group})."
-                                    )
-                                    continue
-
-                                group_list = group_subjects.get(group_key, [])
-                                if not group_list:
-                                    upload_errors.append(
-                                        f"Row {row_no}: elective group not found ({group_key})."
-                                    )
-                                    continue
-
-                                existing_group = StudentSubject.objects.filter(
-                                    student=student,
-                                    subject__in=group_list,
-                                )
+                                ).annotate(enrollment_upper=Upper('enrollment_no')).values_list('id', 'enrollment_upper')
+                            }
+                            # Elective enrolments as they will be after the upload; later rows win.
+                            current = {}
+                            for sid, subid in StudentSubject.objects.filter(
+                                student_id__in=students_by_enrollment.values(),
+                                subject__in=elective_subjects,
+                            ).values_list('student_id', 'subject_id'):
+                                current.setdefault(sid, set()).add(subid)
+                            to_create = set()
+                            to_delete = set()
 
-                                if existing_group.filter(subject=subject).exists() and existing_group.count() == 1:
-                                    skipped += 1
-                                    continue
+                            created = 0
+                            updated = 0
+                            skipped = 0
+                            total = 0
 
-                                existing_group.exclude(subject=subject).delete()
-                                _, was_created = StudentSubject.objects.get_or_create(
-                                    student=student,
-                                    subject=subject,
+                            try:
+                                for part in chain([parsed], chunks):
+                                    upload_errors.extend(part.errors)
+                                    total += part.total
+                                    for row_no, enroll, group_key, subject_code in part.rows:
+                                        student_id = students_by_enrollment.get(enroll.upper())
+                                        if not student_id:
+                                            upload_errors.append(
+                                                f"Row {row_no}: student not found in selected branch/semester ({enroll})."
+                                            )
+                                            continue
+
+                                        subject = subject_by_code.get(subject_code)
+                                        if not subject:
+                                            upload_errors.append(
+                                                f"Row {row_no}: elective subject code not found ({subject_code})."
+                                            )
+                                            continue
+
+                                        subject_group = _norm_group(subject.elective_group)
+                                        if not subject_group:
+                                            upload_errors.append(
+                                                f"Row {row_no}: subject has no elective group ({subject_code})."
+                                            )
+                                            continue
+                                        if subject_group != group_key:
+                                            upload_errors.append(
+                                                f"Row {row_no}: group mismatch for {subject_code} (expected {subject_group})."
+                                            )
+                                            continue
+
+                                        group_list = group_subjects.get(group_key, [])
+                                        if not group_list:
+                                            upload_errors.append(
+                                                f"Row {row_no}: elective group not found ({group_key})."
+                                            )
+                                            continue
+
+                                        enrolled = current.setdefault(student_id, set())
+                                        existing_group = enrolled & {s.id for s in group_list}
+                                        if existing_group == {subject.id}:
+                                            skipped += 1
+                                            continue
+
+                                        for subid in existing_group - {subject.id}:
+                                            enrolled.discard(subid)
+                                            if (student_id, subid) in to_create:
+                                                to_create.discard((student_id, subid))
+                                            else:
+                                                to_delete.add((student_id, subid))
+                                        if subject.id in existing_group:
+                                            updated += 1
+                                        else:
+                                            created += 1
+                                            enrolled.add(subject.id)
+                                            if (student_id, subject.id) in to_delete:
+                                                to_delete.discard((student_id, subject.id))
+                                            else:
+                                                to_create.add((student_id, subject.id))
+                            except ValueError as exc:
+                                upload_errors.append(f"Stopped reading the file after {total} rows: {exc}")
+
+                            with transaction.atomic():
+                                delete_by_subject = {}
+                                for sid, subid in to_delete:
+                                    delete_by_subject.setdefault(subid, []).append(sid)
+                                for subid, sids in delete_by_subject.items():
+                                    StudentSubject.objects.filter(subject_id=subid, student_id__in=sids).delete()
+                                # bulk_create skips post_save, so derived data is refreshed once below.
+                                StudentSubject.objects.bulk_create(
+                                    [StudentSubject(student_id=sid, subject_id=subid) for sid, subid in to_create],
+                                    ignore_conflicts=True,
                                 )
-                                if was_created:
-                                    created += 1
-                                else:
-                                    updated += 1
+                                enrollments_changed(sid for sid, _ in to_create | to_delete)
 
                             upload_results = {
                                 'created': created,
                                 'updated': updated,
                                 'skipped': skipped,
                                 'errors': len(upload_errors),
-                                'total': len(df),
+                                'total': total,
                             }
 
+        if request.GET.get('download') == 'csv':
+            return _enrollments_csv_response(qs.order_by('division', 'enrollment_no'), subjects)
+
         # Refresh after changes: build map of student_id -> list of subject_ids
         pairs = StudentSubject.objects.filter(student__in=students, subject__in=subjects)
         pairs = pairs.values_list('student_id', 'subject_id')
@@ -3834,27 +3584,6 @@ def manage_enrollments(request):
     else:
         enroll_map = {}
 
-    if request.GET.get('download') == 'csv' and branch_id and semester_id:
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="enrollments.csv"'
-        writer = csv.writer(response)
-        header = ['Enrollment No', 'Name', 'Division']
-        for s in subjects:
-            initials = _subject_initials(s.name)
-            header.append(f"{s.code} ({initials})" if initials else s.code)
-        writer.writerow(header)
-        for stu in students:
-            enrolled = set(enroll_map.get(stu.id, []))
-            row = [
-                stu.enrollment_no,
-                stu.name,
-                stu.division,
-            ]
-            for subj in subjects:
-                row.append('Yes' if subj.id in enrolled else 'No')
-            writer.writerow(row)
-        return response
-
     context = {
         'branches': branches,
         'semesters': semesters,
@@ -156,6 +156,50 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Allow large enrollment grids to be submitted.
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 20000
 
+# Cache: local memory by default. Set DJANGO_CACHE_DIR to share the cache
+# (and profile invalidation) between several worker processes. Django culls
+# both backends at 300 entries by default, far below one cached result page
+# per student of a cohort.
+CACHE_OPTIONS = {'MAX_ENTRIES': int(os.getenv('DJANGO_CACHE_MAX_ENTRIES', '20000'))}
+if os.getenv('DJANGO_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('DJANGO_CACHE_DIR'),
+            'OPTIONS': CACHE_OPTIONS,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': CACHE_OPTIONS,
+        }
+    }
+
+# Upper bound on how long computed student profile sections are cached.
+STUDENT_PROFILE_CACHE_TIMEOUT = int(os.getenv('STUDENT_PROFILE_CACHE_TIMEOUT', '600'))
+
+# Upper bound on how long a built public result page context is cached. Uploads
+# refresh it, so it only limits staleness from writes that bypass the cache.
+PUBLIC_RESULT_CACHE_TIMEOUT = int(os.getenv('PUBLIC_RESULT_CACHE_TIMEOUT', '86400'))
+
+# Worker processes that pre-render marksheet PDFs after a result upload
+# (files under MEDIA_ROOT/result_pdfs/). Off by default: hosts such as
+# PythonAnywhere do not allow web apps to start background processes, and
+# PDFs are then drawn on first download.
+RESULT_PDF_WORKERS = int(os.getenv('RESULT_PDF_WORKERS', '0'))
+
+# Layout for newly saved attendance: 'rows' (one Attendance row per student)
+# or 'sessions' (ClassSession header + absence rows). Reads combine both.
+ATTENDANCE_STORAGE = os.getenv('ATTENDANCE_STORAGE', 'rows')
+
+# Rows per page on the student list (keyset paginated).
+STUDENT_LIST_PAGE_SIZE = int(os.getenv('STUDENT_LIST_PAGE_SIZE', '100'))
+
+# Rows read, validated and committed per transaction by the CSV importers.
+UPLOAD_CHUNK_ROWS = int(os.getenv('UPLOAD_CHUNK_ROWS', '5000'))
+
 # Require login again when browser/system is reopened.
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 